@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import anyio
+
+# Served in this order whenever a slot frees up.
+COST_CLASSES = ("light", "standard", "heavy")
+DEFAULT_COST = "standard"
+
+# Connections granted to the running call; fan-out work (batches) must not use more.
+_granted: ContextVar[int | None] = ContextVar("admission_granted", default=None)
+
+
+def parallel_budget(default: int) -> int:
+    """How many connections a call may use at once: `default`, capped by what admission granted it."""
+    granted = _granted.get()
+    return max(1, min(default, granted)) if granted else default
+
+
+class AdmissionRejected(RuntimeError):
+    def __init__(self, cost: str, reason: str, retry_after_s: int):
+        super().__init__(f"Server busy ({cost} tools: {reason}). Retry in ~{retry_after_s}s.")
+        self.cost = cost
+        self.retry_after_s = retry_after_s
+
+
+@dataclass
+class _Waiter:
+    weight: int = 1
+    event: anyio.Event = field(default_factory=anyio.Event)
+    granted: bool = False
+
+
+@dataclass
+class _ClassState:
+    limit: int
+    running: int = 0
+    waiters: deque = field(default_factory=deque)
+    admitted: int = 0
+    queued: int = 0
+    rejected: int = 0
+    avg_s: float | None = None
+    max_wait_s: float = 0.0
+
+
+class AdmissionController:
+    """
+    Concurrency governor for tool calls, one per server process (event loop).
+
+    Slots stand for pooled connections. Light tools get their own slots, so they never queue
+    behind reports. Standard and heavy tools share `capacity` slots, heavy ones additionally
+    capped at their own limit; a freed slot goes to the highest-priority waiter. A call that
+    fans out over several connections takes `weight` slots, and `parallel_budget` keeps it to
+    them. Each class has a bounded queue; when it is full, or a caller waited longer than
+    `queue_timeout_s`, the call is rejected immediately with a retry estimate based on recent
+    call durations.
+    """
+
+    EWMA_ALPHA = 0.2
+
+    def __init__(self, capacity: int, light: int, heavy: int, queue_size: int, queue_timeout_s: float):
+        self.capacity = max(1, capacity)
+        self.queue_size = queue_size
+        self.queue_timeout_s = queue_timeout_s
+        self.classes = {
+            "light": _ClassState(limit=max(1, light)),
+            "standard": _ClassState(limit=self.capacity),
+            "heavy": _ClassState(limit=max(1, min(heavy, self.capacity))),
+        }
+
+    def _shared_running(self) -> int:
+        return self.classes["standard"].running + self.classes["heavy"].running
+
+    def _can_run(self, cost: str, weight: int = 1) -> bool:
+        state = self.classes[cost]
+        if state.running + weight > state.limit:
+            return False
+        return cost == "light" or self._shared_running() + weight <= self.capacity
+
+    def _ahead(self, cost: str) -> bool:
+        # Someone of equal or higher priority is already waiting for a shared slot.
+        if cost == "light":
+            return bool(self.classes["light"].waiters)
+        upto = COST_CLASSES.index(cost)
+        return any(self.classes[c].waiters for c in COST_CLASSES[1 : upto + 1])
+
+    def _dispatch(self) -> None:
+        for cost in COST_CLASSES:
+            state = self.classes[cost]
+            while state.waiters and self._can_run(cost, state.waiters[0].weight):
+                waiter = state.waiters.popleft()
+                waiter.granted = True
+                state.running += waiter.weight
+                waiter.event.set()
+
+    def _retry_after(self, cost: str) -> int:
+        state = self.classes[cost]
+        return max(1, math.ceil((state.avg_s or 1.0) * (len(state.waiters) + 1) / state.limit))
+
+    def _reject(self, cost: str, reason: str) -> AdmissionRejected:
+        self.classes[cost].rejected += 1
+        return AdmissionRejected(cost, reason, self._retry_after(cost))
+
+    @asynccontextmanager
+    async def slot(self, cost: str, weight: int = 1):
+        """Holds `weight` slots of the class for the duration; yields the weight granted."""
+        cost = cost if cost in self.classes else DEFAULT_COST
+        state = self.classes[cost]
+        limit = state.limit if cost == "light" else min(state.limit, self.capacity)
+        weight = max(1, min(weight, limit))
+        t0 = time.perf_counter()
+
+        if self._can_run(cost, weight) and not self._ahead(cost):
+            state.running += weight
+        else:
+            if len(state.waiters) >= self.queue_size:
+                raise self._reject(cost, f"{len(state.waiters)} queued")
+            waiter = _Waiter(weight)
+            state.waiters.append(waiter)
+            state.queued += 1
+            try:
+                with anyio.move_on_after(self.queue_timeout_s):
+                    await waiter.event.wait()
+            except BaseException:
+                # Cancelled while queued; if a slot was handed over meanwhile, pass it on.
+                if waiter.granted:
+                    state.running -= weight
+                    self._dispatch()
+                else:
+                    state.waiters.remove(waiter)
+                raise
+            if not waiter.granted:
+                state.waiters.remove(waiter)
+                raise self._reject(cost, f"no slot within {self.queue_timeout_s:g}s")
+            state.max_wait_s = max(state.max_wait_s, time.perf_counter() - t0)
+
+        state.admitted += 1
+        started = time.perf_counter()
+        token = _granted.set(weight)
+        try:
+            yield weight
+        finally:
+            _granted.reset(token)
+            state.running -= weight
+            elapsed = time.perf_counter() - started
+            state.avg_s = elapsed if state.avg_s is None else state.avg_s + self.EWMA_ALPHA * (elapsed - state.avg_s)
+            self._dispatch()
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "queue_size": self.queue_size,
+            "queue_timeout_s": self.queue_timeout_s,
+            "classes": {
+                cost: {
+                    "limit": s.limit,
+                    "running": s.running,
+                    "waiting": len(s.waiters),
+                    "admitted": s.admitted,
+                    "queued": s.queued,
+                    "rejected": s.rejected,
+                    "avg_ms": round(s.avg_s * 1000, 1) if s.avg_s is not None else None,
+                    "max_wait_ms": round(s.max_wait_s * 1000, 1),
+                }
+                for cost, s in self.classes.items()
+            },
+        }
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import math
+import random
 from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import (
@@ -10,17 +12,104 @@ from sqlalchemy import (
     literal_column,
     case,
     Numeric,
+    and_,
+    bindparam,
+    distinct,
+    null,
+    or_,
+    true,
+    tablesample,
+    text,
 )
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.orm import Session
 
+from app.application.services.caching import cached_result
+from app.infrastructure.cache.store import ScopedCache
+from app.infrastructure.db.inventory import SNAPSHOT_TABLE, STATE_TABLE, movement_columns
 from app.infrastructure.db.reflection import SchemaReflection
 from app.infrastructure.db.tables import TableRegistry
 
 
+def resolve_window(days: int, start: datetime | None = None, end: datetime | None = None) -> tuple[datetime, datetime]:
+    """
+    Half-open [start, end) window. Without explicit bounds, `end` is the next UTC midnight and
+    `start` is `days` before it, so every call on the same day gets identical constants
+    (stable statements, cacheable results, plan-time partition pruning).
+    """
+    if end is None:
+        today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        end = today + timedelta(days=1)
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+
+    if start is None:
+        start = end - timedelta(days=days)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+
+    if start >= end:
+        raise ValueError("Window start must be before end.")
+    return start, end
+
+
+def resolve_compare_window(
+    current: tuple[datetime, datetime], start: datetime | None = None, end: datetime | None = None
+) -> tuple[datetime, datetime]:
+    """Comparison window: the equally long period right before `current` unless both bounds are given."""
+    if start is None and end is None:
+        return current[0] - (current[1] - current[0]), current[0]
+    if start is None or end is None:
+        raise ValueError("Give both compare_start and compare_end, or neither.")
+    return resolve_window(1, start, end)
+
+
+def _change(current, previous) -> dict:
+    cur = float(current or 0)
+    prev = float(previous or 0)
+    return {
+        "current": cur,
+        "previous": prev,
+        "change": round(cur - prev, 2),
+        "change_pct": round((cur - prev) / prev * 100, 2) if prev else None,
+    }
+
+
+def window_days(start: datetime, end: datetime) -> int:
+    return max(1, round((end - start).total_seconds() / 86400))
+
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+SAMPLE_METHODS = ("system", "bernoulli")
+Z_95 = 1.96
+
+
+def resolve_granularity(granularity: str, start: datetime, end: datetime) -> str:
+    """
+    Validates a trend bucket size. "auto" keeps the series to roughly 50-100 points:
+    hourly up to 2 days, daily up to ~3 months, weekly up to a year, monthly beyond.
+    """
+    g = (granularity or "day").lower().strip()
+    if g == "auto":
+        span_days = (end - start).total_seconds() / 86400
+        if span_days <= 2:
+            return "hour"
+        if span_days <= 92:
+            return "day"
+        if span_days <= 366:
+            return "week"
+        return "month"
+    if g not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of: auto, {', '.join(GRANULARITIES)}")
+    return g
+
+
 class AnalyticsService:
-    def __init__(self, reflection: SchemaReflection, registry: TableRegistry):
+    def __init__(self, reflection: SchemaReflection, registry: TableRegistry, cache: ScopedCache | None = None):
         self.reflection = reflection
         self.registry = registry
+        self.cache = cache
 
     # -------- column picking (dynamic schema-friendly) --------
 
@@ -32,7 +121,12 @@ class AnalyticsService:
         raise RuntimeError(f"Could not find any of {list(candidates)} in table '{table_name}'.")
 
     def _orders_ts_col(self) -> str:
-        return self._pick_col("orders", ("placed_at", "ordered_at", "created_at", "order_date"))
+        candidates = ("placed_at", "ordered_at", "created_at", "order_date")
+        # On a range-partitioned orders table, filter on the partition key so pruning applies.
+        key = self.reflection.partition_key("orders") or ()
+        if len(key) == 1 and key[0] in candidates and key[0] in self.reflection.columns_for("orders"):
+            return key[0]
+        return self._pick_col("orders", candidates)
 
     def _orders_total_col(self) -> str:
         return self._pick_col("orders", ("total_amount", "grand_total", "total"))
@@ -66,44 +160,107 @@ class AnalyticsService:
         name = "name_snapshot" if "name_snapshot" in cols else None
         return sku, name
 
+    # -------- time windows / partition pushdown --------
+
+    @staticmethod
+    def _bound(col, value: datetime, name: str):
+        # Rendered inline at execution: the planner sees constants and prunes partitions at plan time.
+        return bindparam(name, value, type_=col.type, literal_execute=True, unique=True)
+
+    def _window_where(self, col, start: datetime, end: datetime) -> list:
+        return [col >= self._bound(col, start, "window_start"), col < self._bound(col, end, "window_end")]
+
+    def _orders_where(self, Orders, start: datetime, end: datetime) -> list:
+        ts = Orders.c[self._orders_ts_col()]
+        where = self._window_where(ts, start, end)
+        status_name = self._orders_status_col()
+        if status_name:
+            where.append(Orders.c[status_name] != "cancelled")
+        return where
+
+    def _items_partition_col(self) -> str | None:
+        """
+        order_items partitioned on a copy of the orders timestamp (same column name): the
+        window can be pushed to order_items too so only matching item partitions are scanned.
+        """
+        key = self.reflection.partition_key("order_items") or ()
+        ts_name = self._orders_ts_col()
+        if len(key) == 1 and key[0] == ts_name and ts_name in self.reflection.columns_for("order_items"):
+            return ts_name
+        return None
+
+    def _items_join_orders(self, Items, Orders, start: datetime, end: datetime):
+        """
+        Returns (join, extra_where) for order_items ⋈ orders over the window. When both sides are
+        partitioned on the same key, the join also matches on it so partition-wise joins apply.
+        """
+        on = Orders.c.order_id == Items.c.order_id
+        extra: list = []
+        part_col = self._items_partition_col()
+        if part_col:
+            extra = self._window_where(Items.c[part_col], start, end)
+            if (self.reflection.partition_key("orders") or ()) == (part_col,):
+                on = on & (Items.c[part_col] == Orders.c[part_col])
+        return Items.join(Orders, on), extra
+
     # -------- analytics queries --------
 
-    def revenue_by_day(self, session: Session, days: int) -> list[dict]:
+    def _bucket_expr(self, ts, granularity: str):
+        if granularity == "day":
+            return cast(ts, Date)
+        # granularity is validated against GRANULARITIES, so inlining it is safe
+        truncated = func.date_trunc(literal_column(f"'{granularity}'"), ts)
+        return truncated if granularity == "hour" else cast(truncated, Date)
+
+    @cached_result(window=resolve_window)
+    def revenue_by_day(
+        self,
+        session: Session,
+        days: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        granularity: str = "day",
+    ) -> list[dict]:
+        """
+        Orders + revenue per time bucket (`granularity`: hour/day/week/month/auto), aggregated
+        in the database. Rows: {"bucket", "orders", "revenue"}, plus the original "day" key (same
+        value as "bucket") when the buckets are days, so existing clients keep working.
+        """
         self.reflection.require_tables("orders")
 
         Orders = self.registry.get("orders")
         ts = Orders.c[self._orders_ts_col()]
         total = Orders.c[self._orders_total_col()]
-        status_name = self._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        start, end = resolve_window(days, start, end)
+        granularity = resolve_granularity(granularity, start, end)
+        where = self._orders_where(Orders, start, end)
 
         stmt = (
             select(
-                cast(ts, Date).label("day"),
+                self._bucket_expr(ts, granularity).label("bucket"),
                 func.count().label("orders"),
                 func.round(func.coalesce(func.sum(total), 0), 2).label("revenue"),
             )
             .where(*where)
-            .group_by(literal_column("day"))
-            .order_by(literal_column("day"))
+            .group_by(literal_column("bucket"))
+            .order_by(literal_column("bucket"))
         )
 
-        return [dict(r) for r in session.execute(stmt).mappings().all()]
+        rows = session.execute(stmt).mappings().all()
+        if granularity == "day":
+            return [{"day": r["bucket"], **r} for r in rows]
+        return [dict(r) for r in rows]
 
-    def top_products_last_days(self, session: Session, days: int, limit: int) -> list[dict]:
+    @cached_result(window=resolve_window)
+    def top_products_last_days(
+        self, session: Session, days: int, limit: int, start: datetime | None = None, end: datetime | None = None
+    ) -> list[dict]:
         self.reflection.require_tables("orders", "order_items")
 
         Orders = self.registry.get("orders")
         Items = self.registry.get("order_items")
 
-        ts = Orders.c[self._orders_ts_col()]
-        status_name = self._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
         qty = Items.c[self._order_items_qty_col()]
 
         line_total_name = self._order_items_line_total_col()
@@ -116,10 +273,9 @@ class AnalyticsService:
         else:
             raise RuntimeError("order_items needs line_total or (quantity + unit_price).")
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        start, end = resolve_window(days, start, end)
+        joins, item_where = self._items_join_orders(Items, Orders, start, end)
+        where = self._orders_where(Orders, start, end) + item_where
 
         sku_snap, name_snap = self._order_items_snapshot_cols()
 
@@ -133,7 +289,7 @@ class AnalyticsService:
                     func.sum(qty).label("units"),
                     func.round(revenue_expr, 2).label("revenue"),
                 )
-                .select_from(Items.join(Orders, Orders.c.order_id == Items.c.order_id))
+                .select_from(joins)
                 .where(*where)
                 .group_by(sku_col, name_col)
                 .order_by(literal_column("revenue").desc())
@@ -149,11 +305,7 @@ class AnalyticsService:
                     func.sum(qty).label("units"),
                     func.round(revenue_expr, 2).label("revenue"),
                 )
-                .select_from(
-                    Items.join(Orders, Orders.c.order_id == Items.c.order_id).join(
-                        Products, Products.c.product_id == Items.c.product_id
-                    )
-                )
+                .select_from(joins.join(Products, Products.c.product_id == Items.c.product_id))
                 .where(*where)
                 .group_by(Products.c.sku, Products.c.name)
                 .order_by(literal_column("revenue").desc())
@@ -162,21 +314,19 @@ class AnalyticsService:
 
         return [dict(r) for r in session.execute(stmt).mappings().all()]
 
-    def top_customers_last_days(self, session: Session, days: int, limit: int) -> list[dict]:
+    @cached_result(window=resolve_window)
+    def top_customers_last_days(
+        self, session: Session, days: int, limit: int, start: datetime | None = None, end: datetime | None = None
+    ) -> list[dict]:
         self.reflection.require_tables("orders", "customers")
 
         Orders = self.registry.get("orders")
         Customers = self.registry.get("customers")
 
-        ts = Orders.c[self._orders_ts_col()]
         total = Orders.c[self._orders_total_col()]
-        status_name = self._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        start, end = resolve_window(days, start, end)
+        where = self._orders_where(Orders, start, end)
 
         stmt = (
             select(
@@ -195,18 +345,16 @@ class AnalyticsService:
 
         return [dict(r) for r in session.execute(stmt).mappings().all()]
 
-    def repeat_purchase_rate(self, session: Session, days: int) -> dict:
+    @cached_result(window=resolve_window)
+    def repeat_purchase_rate(
+        self, session: Session, days: int, start: datetime | None = None, end: datetime | None = None
+    ) -> dict:
         self.reflection.require_tables("orders")
 
         Orders = self.registry.get("orders")
-        ts = Orders.c[self._orders_ts_col()]
-        status_name = self._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        start, end = resolve_window(days, start, end)
+        where = self._orders_where(Orders, start, end)
 
         cust_orders = (
             select(Orders.c.customer_id.label("customer_id"), func.count().label("n"))
@@ -228,18 +376,17 @@ class AnalyticsService:
         ).select_from(cust_orders)
 
         row = session.execute(stmt).mappings().one()
-        return {"days": days, **dict(row)}
+        return {"days": window_days(start, end), "start": start.isoformat(), "end": end.isoformat(), **dict(row)}
 
-    def gross_margin_last_days(self, session: Session, days: int) -> dict:
+    @cached_result(window=resolve_window)
+    def gross_margin_last_days(
+        self, session: Session, days: int, start: datetime | None = None, end: datetime | None = None
+    ) -> dict:
         self.reflection.require_tables("orders", "order_items")
 
         Orders = self.registry.get("orders")
         Items = self.registry.get("order_items")
 
-        ts = Orders.c[self._orders_ts_col()]
-        status_name = self._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
-
         qty = Items.c[self._order_items_qty_col()]
         line_total_name = self._order_items_line_total_col()
         unit_price_name = self._order_items_price_col()
@@ -252,12 +399,10 @@ class AnalyticsService:
         else:
             raise RuntimeError("order_items needs line_total or (quantity + unit_price).")
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        start, end = resolve_window(days, start, end)
+        joins, item_where = self._items_join_orders(Items, Orders, start, end)
+        where = self._orders_where(Orders, start, end) + item_where
 
-        joins = Items.join(Orders, Orders.c.order_id == Items.c.order_id)
         if unit_cost_name:
             cost_expr = func.sum(qty * Items.c[unit_cost_name])
         else:
@@ -283,16 +428,391 @@ class AnalyticsService:
         )
 
         row = session.execute(stmt).mappings().one()
-        return {"days": days, **dict(row)}
+        return {"days": window_days(start, end), "start": start.isoformat(), "end": end.isoformat(), **dict(row)}
+
+    # -------- approximate analytics (TABLESAMPLE) --------
+
+    def _sample(self, table: str, sample_percent: float, method: str, seed: int):
+        m = (method or "system").lower().strip()
+        if m not in SAMPLE_METHODS:
+            raise ValueError(f"sample_method must be one of: {', '.join(SAMPLE_METHODS)}")
+        if not 0 < sample_percent <= 100:
+            raise ValueError("sample_percent must be in (0, 100].")
+        T = self.registry.get(table)
+        # REPEATABLE(seed): every statement in this call sees the same sample.
+        return tablesample(
+            T, getattr(func, m)(sample_percent), name=f"{table}_sample", seed=literal_column(str(int(seed)))
+        )
+
+    @staticmethod
+    def _sample_units(Sampled, method: str, id_col) -> list:
+        """
+        Expressions identifying the sampling unit of each sampled row: the row itself (`id_col`)
+        for BERNOULLI, its heap page for SYSTEM, which includes or skips whole pages. tableoid
+        keeps the pages of different partitions apart.
+        """
+        if method.lower().strip() == "bernoulli":
+            return [id_col]
+        return [
+            literal_column(f"{Sampled.name}.tableoid"),
+            literal_column(f"({Sampled.name}.ctid::text::point)[0]"),
+        ]
+
+    def _sample_fraction(
+        self, session: Session, table: str, sampled, sample_percent: float, method: str
+    ) -> tuple[float, int | None, bool]:
+        """
+        (fraction, sampled rows, estimated?). BERNOULLI includes each row with probability
+        `sample_percent` by design, so that is the fraction. SYSTEM includes pages with that
+        probability, but pages hold different numbers of rows, so the realised row fraction is
+        estimated as sampled rows / planner row estimate (partitioned parents carry no reltuples
+        of their own, so their children are summed). Without statistics the design fraction is used.
+        """
+        design = sample_percent / 100.0
+        if method.lower().strip() == "bernoulli":
+            return design, None, False
+        n = int(session.execute(select(func.count()).select_from(sampled)).scalar_one())
+        rel = f'"{self.reflection.schema}"."{table}"'
+        est = session.execute(
+            text(
+                """
+                SELECT coalesce(sum(greatest(c.reltuples, 0)), 0)
+                FROM pg_class c
+                WHERE c.oid = to_regclass(:rel)
+                   OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(:rel))
+                """
+            ),
+            {"rel": rel},
+        ).scalar_one()
+        est = float(est or 0)
+        if est <= 0 or n <= 0:
+            return design, n, False
+        return min(max(n / est, 1e-9), 1.0), n, True
+
+    @staticmethod
+    def _scaled_sum(total, total_sq, frac: float) -> tuple[float, float, float]:
+        """
+        Horvitz-Thompson estimate of a sum from sampled units (rows or pages) included with
+        probability `frac`, plus a 95% normal interval: Var = (1 - f) / f^2 * sum(y^2), where y is
+        each sampled unit's total.
+        """
+        est = float(total or 0) / frac
+        half = Z_95 * math.sqrt(max(0.0, (1.0 - frac) * float(total_sq or 0))) / frac
+        return round(est, 2), round(max(0.0, est - half), 2), round(est + half, 2)
+
+    @staticmethod
+    def _ratio_interval(n, m, n_sq, m_sq, nm, frac: float) -> tuple[float, float, float]:
+        """
+        Ratio m/n of two sums over sampled units with a linearised 95% interval:
+        Var = (1 - f) * sum((m_u - R n_u)^2) / (sum n_u)^2. With one customer per unit this is the
+        usual (1 - f) R (1 - R) / n of a proportion.
+        """
+        n, m = float(n or 0), float(m or 0)
+        if n <= 0:
+            return 0.0, 0.0, 0.0
+        rate = m / n
+        resid_sq = float(m_sq or 0) - 2 * rate * float(nm or 0) + rate * rate * float(n_sq or 0)
+        half = Z_95 * math.sqrt(max(0.0, (1.0 - frac) * resid_sq)) / n
+        return round(rate, 4), round(max(0.0, rate - half), 4), round(min(1.0, rate + half), 4)
+
+    def _approx_meta(
+        self, method: str, sample_percent: float, frac: float, sampled: int | None, estimated: bool, seed: int
+    ) -> dict:
+        return {
+            "sample_method": method.lower().strip(),
+            "sample_percent": sample_percent,
+            "effective_fraction": round(frac, 6),
+            "fraction_source": "estimated" if estimated else "design",
+            "sampled_rows": sampled,
+            "seed": seed,
+            "confidence": 0.95,
+        }
+
+    def top_products_approx(
+        self,
+        session: Session,
+        days: int,
+        limit: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        sample_percent: float = 5.0,
+        method: str = "system",
+        seed: int | None = None,
+    ) -> dict:
+        """
+        top_products_last_days over a TABLESAMPLE of orders. Revenue/units are scaled by the
+        sample fraction and revenue carries a 95% interval; lines are summed per sampling unit
+        (order, or orders page for SYSTEM) before the variance is taken.
+        """
+        self.reflection.require_tables("orders", "order_items")
+        seed = random.randint(1, 2**31 - 1) if seed is None else seed
+
+        Items = self.registry.get("order_items")
+        Sampled = self._sample("orders", sample_percent, method, seed)
+
+        qty = Items.c[self._order_items_qty_col()]
+        line_total_name = self._order_items_line_total_col()
+        unit_price_name = self._order_items_price_col()
+        if line_total_name:
+            line = Items.c[line_total_name]
+        elif unit_price_name:
+            line = qty * Items.c[unit_price_name]
+        else:
+            raise RuntimeError("order_items needs line_total or (quantity + unit_price).")
+
+        start, end = resolve_window(days, start, end)
+        joins, item_where = self._items_join_orders(Items, Sampled, start, end)
+        where = self._orders_where(Sampled, start, end) + item_where
+
+        sku_snap, name_snap = self._order_items_snapshot_cols()
+        if sku_snap and name_snap:
+            sku_col, name_col = Items.c[sku_snap], Items.c[name_snap]
+        else:
+            self.reflection.require_tables("products")
+            Products = self.registry.get("products")
+            joins = joins.join(Products, Products.c.product_id == Items.c.product_id)
+            sku_col, name_col = Products.c.sku, Products.c.name
+
+        per_unit = (
+            select(
+                sku_col.label("sku"),
+                name_col.label("name"),
+                func.sum(qty).label("units"),
+                func.sum(line).label("revenue"),
+            )
+            .select_from(joins)
+            .where(*where)
+            .group_by(sku_col, name_col, *self._sample_units(Sampled, method, Sampled.c.order_id))
+            .subquery("per_unit")
+        )
+        stmt = (
+            select(
+                per_unit.c.sku,
+                per_unit.c.name,
+                func.sum(per_unit.c.units).label("units"),
+                func.sum(per_unit.c.revenue).label("revenue"),
+                func.sum(per_unit.c.revenue * per_unit.c.revenue).label("revenue_sq"),
+            )
+            .group_by(per_unit.c.sku, per_unit.c.name)
+            .order_by(literal_column("revenue").desc())
+            .limit(limit)
+        )
+        rows = session.execute(stmt).mappings().all()
+        frac, sampled, estimated = self._sample_fraction(session, "orders", Sampled, sample_percent, method)
+
+        out = []
+        for r in rows:
+            est, lo, hi = self._scaled_sum(r["revenue"], r["revenue_sq"], frac)
+            out.append(
+                {
+                    "sku": r["sku"],
+                    "name": r["name"],
+                    "units": round(float(r["units"] or 0) / frac),
+                    "revenue": est,
+                    "revenue_ci_low": lo,
+                    "revenue_ci_high": hi,
+                }
+            )
+        meta = self._approx_meta(method, sample_percent, frac, sampled, estimated, seed)
+        return {"rows": out, "approximate": meta}
+
+    def top_customers_approx(
+        self,
+        session: Session,
+        days: int,
+        limit: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        sample_percent: float = 5.0,
+        method: str = "system",
+        seed: int | None = None,
+    ) -> dict:
+        self.reflection.require_tables("orders", "customers")
+        seed = random.randint(1, 2**31 - 1) if seed is None else seed
+
+        Customers = self.registry.get("customers")
+        Sampled = self._sample("orders", sample_percent, method, seed)
+        total = Sampled.c[self._orders_total_col()]
+
+        start, end = resolve_window(days, start, end)
+        where = self._orders_where(Sampled, start, end)
+
+        # A customer's revenue per sampling unit (order, or orders page for SYSTEM).
+        per_unit = (
+            select(
+                Sampled.c.customer_id.label("customer_id"),
+                func.count().label("orders"),
+                func.sum(total).label("revenue"),
+            )
+            .where(*where)
+            .group_by(Sampled.c.customer_id, *self._sample_units(Sampled, method, Sampled.c.order_id))
+            .subquery("per_unit")
+        )
+        stmt = (
+            select(
+                Customers.c.customer_id,
+                Customers.c.email,
+                Customers.c.full_name,
+                func.sum(per_unit.c.orders).label("orders"),
+                func.sum(per_unit.c.revenue).label("revenue"),
+                func.sum(per_unit.c.revenue * per_unit.c.revenue).label("revenue_sq"),
+            )
+            .select_from(per_unit.join(Customers, Customers.c.customer_id == per_unit.c.customer_id))
+            .group_by(Customers.c.customer_id, Customers.c.email, Customers.c.full_name)
+            .order_by(literal_column("revenue").desc())
+            .limit(limit)
+        )
+        rows = session.execute(stmt).mappings().all()
+        frac, sampled, estimated = self._sample_fraction(session, "orders", Sampled, sample_percent, method)
+
+        out = []
+        for r in rows:
+            est, lo, hi = self._scaled_sum(r["revenue"], r["revenue_sq"], frac)
+            out.append(
+                {
+                    "customer_id": r["customer_id"],
+                    "email": r["email"],
+                    "full_name": r["full_name"],
+                    "orders": round(int(r["orders"]) / frac),
+                    "revenue": est,
+                    "revenue_ci_low": lo,
+                    "revenue_ci_high": hi,
+                }
+            )
+        meta = self._approx_meta(method, sample_percent, frac, sampled, estimated, seed)
+        return {"rows": out, "approximate": meta}
+
+    def repeat_purchase_rate_approx(
+        self,
+        session: Session,
+        days: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        sample_percent: float = 5.0,
+        method: str = "system",
+        seed: int | None = None,
+    ) -> dict:
+        """
+        Samples customers (not orders: sampling orders would split a customer's order count)
+        and reads all window orders of the sampled customers. The rate is a ratio over sampled
+        active customers with a 95% interval computed per sampling unit (customer, or page of
+        customers for SYSTEM).
+        """
+        self.reflection.require_tables("orders", "customers")
+        seed = random.randint(1, 2**31 - 1) if seed is None else seed
+
+        Orders = self.registry.get("orders")
+        Sampled = self._sample("customers", sample_percent, method, seed)
+
+        start, end = resolve_window(days, start, end)
+        where = self._orders_where(Orders, start, end)
+        units = self._sample_units(Sampled, method, Sampled.c.customer_id)
+
+        cust_orders = (
+            select(
+                *(u.label(f"unit_{i}") for i, u in enumerate(units)),
+                func.count().label("n"),
+            )
+            .select_from(Orders.join(Sampled, Sampled.c.customer_id == Orders.c.customer_id))
+            .where(*where)
+            .group_by(*dict.fromkeys([Sampled.c.customer_id, *units]))
+            .cte("cust_orders")
+        )
+        per_unit = (
+            select(
+                func.count().label("active"),
+                func.sum(case((cust_orders.c.n >= 2, 1), else_=0)).label("repeat"),
+            )
+            .group_by(*(cust_orders.c[f"unit_{i}"] for i in range(len(units))))
+            .subquery("per_unit")
+        )
+        stmt = select(
+            func.coalesce(func.sum(per_unit.c.active), 0).label("active_n"),
+            func.coalesce(func.sum(per_unit.c.repeat), 0).label("repeat_n"),
+            func.sum(per_unit.c.active * per_unit.c.active).label("active_sq"),
+            func.sum(per_unit.c.repeat * per_unit.c.repeat).label("repeat_sq"),
+            func.sum(per_unit.c.active * per_unit.c.repeat).label("active_repeat"),
+        )
+
+        row = session.execute(stmt).mappings().one()
+        frac, sampled, estimated = self._sample_fraction(session, "customers", Sampled, sample_percent, method)
+
+        active, repeat = int(row["active_n"]), int(row["repeat_n"])
+        rate, low, high = self._ratio_interval(
+            active, repeat, row["active_sq"], row["repeat_sq"], row["active_repeat"], frac
+        )
+
+        return {
+            "days": window_days(start, end),
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "active_customers": round(active / frac),
+            "repeat_customers": round(repeat / frac),
+            "repeat_rate": rate,
+            "repeat_rate_ci_low": low,
+            "repeat_rate_ci_high": high,
+            "approximate": self._approx_meta(method, sample_percent, frac, sampled, estimated, seed),
+        }
 
     # -------- ops helpers --------
 
-    def _inventory_source_select(self):
+    def _inventory_snapshot_select(self, threshold: int | None = None):
+        """
+        On hand from `inventory_snapshot` plus the movements above its high-water mark. With a
+        threshold, candidates are the snapshot rows at or below it (an index range scan), the
+        products touched since the last refresh, and products created since then (no snapshot
+        row yet, so on hand 0); nothing else can have crossed the threshold.
+        """
+        Snap = self.registry.get(SNAPSHOT_TABLE)
+        State = self.registry.get(STATE_TABLE)
+        Stock = self.registry.get("stock_movements")
+        Products = self.registry.get("products")
+        id_name, qty_name = movement_columns(Stock)
+
+        mark = select(State.c.high_water_mark).scalar_subquery()
+        delta = (
+            select(Stock.c.product_id, func.sum(Stock.c[qty_name]).label("delta"))
+            .where(Stock.c[id_name] > mark)
+            .group_by(Stock.c.product_id)
+            .cte("inventory_delta")
+        )
+        on_hand = (func.coalesce(Snap.c.on_hand, 0) + func.coalesce(delta.c.delta, 0)).label("on_hand")
+
+        if threshold is None:
+            joins = Products.outerjoin(Snap, Snap.c.product_id == Products.c.product_id)
+            return select(Products.c.product_id, Products.c.sku, Products.c.name, on_hand).select_from(
+                joins.outerjoin(delta, delta.c.product_id == Products.c.product_id)
+            )
+
+        unsnapshotted = select(Products.c.product_id).where(
+            ~select(Snap.c.product_id).where(Snap.c.product_id == Products.c.product_id).exists()
+        )
+        candidates = (
+            select(Snap.c.product_id.label("product_id"))
+            .where(Snap.c.on_hand <= threshold)
+            .union(select(delta.c.product_id), unsnapshotted)
+            .subquery("candidates")
+        )
+        joins = (
+            candidates.join(Products, Products.c.product_id == candidates.c.product_id)
+            .outerjoin(Snap, Snap.c.product_id == candidates.c.product_id)
+            .outerjoin(delta, delta.c.product_id == candidates.c.product_id)
+        )
+        return select(Products.c.product_id, Products.c.sku, Products.c.name, on_hand).select_from(joins)
+
+    def _inventory_source_select(self, threshold: int | None = None):
+        if (
+            self.reflection.table_exists(SNAPSHOT_TABLE)
+            and self.reflection.table_exists(STATE_TABLE)
+            and self.reflection.table_exists("stock_movements")
+        ):
+            return self._inventory_snapshot_select(threshold)
+
         if self.reflection.relation_exists("v_inventory_on_hand"):
             Inv = self.registry.get("v_inventory_on_hand")
             Products = self.registry.get("products")
             return (
-                select(Products.c.sku, Products.c.name, Inv.c.on_hand)
+                select(Products.c.product_id, Products.c.sku, Products.c.name, Inv.c.on_hand)
                 .select_from(Inv.join(Products, Products.c.product_id == Inv.c.product_id))
             )
 
@@ -304,14 +824,15 @@ class AnalyticsService:
             if not on_hand_col:
                 raise RuntimeError("Found inventory table but no on_hand/quantity_on_hand column.")
             return (
-                select(Products.c.sku, Products.c.name, Inv.c[on_hand_col].label("on_hand"))
+                select(Products.c.product_id, Products.c.sku, Products.c.name, Inv.c[on_hand_col].label("on_hand"))
                 .select_from(Inv.join(Products, Products.c.product_id == Inv.c.product_id))
             )
 
         raise RuntimeError("No inventory source found (expected v_inventory_on_hand view or inventory table).")
 
+    @cached_result(volatile=True)
     def low_stock(self, session: Session, threshold: int, limit: int) -> list[dict]:
-        inv_stmt = self._inventory_source_select().cte("inv")
+        inv_stmt = self._inventory_source_select(threshold).cte("inv")
         stmt = (
             select(inv_stmt.c.sku, inv_stmt.c.name, inv_stmt.c.on_hand)
             .where(inv_stmt.c.on_hand <= threshold)
@@ -320,39 +841,201 @@ class AnalyticsService:
         )
         return [dict(r) for r in session.execute(stmt).mappings().all()]
 
+    @cached_result(window=resolve_window, volatile=True)
+    def reorder_plan(
+        self,
+        session: Session,
+        days: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        lead_time_days: int = 14,
+        safety_days: int = 7,
+        target_days: int = 30,
+        only_reorder: bool = True,
+        limit: int = 50,
+        offset: int = 0,
+    ) -> dict:
+        """
+        Whole-catalog reorder plan in one statement: units sold per product over the window
+        (velocity), on hand, days of cover and a reorder quantity, ranked by days of cover and
+        paginated with the total count computed in the same pass.
+
+        A product needs reordering once its cover drops below lead time + safety stock; the
+        quantity brings it back to velocity x (lead time + safety + target days).
+        """
+        self.reflection.require_tables("orders", "order_items", "products")
+
+        Orders = self.registry.get("orders")
+        Items = self.registry.get("order_items")
+        qty = Items.c[self._order_items_qty_col()]
+
+        start, end = resolve_window(days, start, end)
+        n_days = window_days(start, end)
+        joins, item_where = self._items_join_orders(Items, Orders, start, end)
+        sold = (
+            select(Items.c.product_id, func.sum(qty).label("units"))
+            .select_from(joins)
+            .where(*self._orders_where(Orders, start, end), *item_where)
+            .group_by(Items.c.product_id)
+            .subquery("sold")
+        )
+        inv = self._inventory_source_select().subquery("inv")
+
+        units = func.coalesce(sold.c.units, 0)
+        velocity = cast(units, Numeric) / n_days
+        on_hand = func.greatest(func.coalesce(inv.c.on_hand, 0), 0)
+        cover = on_hand / func.nullif(velocity, 0)
+        up_to = velocity * (lead_time_days + safety_days + target_days)
+        reorder_qty = case(
+            (velocity == 0, 0),
+            (cover < lead_time_days + safety_days, func.ceil(up_to - on_hand)),
+            else_=0,
+        )
+        plan = (
+            select(
+                inv.c.product_id,
+                inv.c.sku,
+                inv.c.name,
+                inv.c.on_hand,
+                units.label("units_sold"),
+                func.round(velocity, 3).label("daily_velocity"),
+                func.round(cover, 1).label("days_of_cover"),
+                reorder_qty.label("reorder_qty"),
+            )
+            .select_from(inv.outerjoin(sold, sold.c.product_id == inv.c.product_id))
+            .subquery("plan")
+        )
+
+        stmt = select(plan, func.count().over().label("total"))
+        if only_reorder:
+            stmt = stmt.where(plan.c.reorder_qty > 0)
+        stmt = (
+            stmt.order_by(
+                plan.c.days_of_cover.asc().nulls_last(), plan.c.daily_velocity.desc(), plan.c.sku.asc()
+            )
+            .limit(limit)
+            .offset(offset)
+        )
+        rows = [dict(r) for r in session.execute(stmt).mappings().all()]
+        total = rows[0].pop("total") if rows else 0
+        for r in rows[1:]:
+            r.pop("total")
+        if not rows and offset:
+            # Past the last page there is no row to carry the window count.
+            count = select(func.count()).select_from(plan)
+            total = session.execute(count.where(plan.c.reorder_qty > 0) if only_reorder else count).scalar()
+
+        return {
+            "days": n_days,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "lead_time_days": lead_time_days,
+            "safety_days": safety_days,
+            "target_days": target_days,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + len(rows) if offset + len(rows) < total else None,
+            "rows": rows,
+        }
+
+    COUNT_TABLES = ("customers", "categories", "products", "orders", "order_items", "promo_codes", "order_promotions")
+
+    def counted_tables(self) -> list[str]:
+        return [t for t in self.COUNT_TABLES if self.reflection.table_exists(t)]
+
+    def count_table(self, session: Session, table: str, timeout_ms: int | None = None) -> int:
+        if timeout_ms:
+            # set_config(..., is_local => true) == SET LOCAL, but accepts a bound parameter.
+            session.execute(text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": f"{int(timeout_ms)}ms"})
+        T = self.registry.get(table)
+        return int(session.execute(select(func.count()).select_from(T)).scalar_one())
+
     def table_counts(self, session: Session) -> dict:
-        candidates = ["customers", "categories", "products", "orders", "order_items", "promo_codes", "order_promotions"]
-        existing = [t for t in candidates if self.reflection.table_exists(t)]
+        existing = self.counted_tables()
         if not existing:
             return {"tables": {}, "note": "No known tables found."}
 
         out: dict[str, int] = {}
         for t in existing:
-            T = self.registry.get(t)
-            n = session.execute(select(func.count()).select_from(T)).scalar_one()
-            out[t] = int(n)
+            out[t] = self.count_table(session, t)
 
         return {"tables": out}
 
-    def sales_kpis(self, session: Session, days: int) -> dict:
+    def table_counts_estimate(self, session: Session) -> dict:
+        """
+        Row estimates from planner statistics in one catalog query (no table scans):
+        pg_class.reltuples plus live/dead tuples and last analyze from pg_stat_user_tables.
+        Partitioned parents are summed over their partitions.
+        """
+        existing = self.counted_tables()
+        if not existing:
+            return {"mode": "estimate", "tables": {}, "note": "No known tables found."}
+
+        q = text(
+            """
+            WITH rel AS (
+                SELECT c.oid, c.relname, c.relkind, c.reltuples
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :s AND c.relname = ANY(:tables)
+            ),
+            parts AS (
+                SELECT r.relname, ch.oid, ch.reltuples
+                FROM rel r
+                JOIN pg_inherits i ON i.inhparent = r.oid
+                JOIN pg_class ch ON ch.oid = i.inhrelid
+                WHERE r.relkind = 'p'
+                UNION ALL
+                SELECT r.relname, r.oid, r.reltuples
+                FROM rel r
+                WHERE r.relkind <> 'p'
+            )
+            SELECT p.relname AS table_name,
+                   sum(greatest(p.reltuples, 0))::bigint AS reltuples,
+                   bool_or(p.reltuples < 0) AS never_analyzed,
+                   sum(st.n_live_tup)::bigint AS live_tuples,
+                   sum(st.n_dead_tup)::bigint AS dead_tuples,
+                   sum(st.n_mod_since_analyze)::bigint AS modified_since_analyze,
+                   max(greatest(st.last_analyze, st.last_autoanalyze)) AS last_analyzed
+            FROM parts p
+            LEFT JOIN pg_stat_user_tables st ON st.relid = p.oid
+            GROUP BY p.relname
+            """
+        )
+        rows = session.execute(q, {"s": self.reflection.schema, "tables": existing}).mappings().all()
+
+        tables: dict[str, int] = {}
+        stats: dict[str, dict] = {}
+        for r in rows:
+            # reltuples is -1 until the first VACUUM/ANALYZE; fall back to the live tuple counter.
+            est = r["live_tuples"] if r["never_analyzed"] and r["live_tuples"] is not None else r["reltuples"]
+            tables[r["table_name"]] = int(est or 0)
+            stats[r["table_name"]] = {
+                "reltuples": int(r["reltuples"] or 0),
+                "live_tuples": r["live_tuples"],
+                "dead_tuples": r["dead_tuples"],
+                "modified_since_analyze": r["modified_since_analyze"],
+                "last_analyzed": r["last_analyzed"].isoformat() if r["last_analyzed"] else None,
+            }
+
+        return {"mode": "estimate", "tables": {t: tables[t] for t in existing if t in tables}, "stats": stats}
+
+    @cached_result(window=resolve_window)
+    def sales_kpis(
+        self, session: Session, days: int, start: datetime | None = None, end: datetime | None = None
+    ) -> dict:
         """
-        Orders, revenue, AOV for the last N days (excludes cancelled if status exists).
-        Returns: {"days": N, "orders": int, "revenue": float, "aov": float}
+        Orders, revenue, AOV for [start, end) or the last N days (excludes cancelled if status exists).
+        Returns: {"days": N, "start": iso, "end": iso, "orders": int, "revenue": float, "aov": float}
         """
         self.reflection.require_tables("orders")
 
         Orders = self.registry.get("orders")
-        ts = Orders.c[self._orders_ts_col()]
         total = Orders.c[self._orders_total_col()]
-        status_name = self._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
 
-        from datetime import datetime, timedelta, timezone
-
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        start, end = resolve_window(days, start, end)
+        where = self._orders_where(Orders, start, end)
 
         count_expr = func.count()
 
@@ -363,4 +1046,234 @@ class AnalyticsService:
         ).select_from(Orders).where(*where)
 
         row = session.execute(stmt).mappings().one()
-        return {"days": days, **dict(row)}
+        return {"days": window_days(start, end), "start": start.isoformat(), "end": end.isoformat(), **dict(row)}
+
+    # -------- period-over-period --------
+
+    @staticmethod
+    def _json_rows(subq, *order_by):
+        """`[row, ...]` of a subquery as one JSON value, so several result sets fit in one statement."""
+        record = subq.table_valued()
+        agg = func.json_agg(aggregate_order_by(record, *order_by)) if order_by else func.json_agg(record)
+        return select(func.coalesce(agg, text("'[]'::json"))).select_from(subq).scalar_subquery()
+
+    @staticmethod
+    def _ranked_contributors(stmt, limit: int):
+        """Keeps the `limit` biggest gains and the `limit` biggest drops of a grouped (delta) select."""
+        grouped = stmt.subquery("grouped")
+        ranked = select(
+            grouped,
+            func.round(grouped.c.delta / func.nullif(func.sum(grouped.c.delta).over(), 0), 4).label("share_of_change"),
+            func.row_number().over(order_by=grouped.c.delta.desc()).label("gain_rank"),
+            func.row_number().over(order_by=grouped.c.delta.asc()).label("drop_rank"),
+        ).subquery("ranked")
+        gains = and_(ranked.c.gain_rank <= limit, ranked.c.delta > 0)
+        drops = and_(ranked.c.drop_rank <= limit, ranked.c.delta < 0)
+        return select(ranked).where(or_(gains, drops)).subquery("contributors")
+
+    @cached_result(window=resolve_window)
+    def compare_periods(
+        self,
+        session: Session,
+        days: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        compare_start: datetime | None = None,
+        compare_end: datetime | None = None,
+        limit: int = 10,
+    ) -> dict:
+        """
+        Current vs comparison window in one statement: orders are read once (a MATERIALIZED CTE
+        covering both windows, each row flagged), order_items are joined once, and every section
+        is a FILTER aggregate over those two CTEs. Contributors are ranked by revenue delta in SQL.
+        """
+        self.reflection.require_tables("orders")
+
+        Orders = self.registry.get("orders")
+        ts = Orders.c[self._orders_ts_col()]
+        total = Orders.c[self._orders_total_col()]
+        status_name = self._orders_status_col()
+
+        cur = resolve_window(days, start, end)
+        prev = resolve_compare_window(cur, compare_start, compare_end)
+        lo, hi = min(cur[0], prev[0]), max(cur[1], prev[1])
+        in_cur = and_(*self._window_where(ts, *cur))
+        in_prev = and_(*self._window_where(ts, *prev))
+
+        base = (
+            select(
+                Orders.c.order_id,
+                Orders.c.customer_id,
+                total.label("total"),
+                (Orders.c[status_name] if status_name else null()).label("status"),
+                in_cur.label("is_cur"),
+                in_prev.label("is_prev"),
+            )
+            .where(*self._window_where(ts, lo, hi), or_(in_cur, in_prev))
+            .cte("base")
+            .prefix_with("MATERIALIZED")
+        )
+        kept = base.c.status != "cancelled" if status_name else true()
+        cur_ok, prev_ok = and_(base.c.is_cur, kept), and_(base.c.is_prev, kept)
+
+        def money(expr):
+            return func.round(func.coalesce(expr, 0), 2)
+
+        kpis = select(
+            func.count().filter(cur_ok).label("orders_cur"),
+            func.count().filter(prev_ok).label("orders_prev"),
+            money(func.sum(base.c.total).filter(cur_ok)).label("revenue_cur"),
+            money(func.sum(base.c.total).filter(prev_ok)).label("revenue_prev"),
+            func.count(distinct(base.c.customer_id)).filter(cur_ok).label("customers_cur"),
+            func.count(distinct(base.c.customer_id)).filter(prev_ok).label("customers_prev"),
+        ).subquery("kpis")
+        sections = {"kpis": self._json_rows(kpis)}
+
+        if status_name:
+            status_mix = (
+                select(
+                    base.c.status,
+                    func.count().filter(base.c.is_cur).label("orders_cur"),
+                    func.count().filter(base.c.is_prev).label("orders_prev"),
+                )
+                .group_by(base.c.status)
+                .subquery("status_mix")
+            )
+            sections["status_mix"] = self._json_rows(status_mix, status_mix.c.orders_cur.desc())
+
+        revenue_cur = money(func.sum(base.c.total).filter(base.c.is_cur))
+        revenue_prev = money(func.sum(base.c.total).filter(base.c.is_prev))
+        customer_delta = (
+            select(
+                base.c.customer_id,
+                revenue_cur.label("revenue_cur"),
+                revenue_prev.label("revenue_prev"),
+                (revenue_cur - revenue_prev).label("delta"),
+            )
+            .where(kept)
+            .group_by(base.c.customer_id)
+        )
+        customers = self._ranked_contributors(customer_delta, limit)
+        if self.reflection.table_exists("customers"):
+            Customers = self.registry.get("customers")
+            customers = (
+                select(customers, Customers.c.email, Customers.c.full_name)
+                .select_from(customers.outerjoin(Customers, Customers.c.customer_id == customers.c.customer_id))
+                .subquery("customer_contributors")
+            )
+        sections["customers"] = self._json_rows(customers, customers.c.delta)
+
+        if self.reflection.table_exists("order_items"):
+            sections.update(self._compare_items(base, kept, lo, hi, limit, money))
+
+        row = session.execute(select(*(expr.label(name) for name, expr in sections.items()))).mappings().one()
+
+        k = row["kpis"][0]
+        aov_cur = k["revenue_cur"] / k["orders_cur"] if k["orders_cur"] else 0
+        aov_prev = k["revenue_prev"] / k["orders_prev"] if k["orders_prev"] else 0
+        out = {
+            "current": {"start": cur[0].isoformat(), "end": cur[1].isoformat(), "days": window_days(*cur)},
+            "previous": {"start": prev[0].isoformat(), "end": prev[1].isoformat(), "days": window_days(*prev)},
+            "kpis": {
+                "orders": _change(k["orders_cur"], k["orders_prev"]),
+                "revenue": _change(k["revenue_cur"], k["revenue_prev"]),
+                "aov": _change(round(aov_cur, 2), round(aov_prev, 2)),
+                "customers": _change(k["customers_cur"], k["customers_prev"]),
+            },
+            "status_mix": row.get("status_mix", []),
+        }
+        if "margin" in row:
+            m = row["margin"][0]
+            out["margin"] = {
+                "revenue": _change(m["revenue_cur"], m["revenue_prev"]),
+                "cost": _change(m["cost_cur"], m["cost_prev"]) if m["cost_cur"] is not None else None,
+                "gross_margin": _change(m["margin_cur"], m["margin_prev"]) if m["margin_cur"] is not None else None,
+            }
+        for name in ("products", "customers"):
+            if name in row:
+                rows = row[name]
+                out[name] = {
+                    "decliners": [r for r in rows if r["delta"] < 0],
+                    "gainers": sorted((r for r in rows if r["delta"] > 0), key=lambda r: -r["delta"]),
+                }
+        return out
+
+    def _compare_items(self, base, kept, lo: datetime, hi: datetime, limit: int, money) -> dict:
+        Items = self.registry.get("order_items")
+        qty = Items.c[self._order_items_qty_col()]
+        line_total_name = self._order_items_line_total_col()
+        unit_price_name = self._order_items_price_col()
+        unit_cost_name = self._order_items_cost_col()
+        sku_snap, name_snap = self._order_items_snapshot_cols()
+
+        if line_total_name:
+            line_revenue = Items.c[line_total_name]
+        elif unit_price_name:
+            line_revenue = qty * Items.c[unit_price_name]
+        else:
+            raise RuntimeError("order_items needs line_total or (quantity + unit_price).")
+
+        product_cost = (
+            not unit_cost_name
+            and self.reflection.table_exists("products")
+            and "cost" in self.reflection.columns_for("products")
+        )
+        joins = Items.join(base, base.c.order_id == Items.c.order_id)
+        Products = None
+        if not (sku_snap and name_snap) or product_cost:
+            self.reflection.require_tables("products")
+            Products = self.registry.get("products")
+            joins = joins.join(Products, Products.c.product_id == Items.c.product_id)
+
+        if unit_cost_name:
+            line_cost = qty * Items.c[unit_cost_name]
+        elif product_cost:
+            line_cost = qty * Products.c.cost
+        else:
+            line_cost = null()
+
+        where = [kept]
+        part_col = self._items_partition_col()
+        if part_col:
+            where += self._window_where(Items.c[part_col], lo, hi)
+
+        lines = (
+            select(
+                base.c.is_cur,
+                base.c.is_prev,
+                (Items.c[sku_snap] if sku_snap and name_snap else Products.c.sku).label("sku"),
+                (Items.c[name_snap] if sku_snap and name_snap else Products.c.name).label("name"),
+                qty.label("qty"),
+                line_revenue.label("revenue"),
+                cast(line_cost, Numeric).label("cost"),
+            )
+            .select_from(joins)
+            .where(*where)
+            .cte("lines")
+            .prefix_with("MATERIALIZED")
+        )
+
+        revenue_cur = func.sum(lines.c.revenue).filter(lines.c.is_cur)
+        revenue_prev = func.sum(lines.c.revenue).filter(lines.c.is_prev)
+        cost_cur = func.sum(lines.c.cost).filter(lines.c.is_cur)
+        cost_prev = func.sum(lines.c.cost).filter(lines.c.is_prev)
+        margin = select(
+            money(revenue_cur).label("revenue_cur"),
+            money(revenue_prev).label("revenue_prev"),
+            func.round(cost_cur, 2).label("cost_cur"),
+            func.round(cost_prev, 2).label("cost_prev"),
+            func.round(func.coalesce(revenue_cur, 0) - cost_cur, 2).label("margin_cur"),
+            func.round(func.coalesce(revenue_prev, 0) - cost_prev, 2).label("margin_prev"),
+        ).subquery("margin")
+
+        product_delta = select(
+            lines.c.sku,
+            lines.c.name,
+            func.coalesce(func.sum(lines.c.qty).filter(lines.c.is_cur), 0).label("units_cur"),
+            func.coalesce(func.sum(lines.c.qty).filter(lines.c.is_prev), 0).label("units_prev"),
+            money(revenue_cur).label("revenue_cur"),
+            money(revenue_prev).label("revenue_prev"),
+            (money(revenue_cur) - money(revenue_prev)).label("delta"),
+        ).group_by(lines.c.sku, lines.c.name)
+        products = self._ranked_contributors(product_delta, limit)
+        return {"margin": self._json_rows(margin), "products": self._json_rows(products, products.c.delta)}
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import warnings
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.orm import Session
+
+from app.application.services.analytics_service import AnalyticsService, resolve_window
+
+METRICS = ("revenue", "orders", "aov")
+# (step, seasonal period in steps, default trailing baseline in steps)
+SERIES = {
+    "day": (timedelta(days=1), 7, 28),
+    "hour": (timedelta(hours=1), 24, 168),
+}
+MAD_TO_SIGMA = 1.4826
+Z_CAP = 99.0
+
+
+def _trailing(x: np.ndarray, window: int, reduce) -> np.ndarray:
+    """reduce() over the `window` values strictly before each column (NaN where history is short)."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] > window:
+        out[..., window:] = reduce(sliding_window_view(x, window, axis=-1)[..., :-1, :], axis=-1)
+    return out
+
+
+def robust_scores(values: np.ndarray, phase: np.ndarray, window: int, period: int, fit_until: int):
+    """
+    values: metrics x points. Expected value = trailing rolling median x seasonal index, where the
+    index is the median ratio to baseline per phase (weekday / hour of day), fitted on points
+    before `fit_until` only so an anomaly doesn't shape its own expectation. The z-score is the
+    residual over a trailing MAD of past residuals. Returns (expected, z), NaN where undefined.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"), warnings.catch_warnings():
+        # All-NaN windows (no orders yet, no history) are expected; they just stay NaN.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        baseline = _trailing(values, window, np.nanmedian)
+        ratio = values / baseline
+        seasonal = np.ones((values.shape[0], period))
+        for p in range(period):
+            fit = ratio[:, :fit_until][:, phase[:fit_until] == p]
+            if fit.size:
+                seasonal[:, p] = np.nanmedian(fit, axis=1)
+        seasonal = np.where(np.isfinite(seasonal), seasonal, 1.0)
+        expected = baseline * seasonal[:, phase]
+
+        residual = values - expected
+        center = _trailing(residual, window, np.nanmedian)
+        mad = _trailing(np.abs(residual - np.nan_to_num(center)), window, np.nanmedian)
+        scale = MAD_TO_SIGMA * mad
+        # A perfectly flat history has MAD 0; fall back to the mean absolute deviation.
+        mean_ad = _trailing(np.abs(residual), window, np.nanmean) * 1.2533
+        scale = np.where(scale > 0, scale, mean_ad)
+        z = (residual - np.nan_to_num(center)) / scale
+    z = np.where((scale == 0) & (residual == 0), 0.0, z)
+    return expected, np.clip(z, -Z_CAP, Z_CAP)
+
+
+class AnomalyService:
+    def __init__(self, analytics: AnalyticsService):
+        self.analytics = analytics
+
+    def anomalies(
+        self,
+        session: Session,
+        days: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        granularity: str = "day",
+        threshold: float = 3.5,
+        baseline: int | None = None,
+        metrics: list[str] | None = None,
+        limit: int = 20,
+    ) -> dict:
+        """
+        Flags revenue/orders/AOV points that deviate from their seasonal baseline. Reads the series
+        once (window plus two baselines of history) through revenue_by_day, then scores every
+        metric and point at once.
+        """
+        if granularity not in SERIES:
+            raise ValueError(f"granularity must be one of: {', '.join(SERIES)}")
+        metrics = list(metrics or METRICS)
+        unknown = sorted(set(metrics) - set(METRICS))
+        if unknown:
+            raise ValueError(f"Unknown metrics {unknown}. Allowed: {', '.join(METRICS)}")
+        step, period, default_window = SERIES[granularity]
+        window = baseline or default_window
+        if window < 3:
+            raise ValueError("baseline must be at least 3 points.")
+
+        start, end = resolve_window(days, start, end)
+        history = start - 2 * window * step
+        rows = self.analytics.revenue_by_day(session, days=days, start=history, end=end, granularity=granularity)
+
+        n = int((end - history) / step)
+        stamps = [history + i * step for i in range(n)]
+        index = {self._key(s, granularity): i for i, s in enumerate(stamps)}
+        orders = np.zeros(n)
+        revenue = np.zeros(n)
+        for r in rows:
+            i = index.get(self._key(r["bucket"], granularity))
+            if i is not None:
+                orders[i] = float(r["orders"] or 0)
+                revenue[i] = float(r["revenue"] or 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aov = np.where(orders > 0, revenue / orders, np.nan)
+        series = {"revenue": revenue, "orders": orders, "aov": aov}
+        values = np.vstack([series[m] for m in metrics])
+
+        if granularity == "day":
+            phase = np.array([s.weekday() for s in stamps])
+        else:
+            phase = np.array([s.hour for s in stamps])
+        first = index[self._key(start, granularity)]
+        expected, z = robust_scores(values, phase, window, period, fit_until=first)
+
+        # The bucket containing "now" is still filling up and would always look like a drop.
+        now = datetime.now(timezone.utc)
+        complete = np.array([s + step <= now for s in stamps])
+        checked = np.zeros(n, dtype=bool)
+        checked[first:] = True
+        checked &= complete
+
+        score = np.nanmax(np.where(np.isnan(z), -np.inf, np.abs(z)), axis=0)
+        flagged = np.flatnonzero(checked & (score >= threshold))
+        flagged = flagged[np.argsort(-score[flagged], kind="stable")][:limit]
+
+        anomalies = []
+        for i in sorted(flagged):
+            point = {"bucket": stamps[i].date().isoformat() if granularity == "day" else stamps[i].isoformat()}
+            worst = int(np.nanargmax(np.abs(np.where(np.isnan(z[:, i]), 0, z[:, i]))))
+            point["score"] = round(float(score[i]), 2)
+            point["metric"] = metrics[worst]
+            point["direction"] = "drop" if z[worst, i] < 0 else "spike"
+            for m, metric in enumerate(metrics):
+                point[metric] = {
+                    "value": self._num(values[m, i]),
+                    "expected": self._num(expected[m, i]),
+                    "z": self._num(z[m, i]),
+                }
+            anomalies.append(point)
+
+        return {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "granularity": granularity,
+            "baseline_points": window,
+            "threshold": threshold,
+            "metrics": metrics,
+            "points_checked": int(checked.sum()),
+            "flagged": int(np.count_nonzero(checked & (score >= threshold))),
+            "anomalies": anomalies,
+        }
+
+    @staticmethod
+    def _key(bucket, granularity: str):
+        if granularity == "day":
+            return bucket.date() if isinstance(bucket, datetime) else bucket
+        if isinstance(bucket, datetime):
+            if bucket.tzinfo is not None:
+                bucket = bucket.astimezone(timezone.utc)
+            return bucket.replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        return datetime.combine(bucket, datetime.min.time()) if isinstance(bucket, date) else bucket
+
+    @staticmethod
+    def _num(v: float) -> float | None:
+        return round(float(v), 2) if np.isfinite(v) else None
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import inspect
+import time
+from datetime import datetime
+from typing import Callable
+
+from app.application.services.admission_service import parallel_budget
+from app.application.services.analytics_service import AnalyticsService
+from app.infrastructure.db.parallel import run_parallel
+from app.infrastructure.db.uow import SqlAlchemyUnitOfWork
+
+# AnalyticsService methods that are safe to fan out (read-only, session-scoped).
+BATCHABLE_METHODS = (
+    "revenue_by_day",
+    "top_products_last_days",
+    "top_customers_last_days",
+    "repeat_purchase_rate",
+    "gross_margin_last_days",
+    "sales_kpis",
+    "low_stock",
+    "table_counts",
+)
+
+
+class BatchService:
+    def __init__(
+        self,
+        analytics: AnalyticsService,
+        uow_factory: Callable[[], SqlAlchemyUnitOfWork],
+        max_workers: int,
+        max_requests: int,
+    ):
+        self.analytics = analytics
+        self.uow_factory = uow_factory
+        self.max_workers = max_workers
+        self.max_requests = max_requests
+
+    @staticmethod
+    def _coerce_args(args: dict) -> dict:
+        out = dict(args)
+        for k in ("start", "end"):
+            if isinstance(out.get(k), str):
+                out[k] = datetime.fromisoformat(out[k])
+        return out
+
+    def _prepare(self, method: str, args: dict | None):
+        if method not in BATCHABLE_METHODS:
+            raise ValueError(f"Unknown method '{method}'. Allowed: {', '.join(BATCHABLE_METHODS)}.")
+        fn = getattr(self.analytics, method)
+        kwargs = self._coerce_args(args or {})
+        # Fail fast on bad arguments instead of burning a connection on a TypeError.
+        inspect.signature(fn).bind(None, **kwargs)
+        return lambda session: fn(session, **kwargs)
+
+    def run(self, requests: list[dict]) -> dict:
+        if not requests:
+            raise ValueError("requests must contain at least one {method, args} item.")
+        if len(requests) > self.max_requests:
+            raise ValueError(f"At most {self.max_requests} requests per batch.")
+
+        results: list[dict | None] = [None] * len(requests)
+        calls, slots = [], []
+        for i, req in enumerate(requests):
+            method = req.get("method", "")
+            try:
+                calls.append(self._prepare(method, req.get("args")))
+                slots.append(i)
+            except (ValueError, TypeError) as e:
+                results[i] = {"method": method, "ok": False, "error": str(e), "elapsed_ms": 0.0}
+
+        t0 = time.perf_counter()
+        outcomes = run_parallel(self.uow_factory, calls, parallel_budget(self.max_workers))
+        for i, outcome in zip(slots, outcomes):
+            results[i] = {"method": requests[i].get("method"), **outcome}
+
+        return {
+            "results": results,
+            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+            "max_workers": min(parallel_budget(self.max_workers), max(len(calls), 1)),
+        }
+
+    def table_counts(self, timeout_ms: int) -> dict:
+        """Exact COUNT(*) per table, in parallel, each bounded by its own statement timeout."""
+        tables = self.analytics.counted_tables()
+        if not tables:
+            return {"mode": "exact", "tables": {}, "note": "No known tables found."}
+
+        calls = [lambda session, t=t: self.analytics.count_table(session, t, timeout_ms=timeout_ms) for t in tables]
+        outcomes = run_parallel(self.uow_factory, calls, parallel_budget(self.max_workers))
+
+        counts: dict[str, int] = {}
+        errors: dict[str, str] = {}
+        for t, outcome in zip(tables, outcomes):
+            if outcome["ok"]:
+                counts[t] = outcome["result"]
+            else:
+                errors[t] = outcome["error"]
+
+        out = {"mode": "exact", "tables": counts, "timeout_ms": timeout_ms}
+        if errors:
+            out["errors"] = errors
+        return out
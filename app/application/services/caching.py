@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import functools
+import inspect
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from app.infrastructure.cache.singleflight import SingleFlight
+from app.infrastructure.cache.store import cache_key
+
+Window = Callable[..., tuple[datetime, datetime]]
+
+# Shared by every service instance in the process; keys include the instance, i.e. the tenant.
+flights = SingleFlight()
+
+
+def cached_result(window: Window | None = None, volatile: bool = False, unkeyed: tuple[str, ...] = ()) -> Callable:
+    """
+    Caches a service method's result in `self.cache` (a ScopedCache, or None to disable).
+
+    The key is the method name plus its arguments (minus the session and any `unkeyed` ones,
+    e.g. progress callbacks); with `window` given, `days`/`start`/`end` are also resolved to the
+    day-aligned window. Results for windows that already ended use the long TTL; the current
+    window, and anything `volatile` (depends on "now" or live stock), the short one.
+
+    Identical calls that arrive while one is running (same service instance, arguments and
+    window) share that execution through `flights`, whether or not the cache is enabled.
+    """
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        sig = inspect.signature(fn)
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(self, session, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            bound = sig.bind(self, session, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k not in ("self", "session", *unkeyed)}
+            closed = False
+            if window is not None:
+                start, end = window(params["days"], params.get("start"), params.get("end"))
+                params["window"] = [start.isoformat(), end.isoformat()]
+                closed = end <= datetime.now(timezone.utc)
+
+            if cache is None:
+                return flights.do((id(self), name, cache_key(params)), lambda: fn(self, session, *args, **kwargs))
+
+            # Keyed to the data as well: writes to past windows (late orders, cancellations) are seen.
+            key = cache.key(name, params, cache.data_version(session))
+            hit = cache.get(key)
+            if hit is not None:
+                return hit.value
+
+            def run() -> Any:
+                value = fn(self, session, *args, **kwargs)
+                cache.put(key, value, name=name, ttl_s=cache.ttl_for(closed and not volatile))
+                return value
+
+            return flights.do((id(self), key), run)
+
+        return wrapper
+
+    return decorate
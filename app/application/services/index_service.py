@@ -0,0 +1,467 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.application.services.analytics_service import AnalyticsService
+from app.config.settings import Settings
+from app.infrastructure.db.reflection import SchemaReflection
+
+# Tables at or above this size with a well-correlated timestamp get a BRIN recommendation
+# instead of a (much larger) B-tree on the order timestamp.
+BRIN_MIN_ROWS = 1_000_000
+BRIN_MIN_CORRELATION = 0.9
+
+# Window assumed by the analytics tools when estimating selectivity (their default `days`).
+TYPICAL_WINDOW_DAYS = 30
+
+# Postgres truncates longer identifiers, which would break the ATTACH that names them.
+MAX_IDENT_LEN = 63
+
+
+def _partition_index_name(parent_index: str, partition: str) -> str:
+    name = f"{parent_index}_{partition}"
+    if len(name) <= MAX_IDENT_LEN:
+        return name
+    return f"{name[: MAX_IDENT_LEN - 9]}_{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _same_predicate(indexed: str, wanted: str | None) -> bool:
+    # pg_get_expr() renders casts and ANY(ARRAY[...]); compare the literal set and polarity instead.
+    if not wanted:
+        return False
+    same_literals = set(re.findall(r"'([^']*)'", indexed)) == set(re.findall(r"'([^']*)'", wanted))
+    same_polarity = ("<>" in indexed or "!=" in indexed) == ("<>" in wanted)
+    return same_literals and same_polarity
+
+
+@dataclass(frozen=True)
+class IndexCandidate:
+    name: str
+    table: str
+    columns: tuple[str, ...]
+    purpose: str  # "window" | "backlog" | "join"
+    method: str = "btree"
+    include: tuple[str, ...] = ()
+    where: str | None = None
+    serves: tuple[str, ...] = ()
+
+    def ddl(
+        self, quote, schema: str, table: str | None = None, name: str | None = None, only: bool = False
+    ) -> str:
+        # CONCURRENTLY is rejected on partitioned parents; those get a plain ON ONLY build instead.
+        cols = ", ".join(quote(c) for c in self.columns)
+        create = "CREATE INDEX IF NOT EXISTS" if only else "CREATE INDEX CONCURRENTLY IF NOT EXISTS"
+        target = f"{quote(schema)}.{quote(table or self.table)}"
+        sql = (
+            f"{create} {quote(name or self.name)} "
+            f"ON {'ONLY ' if only else ''}{target} USING {self.method} ({cols})"
+        )
+        if self.include:
+            sql += " INCLUDE (" + ", ".join(quote(c) for c in self.include) + ")"
+        if self.where:
+            sql += f" WHERE {self.where}"
+        return sql
+
+
+class IndexAdvisorService:
+    """
+    Checks that the predicates/joins used by AnalyticsService are backed by indexes and
+    recommends covering, partial or BRIN indexes where they are not.
+    """
+
+    def __init__(self, settings: Settings, engine: Engine, reflection: SchemaReflection, analytics: AnalyticsService):
+        self.settings = settings
+        self.engine = engine
+        self.reflection = reflection
+        self.analytics = analytics
+
+    def _require_writes_enabled(self) -> None:
+        if not self.settings.allow_writes:
+            raise PermissionError("Writes are disabled. Set ALLOW_WRITES=1 to enable index creation.")
+
+    def _quote(self, ident: str) -> str:
+        return self.engine.dialect.identifier_preparer.quote(ident)
+
+    # -------- candidates derived from the columns the analytics queries pick --------
+
+    def _candidates(self) -> list[IndexCandidate]:
+        a = self.analytics
+        out: list[IndexCandidate] = []
+
+        if self.reflection.table_exists("orders"):
+            order_cols = self.reflection.columns_for("orders")
+            ts = a._orders_ts_col()
+            total = a._orders_total_col()
+            status = a._orders_status_col()
+            include = tuple(c for c in (total, "customer_id", "order_id") if c in order_cols and c != ts)
+
+            if status:
+                out.append(
+                    IndexCandidate(
+                        name=f"ix_orders_{ts}_not_cancelled",
+                        table="orders",
+                        columns=(ts,),
+                        purpose="window",
+                        include=include,
+                        where=f"{self._quote(status)} <> 'cancelled'",
+                        serves=("revenue_by_day", "top_customers_last_days", "repeat_purchase_rate", "sales_kpis"),
+                    )
+                )
+                out.append(
+                    IndexCandidate(
+                        name=f"ix_orders_{ts}_backlog",
+                        table="orders",
+                        columns=(ts,),
+                        purpose="backlog",
+                        where=f"{self._quote(status)} IN ('pending', 'processing')",
+                        serves=("ops_health_report",),
+                    )
+                )
+            else:
+                out.append(
+                    IndexCandidate(
+                        name=f"ix_orders_{ts}",
+                        table="orders",
+                        columns=(ts,),
+                        purpose="window",
+                        include=include,
+                        serves=("revenue_by_day", "top_customers_last_days", "repeat_purchase_rate", "sales_kpis"),
+                    )
+                )
+
+        if self.reflection.table_exists("order_items"):
+            item_cols = self.reflection.columns_for("order_items")
+            value_cols = (
+                a._order_items_qty_col(),
+                a._order_items_line_total_col() or a._order_items_price_col(),
+                a._order_items_cost_col(),
+            )
+            include = tuple(c for c in ("product_id", *value_cols) if c and c in item_cols)
+            if "order_id" in item_cols:
+                out.append(
+                    IndexCandidate(
+                        name="ix_order_items_order_id",
+                        table="order_items",
+                        columns=("order_id",),
+                        purpose="join",
+                        include=include,
+                        serves=("top_products_last_days", "gross_margin_last_days"),
+                    )
+                )
+            if "product_id" in item_cols:
+                out.append(
+                    IndexCandidate(
+                        name="ix_order_items_product_id",
+                        table="order_items",
+                        columns=("product_id",),
+                        purpose="join",
+                        serves=("top_products_last_days", "gross_margin_last_days"),
+                    )
+                )
+
+        return out
+
+    # -------- catalog inspection --------
+
+    def _existing_indexes(self, session: Session, tables: list[str]) -> dict[str, list[dict]]:
+        q = text(
+            """
+            SELECT t.relname AS table_name,
+                   i.relname AS index_name,
+                   am.amname AS method,
+                   ix.indisvalid AS is_valid,
+                   ix.indnkeyatts AS n_key,
+                   ARRAY(
+                       SELECT a.attname
+                       FROM unnest(ix.indkey::int2[]) WITH ORDINALITY AS k(attnum, ord)
+                       JOIN pg_attribute a ON a.attrelid = ix.indrelid AND a.attnum = k.attnum
+                       ORDER BY k.ord
+                   ) AS columns,
+                   pg_get_expr(ix.indpred, ix.indrelid) AS predicate,
+                   pg_get_indexdef(ix.indexrelid) AS indexdef
+            FROM pg_index ix
+            JOIN pg_class i ON i.oid = ix.indexrelid
+            JOIN pg_class t ON t.oid = ix.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            JOIN pg_am am ON am.oid = i.relam
+            WHERE n.nspname = :s AND t.relname = ANY(:tables)
+            """
+        )
+        out: dict[str, list[dict]] = {t: [] for t in tables}
+        for r in session.execute(q, {"s": self.reflection.schema, "tables": tables}).mappings().all():
+            cols = list(r["columns"] or [])
+            n_key = int(r["n_key"] or len(cols))
+            out[r["table_name"]].append(
+                {
+                    "name": r["index_name"],
+                    "method": r["method"],
+                    "valid": bool(r["is_valid"]),
+                    "key_columns": cols[:n_key],
+                    "include_columns": cols[n_key:],
+                    "predicate": r["predicate"],
+                    "indexdef": r["indexdef"],
+                }
+            )
+        return out
+
+    def _table_stats(self, session: Session, tables: list[str]) -> dict[str, dict]:
+        # Partitioned parents hold no rows themselves; sum their leaf partitions.
+        q = text(
+            """
+            SELECT c.relname AS table_name,
+                   c.relkind = 'p' AS partitioned,
+                   sum(greatest(l.reltuples, 0))::bigint AS est_rows,
+                   sum(l.relpages)::bigint AS pages
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            CROSS JOIN LATERAL pg_partition_tree(c.oid) t
+            JOIN pg_class l ON l.oid = t.relid
+            WHERE n.nspname = :s AND c.relname = ANY(:tables) AND t.isleaf
+            GROUP BY c.relname, c.relkind
+            """
+        )
+        return {
+            r["table_name"]: {
+                "est_rows": int(r["est_rows"] or 0),
+                "pages": int(r["pages"] or 0),
+                "partitioned": bool(r["partitioned"]),
+            }
+            for r in session.execute(q, {"s": self.reflection.schema, "tables": tables}).mappings().all()
+        }
+
+    def _partitions(self, session: Session, table: str) -> dict[tuple[str, str], list[tuple[str, str]]]:
+        """Direct partitions of each partitioned table in the tree under `table`, keyed by (schema, name)."""
+        q = text(
+            """
+            SELECT pn.nspname AS parent_schema, p.relname AS parent,
+                   cn.nspname AS child_schema, c.relname AS child, c.relkind = 'p' AS partitioned
+            FROM pg_partition_tree(to_regclass(:rel)) t
+            JOIN pg_class c ON c.oid = t.relid
+            JOIN pg_namespace cn ON cn.oid = c.relnamespace
+            JOIN pg_class p ON p.oid = t.parentrelid
+            JOIN pg_namespace pn ON pn.oid = p.relnamespace
+            ORDER BY t.level, c.relname
+            """
+        )
+        rel = f"{self._quote(self.reflection.schema)}.{self._quote(table)}"
+        out: dict[tuple[str, str], list[tuple[str, str]]] = {(self.reflection.schema, table): []}
+        for r in session.execute(q, {"rel": rel}).mappings().all():
+            out.setdefault((r["parent_schema"], r["parent"]), []).append((r["child_schema"], r["child"]))
+            if r["partitioned"]:
+                out.setdefault((r["child_schema"], r["child"]), [])
+        return out
+
+    def _steps(self, cand: IndexCandidate, partitions: dict[tuple[str, str], list[tuple[str, str]]]) -> list[str]:
+        """
+        DDL for `cand`. A partitioned parent gets an invalid ON ONLY index, a CONCURRENTLY build on
+        each partition (recursing into sub-partitioned ones) and an ATTACH per partition; the
+        parent index turns valid once every partition is attached.
+        """
+        q = self._quote
+
+        def build(schema: str, table: str, name: str) -> list[str]:
+            if (schema, table) not in partitions:
+                return [cand.ddl(q, schema, table, name)]
+            steps = [cand.ddl(q, schema, table, name, only=True)]
+            for child_schema, child in partitions[(schema, table)]:
+                child_index = _partition_index_name(name, child)
+                steps += build(child_schema, child, child_index)
+                steps.append(
+                    f"ALTER INDEX {q(schema)}.{q(name)} ATTACH PARTITION {q(child_schema)}.{q(child_index)}"
+                )
+            return steps
+
+        return build(self.reflection.schema, cand.table, cand.name)
+
+    def _column_stats(self, session: Session, tables: list[str]) -> dict[tuple[str, str], dict]:
+        q = text(
+            """
+            SELECT tablename, attname, null_frac, n_distinct, correlation,
+                   most_common_vals::text::text[] AS mcv,
+                   most_common_freqs AS mcf,
+                   histogram_bounds::text::text[] AS bounds
+            FROM pg_stats
+            WHERE schemaname = :s AND tablename = ANY(:tables)
+            """
+        )
+        return {
+            (r["tablename"], r["attname"]): dict(r)
+            for r in session.execute(q, {"s": self.reflection.schema, "tables": tables}).mappings().all()
+        }
+
+    # -------- estimates --------
+
+    @staticmethod
+    def _value_freq(col_stats: dict | None, values: tuple[str, ...]) -> float | None:
+        if not col_stats or not col_stats.get("mcv"):
+            return None
+        freqs = dict(zip(col_stats["mcv"], col_stats["mcf"] or []))
+        return float(sum(freqs.get(v, 0.0) for v in values))
+
+    @staticmethod
+    def _window_fraction(col_stats: dict | None) -> float:
+        bounds = (col_stats or {}).get("bounds") or []
+        try:
+            lo = datetime.fromisoformat(str(bounds[0]))
+            hi = datetime.fromisoformat(str(bounds[-1]))
+            span_days = max((hi - lo).total_seconds() / 86400.0, 1.0)
+        except (IndexError, ValueError):
+            span_days = 365.0
+        return min(1.0, TYPICAL_WINDOW_DAYS / span_days)
+
+    def _selectivity(self, cand: IndexCandidate, stats: dict[tuple[str, str], dict], rows: int) -> float:
+        if cand.purpose == "backlog":
+            # The partial index only holds open orders, whatever the window.
+            status = self.analytics._orders_status_col()
+            backlog = self._value_freq(stats.get(("orders", status)), ("pending", "processing"))
+            return backlog if backlog is not None else 0.1
+        if cand.purpose == "window":
+            return self._window_fraction(stats.get((cand.table, cand.columns[0])))
+
+        col = stats.get((cand.table, cand.columns[0]))
+        n_distinct = float((col or {}).get("n_distinct") or 0.0)
+        if n_distinct < 0:
+            n_distinct = -n_distinct * rows
+        return 1.0 / n_distinct if n_distinct >= 1 else 0.01
+
+    @staticmethod
+    def _benefit(rows: int, selectivity: float) -> str:
+        if rows < 10_000:
+            return "low"
+        reduction = 1.0 / max(selectivity, 1e-9)
+        if reduction >= 10:
+            return "high"
+        if reduction >= 3:
+            return "medium"
+        return "low"
+
+    # -------- public API --------
+
+    def advise(self, session: Session) -> dict:
+        self.reflection.require_tables("orders")
+
+        candidates = self._candidates()
+        tables = sorted({c.table for c in candidates})
+        existing = self._existing_indexes(session, tables)
+        table_stats = self._table_stats(session, tables)
+        col_stats = self._column_stats(session, tables)
+        partitions: dict[tuple[str, str], list[tuple[str, str]]] = {}
+        for table in tables:
+            if table_stats.get(table, {}).get("partitioned"):
+                partitions.update(self._partitions(session, table))
+
+        recs = []
+        for cand in candidates:
+            tstats = table_stats.get(cand.table, {"est_rows": 0, "pages": 0, "partitioned": False})
+            rows, pages = tstats["est_rows"], tstats["pages"]
+            lead = col_stats.get((cand.table, cand.columns[0]))
+
+            if cand.purpose == "window":
+                corr = abs(float((lead or {}).get("correlation") or 0.0))
+                if rows >= BRIN_MIN_ROWS and corr >= BRIN_MIN_CORRELATION:
+                    cand = IndexCandidate(
+                        name=f"brin_orders_{cand.columns[0]}",
+                        table=cand.table,
+                        columns=cand.columns,
+                        purpose=cand.purpose,
+                        method="brin",
+                        serves=cand.serves,
+                    )
+
+            status, matched = self._coverage(cand, existing.get(cand.table, []))
+            selectivity = self._selectivity(cand, col_stats, rows)
+
+            rec = {
+                "name": cand.name,
+                "table": cand.table,
+                "method": cand.method,
+                "purpose": cand.purpose,
+                "columns": list(cand.columns),
+                "include": list(cand.include),
+                "where": cand.where,
+                "serves": list(cand.serves),
+                "status": status,
+                "existing_index": matched,
+                "est_rows": rows,
+                "est_selectivity": round(selectivity, 6),
+                "est_pages_saved": int(pages * (1.0 - min(selectivity, 1.0))),
+                "estimated_benefit": "none" if status == "present" else self._benefit(rows, selectivity),
+            }
+            steps = self._steps(cand, partitions)
+            rec["ddl"] = ";\n".join(steps)
+            if tstats.get("partitioned"):
+                rec["partitioned"] = True
+                rec["steps"] = steps
+            if lead is None:
+                rec["note"] = "No pg_stats for the leading column; run ANALYZE for better estimates."
+            recs.append(rec)
+
+        order = {"high": 0, "medium": 1, "low": 2, "none": 3}
+        recs.sort(key=lambda r: (order[r["estimated_benefit"]], r["table"], r["name"]))
+
+        return {
+            "schema": self.reflection.schema,
+            "recommendations": recs,
+            "existing_indexes": existing,
+            "table_stats": table_stats,
+        }
+
+    @staticmethod
+    def _coverage(cand: IndexCandidate, existing: list[dict]) -> tuple[str, str | None]:
+        best: tuple[str, str | None] = ("missing", None)
+        for ix in existing:
+            if not ix["valid"] or not ix["key_columns"] or ix["key_columns"][0] != cand.columns[0]:
+                continue
+            if cand.method == "brin" or ix["method"] == "brin":
+                if ix["method"] == cand.method:
+                    return "present", ix["name"]
+                continue
+            if ix["predicate"] and not _same_predicate(ix["predicate"], cand.where):
+                # A differently-filtered partial index does not serve this predicate.
+                continue
+            covered = set(ix["key_columns"]) | set(ix["include_columns"])
+            if all(c in covered for c in cand.include):
+                return "present", ix["name"]
+            best = ("partial", ix["name"])
+        return best
+
+    def create_indexes(self, session: Session, names: list[str] | None = None) -> dict:
+        """
+        Creates missing/partial recommendations with CREATE INDEX CONCURRENTLY. CONCURRENTLY
+        cannot run inside a transaction block, so DDL goes through an AUTOCOMMIT connection.
+        Partitioned tables run their `steps` in order and stop at the first failure; every step
+        is idempotent, so a rerun resumes where it stopped.
+        """
+        self._require_writes_enabled()
+
+        advice = self.advise(session)
+        todo = [r for r in advice["recommendations"] if r["status"] != "present"]
+        if names:
+            wanted = set(names)
+            todo = [r for r in todo if r["name"] in wanted]
+
+        created, failed = [], []
+        with self.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for r in todo:
+                steps = r.get("steps") or [r["ddl"]]
+                for i, stmt in enumerate(steps):
+                    try:
+                        conn.exec_driver_sql(stmt)
+                    except Exception as e:
+                        # A failed CONCURRENTLY build leaves an INVALID index behind; surface it.
+                        err = {"name": r["name"], "error": str(e).splitlines()[0]}
+                        if r.get("partitioned"):
+                            err["step"] = stmt
+                        failed.append(err)
+                        break
+                else:
+                    created.append(r["name"])
+
+        return {"created": created, "failed": failed, "recommendations": advice["recommendations"]}
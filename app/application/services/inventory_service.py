@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Callable
+
+from sqlalchemy import BigInteger, delete, func, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config.settings import Settings
+from app.infrastructure.db.inventory import SNAPSHOT_TABLE, STATE_TABLE, movement_columns, snapshot_tables
+from app.infrastructure.db.locks import try_xact_lock, xact_lock
+from app.infrastructure.db.reflection import SchemaReflection
+from app.infrastructure.db.tables import TableRegistry
+from app.infrastructure.db.uow import SqlAlchemyUnitOfWork
+
+log = logging.getLogger(__name__)
+
+
+class InventoryService:
+    """
+    Maintains `inventory_snapshot` (on hand per product) from `stock_movements`.
+
+    A refresh applies only the movements above the stored high-water mark, so its cost follows
+    the movements since the last refresh rather than the whole history. Readers add the few
+    movements newer than the mark on the fly (see AnalyticsService.low_stock).
+    """
+
+    def __init__(self, settings: Settings, reflection: SchemaReflection, registry: TableRegistry):
+        self.settings = settings
+        self.reflection = reflection
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _require_writes_enabled(self) -> None:
+        if not self.settings.allow_writes:
+            raise PermissionError("Writes are disabled. Set ALLOW_WRITES=1 to maintain the inventory snapshot.")
+
+    def exists(self) -> bool:
+        return self.reflection.table_exists(SNAPSHOT_TABLE) and self.reflection.table_exists(STATE_TABLE)
+
+    def _ensure_tables(self, session: Session):
+        """(snapshot, state, created). Creates the tables in the session's transaction if missing."""
+        Stock = self.registry.get("stock_movements")
+        snapshot, state = snapshot_tables(self.reflection.schema, Stock.c.product_id.type)
+        if self.exists():
+            return snapshot, state, False
+        conn = session.connection()
+        snapshot.create(conn, checkfirst=True)
+        state.create(conn, checkfirst=True)
+        return snapshot, state, True
+
+    def _lock_name(self) -> str:
+        return f"{self.reflection.schema}.{SNAPSHOT_TABLE}"
+
+    def refresh(self, session: Session, full: bool = False, skip_if_busy: bool = False) -> dict | None:
+        """
+        Applies new stock movements to the snapshot (creating it on first use). `full=True`
+        recomputes every product, needed after movements were deleted or ids restarted.
+
+        Refreshes of a schema are serialized by an advisory lock, across processes as well: two
+        concurrent incremental refreshes would both add the same delta. With `skip_if_busy=True`
+        nothing is done (and None returned) while another session is refreshing.
+        """
+        self._require_writes_enabled()
+        self.reflection.require_tables("stock_movements", "products")
+
+        created = False
+        with session.begin():
+            if skip_if_busy:
+                if not try_xact_lock(session, self._lock_name()):
+                    return None
+            else:
+                xact_lock(session, self._lock_name())
+            Snapshot, State, created = self._ensure_tables(session)
+            Stock = self.registry.get("stock_movements")
+            Products = self.registry.get("products")
+            id_name, qty_name = movement_columns(Stock)
+            movement_id, qty = Stock.c[id_name], Stock.c[qty_name]
+
+            # SHARE waits for in-flight inserts and blocks new ones until commit: every id up to
+            # max(id) is committed, so ids allocated out of commit order can't slip under the mark.
+            table = session.get_bind().dialect.identifier_preparer.format_table(Stock)
+            session.execute(text(f"LOCK TABLE {table} IN SHARE MODE"))
+
+            previous = session.execute(select(State.c.high_water_mark)).scalar()
+            mark = session.execute(select(func.coalesce(func.max(movement_id), 0))).scalar()
+            full = full or previous is None or previous > mark
+
+            if full:
+                session.execute(delete(Snapshot))
+                totals = select(Stock.c.product_id, func.sum(qty).label("on_hand")).group_by(Stock.c.product_id)
+                totals = totals.where(movement_id <= mark).subquery("totals")
+                rows = select(Products.c.product_id, func.coalesce(totals.c.on_hand, 0)).select_from(
+                    Products.outerjoin(totals, totals.c.product_id == Products.c.product_id)
+                )
+                applied = session.execute(pg_insert(Snapshot).from_select(["product_id", "on_hand"], rows)).rowcount
+            else:
+                delta = (
+                    select(Stock.c.product_id, func.sum(qty).label("on_hand"))
+                    .where(movement_id > previous, movement_id <= mark)
+                    .group_by(Stock.c.product_id)
+                )
+                upsert = pg_insert(Snapshot).from_select(["product_id", "on_hand"], delta)
+                upsert = upsert.on_conflict_do_update(
+                    index_elements=[Snapshot.c.product_id],
+                    set_={"on_hand": Snapshot.c.on_hand + upsert.excluded.on_hand, "updated_at": func.now()},
+                )
+                applied = session.execute(upsert).rowcount
+                # Products created since the last refresh, so zero-stock items are listed too.
+                missing = select(Products.c.product_id, literal(0, BigInteger)).where(
+                    ~select(Snapshot.c.product_id).where(Snapshot.c.product_id == Products.c.product_id).exists()
+                )
+                session.execute(
+                    pg_insert(Snapshot).from_select(["product_id", "on_hand"], missing).on_conflict_do_nothing()
+                )
+
+            state = pg_insert(State).values(id=True, high_water_mark=mark)
+            session.execute(
+                state.on_conflict_do_update(
+                    index_elements=[State.c.id], set_={"high_water_mark": mark, "refreshed_at": func.now()}
+                )
+            )
+
+        if created:
+            # Only now that the tables are committed: cleared earlier, a concurrent reader could
+            # re-reflect (and persist to the snapshot store) a schema without them.
+            self.reflection.clear_cache()
+            self.registry.clear_cache()
+
+        return {
+            "mode": "full" if full else "incremental",
+            "previous_high_water_mark": previous,
+            "high_water_mark": mark,
+            "products_updated": applied,
+        }
+
+    # -------- background refresh --------
+
+    def start(self, uow_factory: Callable[[], SqlAlchemyUnitOfWork], interval_s: float) -> None:
+        if interval_s <= 0 or not self.settings.allow_writes or self._thread is not None:
+            return
+
+        # Every HTTP worker runs this loop; the advisory lock in `refresh` lets one of them do the
+        # work per tick while the others skip instead of queueing up behind it.
+        def loop() -> None:
+            while not self._stop.wait(interval_s):
+                if not self.exists():
+                    continue
+                try:
+                    with uow_factory() as uow:
+                        self.refresh(uow.session, skip_if_busy=True)
+                except Exception as e:
+                    log.warning("inventory snapshot refresh failed: %s", str(e).splitlines()[0])
+
+        self._thread = threading.Thread(target=loop, name="inventory-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -1,18 +1,58 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
+from typing import Callable
 
 from sqlalchemy import select, func, case
 from sqlalchemy.orm import Session
 
-from app.application.services.analytics_service import AnalyticsService
+from app.application.services.analytics_service import AnalyticsService, resolve_granularity, resolve_window
+from app.application.services.caching import cached_result
+from app.infrastructure.cache.store import ScopedCache
+
+# on_section(sections_done, sections_total, section_markdown)
+SectionCallback = Callable[[int, int, str], None]
+
+
+def window_label(days: int, start: datetime, end: datetime, explicit: bool) -> str:
+    if explicit:
+        return f"**{start.isoformat()}** to **{end.isoformat()}** (end exclusive)"
+    return f"last **{days} days**"
+
+
+class ReportSections:
+    """Markdown report assembled section by section; each finished section goes to `on_section`."""
+
+    def __init__(self, header: list[str], total: int, on_section: SectionCallback | None = None):
+        self.parts = ["\n".join(header)]
+        self.total = total
+        self.on_section = on_section
+
+    def add(self, lines: list[str]) -> None:
+        md = "\n".join(lines).strip()
+        self.parts.append(md)
+        if self.on_section is not None:
+            self.on_section(len(self.parts) - 1, self.total, md)
+
+    def markdown(self) -> str:
+        return "\n\n".join(self.parts).strip()
 
 
 class OpsService:
-    def __init__(self, analytics: AnalyticsService):
+    def __init__(self, analytics: AnalyticsService, cache: ScopedCache | None = None):
         self.analytics = analytics
-
-    def ops_health_report(self, session: Session, days: int, low_stock_threshold: int) -> str:
+        self.cache = cache
+
+    @cached_result(window=resolve_window, volatile=True, unkeyed=("on_section",))
+    def ops_health_report(
+        self,
+        session: Session,
+        days: int,
+        low_stock_threshold: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        on_section: SectionCallback | None = None,
+    ) -> str:
         self.analytics.reflection.require_tables("orders")
 
         Orders = self.analytics.registry.get("orders")
@@ -20,18 +60,21 @@ class OpsService:
         status_name = self.analytics._orders_status_col()
         status_col = Orders.c[status_name] if status_name else None
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
+        explicit = start is not None or end is not None
+        start, end = resolve_window(days, start, end)
+        window = self.analytics._window_where(ts, start, end)
 
-        md = ["# Ops health report", f"- Window: last **{days} days**", ""]
+        report = ReportSections(
+            ["# Ops health report", f"- Window: {window_label(days, start, end, explicit)}"], 3, on_section
+        )
 
-        md.append("## Order status mix")
+        md = ["## Order status mix"]
         if status_col is None:
             md.append("_No `status` column on orders._")
-            md.append("")
         else:
             stmt = (
                 select(status_col.label("status"), func.count().label("orders"))
-                .where(ts >= start)
+                .where(*window)
                 .group_by(status_col)
                 .order_by(func.count().desc())
             )
@@ -41,20 +84,20 @@ class OpsService:
             else:
                 for r in rows:
                     md.append(f"- **{r['status']}**: {r['orders']}")
-            md.append("")
+        report.add(md)
 
-        md.append("## Backlog")
-        older_than = datetime.now(timezone.utc) - timedelta(hours=24)
+        # Minute precision keeps the bound a stable constant across calls.
+        older_than = datetime.now(timezone.utc).replace(second=0, microsecond=0) - timedelta(hours=24)
+        backlog_end = min(end, older_than)
 
-        where = [ts < older_than, ts >= start]
+        where = self.analytics._window_where(ts, start, max(start, backlog_end))
         if status_col is not None:
             where.append(status_col.in_(["pending", "processing"]))
 
         pending_count = session.execute(select(func.count()).select_from(Orders).where(*where)).scalar_one()
-        md.append(f"- Orders older than 24h still pending/processing: **{int(pending_count)}**")
-        md.append("")
+        report.add(["## Backlog", f"- Orders older than 24h still pending/processing: **{int(pending_count)}**"])
 
-        md.append("## Inventory (low stock)")
+        md = ["## Inventory (low stock)"]
         try:
             rows = self.analytics.low_stock(session, threshold=low_stock_threshold, limit=15)
             if not rows:
@@ -65,22 +108,30 @@ class OpsService:
                     md.append(f"  - `{r['sku']}` {r['name']} — on_hand={r['on_hand']}")
         except Exception as e:
             md.append(f"_Inventory check unavailable: {e}_")
-
-        return "\n".join(md).strip()
-
-    def sales_report(self, session: Session, days: int, top_n: int) -> str:
+        report.add(md)
+
+        return report.markdown()
+
+    @cached_result(window=resolve_window, unkeyed=("on_section",))
+    def sales_report(
+        self,
+        session: Session,
+        days: int,
+        top_n: int,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        granularity: str = "auto",
+        on_section: SectionCallback | None = None,
+    ) -> str:
         self.analytics.reflection.require_tables("orders", "order_items")
 
         Orders = self.analytics.registry.get("orders")
-        ts = Orders.c[self.analytics._orders_ts_col()]
         total = Orders.c[self.analytics._orders_total_col()]
-        status_name = self.analytics._orders_status_col()
-        status_col = Orders.c[status_name] if status_name else None
 
-        start = datetime.now(timezone.utc) - timedelta(days=days)
-        where = [ts >= start]
-        if status_col is not None:
-            where.append(status_col != "cancelled")
+        explicit = start is not None or end is not None
+        start, end = resolve_window(days, start, end)
+        granularity = resolve_granularity(granularity, start, end)
+        where = self.analytics._orders_where(Orders, start, end)
 
         count_expr = func.count()
 
@@ -90,30 +141,29 @@ class OpsService:
             case((count_expr == 0, 0), else_=func.round(func.avg(total), 2)).label("aov"),
         ).select_from(Orders).where(*where)
 
-        kpis = session.execute(kpi_stmt).mappings().one()
+        report = ReportSections(["# Sales report", f"- Window: {window_label(days, start, end, explicit)}"], 3, on_section)
 
-        trend = self.analytics.revenue_by_day(session, days=days)
-        top = self.analytics.top_products_last_days(session, days=days, limit=top_n)
-
-        md = []
-        md.append("# Sales report")
-        md.append(f"- Window: last **{days} days**")
-        md.append("")
-        md.append("## KPIs")
-        md.append("| orders | revenue | AOV |")
-        md.append("|---:|---:|---:|")
-        md.append(f"| {kpis['orders']} | {kpis['revenue']} | {kpis['aov']} |")
-        md.append("")
-        md.append("## Trend (daily)")
+        kpis = session.execute(kpi_stmt).mappings().one()
+        report.add([
+            "## KPIs",
+            "| orders | revenue | AOV |",
+            "|---:|---:|---:|",
+            f"| {kpis['orders']} | {kpis['revenue']} | {kpis['aov']} |",
+        ])
+
+        trend = self.analytics.revenue_by_day(session, days=days, start=start, end=end, granularity=granularity)
+        md = [f"## Trend (by {granularity})"]
         if not trend:
             md.append("_No rows._")
         else:
-            md.append("| day | orders | revenue |")
+            md.append(f"| {granularity} | orders | revenue |")
             md.append("|---|---:|---:|")
             for r in trend[-min(len(trend), 30):]:
-                md.append(f"| {r['day']} | {r['orders']} | {r['revenue']} |")
-        md.append("")
-        md.append("## Top products (by revenue)")
+                md.append(f"| {r['bucket']} | {r['orders']} | {r['revenue']} |")
+        report.add(md)
+
+        top = self.analytics.top_products_last_days(session, days=days, limit=top_n, start=start, end=end)
+        md = ["## Top products (by revenue)"]
         if not top:
             md.append("_No rows._")
         else:
@@ -121,5 +171,6 @@ class OpsService:
             md.append("|---|---|---:|---:|")
             for r in top:
                 md.append(f"| {r['sku']} | {r['name']} | {r['units']} | {r['revenue']} |")
+        report.add(md)
 
-        return "\n".join(md).strip()
+        return report.markdown()
@@ -0,0 +1,280 @@
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from app.infrastructure.cache.store import ResultCache, cache_key
+from app.infrastructure.db.locks import LeaderLease
+
+log = logging.getLogger(__name__)
+
+Builder = Callable[[str | None, dict], Any]
+
+
+@dataclass(frozen=True)
+class PrecomputeJob:
+    report: str
+    tenant: str | None
+    args: dict
+    interval_s: float
+    max_age_s: float
+
+
+@dataclass(frozen=True)
+class Precomputed:
+    value: Any
+    as_of: datetime
+    elapsed_ms: float
+
+    def age_s(self) -> float:
+        return (datetime.now(timezone.utc) - self.as_of).total_seconds()
+
+    def started(self) -> datetime:
+        return self.as_of - timedelta(milliseconds=self.elapsed_ms)
+
+
+def _canonical(v: Any) -> Any:
+    return v.isoformat() if isinstance(v, datetime) else v
+
+
+class PrecomputeService:
+    """
+    Keeps configured report/argument combinations fresh in memory.
+
+    A scheduler thread rebuilds each job every `interval_s`. `lookup()` serves the latest
+    result immediately; once it is older than the job's `max_age_s` it also kicks off a
+    background refresh (stale-while-revalidate) instead of making the caller wait.
+
+    With a `lease`, only the process holding it (one of the HTTP workers) builds anything; it
+    publishes each result to the shared `store`, which the other processes serve from.
+    """
+
+    def __init__(
+        self,
+        jobs: list[dict],
+        default_interval_s: float,
+        default_tenant: str,
+        max_workers: int = 2,
+        lease: LeaderLease | None = None,
+        store: ResultCache | None = None,
+    ):
+        self._raw_jobs = jobs
+        self.default_tenant = default_tenant
+        self.default_interval_s = default_interval_s
+        self.max_workers = max(1, max_workers)
+        self.lease = lease
+        self.store = store
+        self._builders: dict[str, tuple[Builder, dict]] = {}
+        self._jobs: dict[str, PrecomputeJob] = {}
+        self._results: dict[str, Precomputed] = {}
+        self._last_started: dict[str, float] = {}
+        self._started_at: dict[str, datetime] = {}
+        self._invalidated: dict[str, datetime] = {}
+        self._running: set[str] = set()
+        self._errors: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pool: ThreadPoolExecutor | None = None
+
+    # -------- registration --------
+
+    def register(self, report: str, build: Builder, defaults: dict) -> None:
+        """`defaults` are the tool's argument defaults; they make partial job args match full tool calls."""
+        self._builders[report] = (build, dict(defaults))
+
+    def _key(self, report: str, tenant: str | None, args: dict) -> str:
+        _, defaults = self._builders[report]
+        full = {**defaults, **args}
+        canonical = {k: _canonical(full[k]) for k in sorted(full)}
+        return json.dumps([report, tenant or self.default_tenant, canonical], default=str)
+
+    def _load_jobs(self) -> None:
+        for raw in self._raw_jobs:
+            report = raw.get("report")
+            if report not in self._builders:
+                log.warning("precompute: unknown report %r (known: %s)", report, ", ".join(self._builders))
+                continue
+            args = dict(raw.get("args") or {})
+            for k in ("start", "end"):
+                if isinstance(args.get(k), str):
+                    args[k] = datetime.fromisoformat(args[k])
+            interval = float(raw.get("interval_s") or self.default_interval_s)
+            job = PrecomputeJob(
+                report=report,
+                tenant=raw.get("tenant"),
+                args=args,
+                interval_s=interval,
+                max_age_s=float(raw.get("max_age_s") or interval),
+            )
+            self._jobs[self._key(report, job.tenant, args)] = job
+
+    # -------- serving --------
+
+    def is_leader(self) -> bool:
+        return self.lease is None or self.lease.is_held
+
+    def _tenant(self, job: PrecomputeJob) -> str:
+        return job.tenant or self.default_tenant
+
+    def _shared(self, key: str) -> Precomputed | None:
+        if self.store is None:
+            return None
+        hit = self.store.get(cache_key("precompute", key))
+        if hit is None:
+            return None
+        return Precomputed(hit.value["value"], hit.value["as_of"], hit.value["elapsed_ms"])
+
+    def _publish(self, key: str, job: PrecomputeJob, result: Precomputed) -> None:
+        if self.store is None:
+            return
+        value = {"value": result.value, "as_of": result.as_of, "elapsed_ms": result.elapsed_ms}
+        scope = f"precompute:{self._tenant(job)}"
+        self.store.put(cache_key("precompute", key), value, scope=scope, name=job.report, ttl_s=None)
+
+    def _invalidated_at(self, tenant: str) -> datetime | None:
+        """When the tenant's data was last replaced (by this process or, via the store, by another)."""
+        with self._lock:
+            since = self._invalidated.get(tenant)
+        if self.store is not None:
+            hit = self.store.get(cache_key("precompute:invalidated", tenant), track=False)
+            if hit is not None and (since is None or hit.value > since):
+                since = hit.value
+        return since
+
+    def _latest(self, key: str) -> Precomputed | None:
+        result = None
+        if self.is_leader():
+            with self._lock:
+                result = self._results.get(key)
+        # Followers serve the leader's results; a freshly elected leader starts from them too.
+        if result is None:
+            result = self._shared(key)
+        if result is None:
+            return None
+        # Built from data that has since been replaced (e.g. by seed_demo_data): never serve it.
+        since = self._invalidated_at(self._tenant(self._jobs[key]))
+        return result if since is None or result.started() >= since else None
+
+    def lookup(self, report: str, tenant: str | None, args: dict) -> Precomputed | None:
+        if not self._jobs or report not in self._builders:
+            return None
+        key = self._key(report, tenant, args)
+        job = self._jobs.get(key)
+        if job is None:
+            return None
+        result = self._latest(key)
+        if (result is None or result.age_s() > job.max_age_s) and self.is_leader():
+            self._submit(key, job)
+        return result
+
+    def invalidate(self, tenant: str | None) -> int:
+        """
+        Drops the tenant's precomputed results everywhere (this process, the shared store, and
+        through the store's marker the other processes' memory), so calls compute fresh ones
+        until the rebuild that this starts on the leader lands. Returns the entries dropped here.
+        """
+        tenant = tenant or self.default_tenant
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self._invalidated[tenant] = now
+            keys = [key for key, job in self._jobs.items() if self._tenant(job) == tenant]
+            dropped = sum(1 for key in keys if self._results.pop(key, None) is not None)
+        if self.store is not None:
+            dropped += self.store.invalidate(f"precompute:{tenant}")
+            marker = cache_key("precompute:invalidated", tenant)
+            self.store.put(marker, now, scope="precompute", name="invalidated", ttl_s=None)
+        if self.is_leader():
+            for key in keys:
+                self._submit(key, self._jobs[key])
+        return dropped
+
+    # -------- refreshing --------
+
+    def _submit(self, key: str, job: PrecomputeJob) -> None:
+        with self._lock:
+            if key in self._running or self._pool is None:
+                return
+            self._running.add(key)
+            self._last_started[key] = time.monotonic()
+            self._started_at[key] = datetime.now(timezone.utc)
+        self._pool.submit(self._refresh, key, job)
+
+    def _refresh(self, key: str, job: PrecomputeJob) -> None:
+        build, _ = self._builders[job.report]
+        t0 = time.perf_counter()
+        try:
+            value = build(job.tenant, dict(job.args))
+            result = Precomputed(value, datetime.now(timezone.utc), round((time.perf_counter() - t0) * 1000, 1))
+            with self._lock:
+                self._results[key] = result
+                self._errors.pop(key, None)
+            self._publish(key, job, result)
+        except Exception as e:
+            # Keep serving the previous result; the next tick retries.
+            with self._lock:
+                self._errors[key] = str(e).splitlines()[0]
+            log.warning("precompute %s failed: %s", job.report, str(e).splitlines()[0])
+        finally:
+            with self._lock:
+                self._running.discard(key)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if self.lease is not None and not self.lease.held():
+                self._stop.wait(1.0)
+                continue
+            now = time.monotonic()
+            invalidated = {tenant: self._invalidated_at(tenant) for tenant in map(self._tenant, self._jobs.values())}
+            for key, job in self._jobs.items():
+                last = self._last_started.get(key)
+                since = invalidated[self._tenant(job)]
+                # Also rebuild at once when the data was replaced (possibly by another process)
+                # after the last build started.
+                replaced = since is not None and last is not None and self._started_at[key] < since
+                if last is None or now - last >= job.interval_s or replaced:
+                    self._submit(key, job)
+            self._stop.wait(1.0)
+
+    def start(self) -> None:
+        self._load_jobs()
+        if not self._jobs or self._thread is not None:
+            return
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="precompute")
+        self._thread = threading.Thread(target=self._loop, name="precompute", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self.lease is not None:
+            self.lease.release()
+
+    def status(self) -> list[dict]:
+        latest = {key: self._latest(key) for key in self._jobs}
+        with self._lock:
+            out = []
+            for key, job in self._jobs.items():
+                result = latest[key]
+                out.append(
+                    {
+                        "report": job.report,
+                        "tenant": job.tenant,
+                        "args": {k: _canonical(v) for k, v in job.args.items()},
+                        "interval_s": job.interval_s,
+                        "max_age_s": job.max_age_s,
+                        "as_of": result.as_of.isoformat() if result else None,
+                        "age_s": round(result.age_s(), 1) if result else None,
+                        "build_ms": result.elapsed_ms if result else None,
+                        "refreshing": key in self._running,
+                        "error": self._errors.get(key),
+                    }
+                )
+            return out
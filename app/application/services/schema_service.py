@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
 from app.infrastructure.db.reflection import SchemaReflection
 
 
@@ -18,21 +21,172 @@ class SchemaService:
         cols = self.reflection.describe_table(table_name)
         return {"table": table_name, "columns": cols}
 
-    def schema_overview(self) -> dict:
-        tables = self.reflection.list_tables()
-        by_table: dict[str, list[dict]] = {t: self.reflection.describe_table(t) for t in tables}
+    def schema_overview(
+        self,
+        session: Session,
+        pattern: str | None = None,
+        limit: int = 50,
+        offset: int = 0,
+        summary: bool = False,
+        include_stats: bool = False,
+    ) -> dict:
+        """
+        Tables of the schema with their columns, read from pg_catalog in one statement for the
+        requested page. `pattern` is a case-insensitive glob (`*`, `?`); without wildcards it
+        matches anywhere in the name. `summary` returns column counts instead of columns.
+        """
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be >= 1 and offset >= 0.")
+        params = {"s": self.reflection.schema, "pattern": name_pattern(pattern), "limit": limit, "offset": offset}
+        columns = "NULL::json" if summary else _COLUMNS_JSON
+        stats = _STATS_LATERAL if include_stats else _NO_STATS
+        rows = session.execute(text(_OVERVIEW_SQL.format(columns=columns, stats=stats)), params).mappings().all()
+
+        if rows:
+            total = int(rows[0]["total"])
+        else:
+            total = session.execute(text(_COUNT_SQL), params).scalar_one() if offset else 0
+        tables = [r["table_name"] for r in rows]
+        next_offset = offset + len(rows) if offset + len(rows) < total else None
 
-        md_lines = ["# Public schema", ""]
-        if not tables:
-            md_lines.append("_No tables found in public schema._")
+        out: dict = {
+            "schema": self.reflection.schema,
+            "pattern": pattern,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset,
+            "tables": tables,
+        }
+        if summary:
+            out["column_counts"] = {r["table_name"]: r["n_columns"] for r in rows}
         else:
-            for t in tables:
-                md_lines.append(f"## {t}")
-                for c in by_table[t]:
-                    md_lines.append(
-                        f"- `{c['column']}` ({c['type']}) nullable={c['nullable']}"
-                        + (f" default={c['default']}" if c.get("default") else "")
-                    )
-                md_lines.append("")
-
-        return {"tables": tables, "columns": by_table, "markdown": "\n".join(md_lines).strip()}
+            out["columns"] = {
+                r["table_name"]: [
+                    {
+                        "column": c["column"],
+                        "type": c["type"],
+                        "nullable": str(bool(c["nullable"])),
+                        "default": c["default"],
+                    }
+                    for c in r["columns"] or []
+                ]
+                for r in rows
+            }
+        if include_stats:
+            out["stats"] = {
+                r["table_name"]: {
+                    "rows_estimate": r["rows_estimate"],
+                    "total_bytes": r["total_bytes"],
+                    "size": r["size"],
+                }
+                for r in rows
+            }
+        out["markdown"] = self._overview_markdown(out, rows, summary, include_stats)
+        return out
+
+    def _overview_markdown(self, out: dict, rows, summary: bool, include_stats: bool) -> str:
+        schema = out["schema"]
+        md = [f"# {schema.capitalize()} schema", ""]
+        if not rows and out["total"]:
+            md.append(f"_No tables past offset {out['offset']} ({out['total']} in total)._")
+            return "\n".join(md).strip()
+        if not rows:
+            what = "matching `" + out["pattern"] + "` " if out["pattern"] else ""
+            md.append(f"_No tables {what}found in {schema} schema._")
+            return "\n".join(md).strip()
+
+        shown = f"{out['offset'] + 1}-{out['offset'] + len(rows)} of {out['total']}"
+        md.append(f"Tables {shown}" + (f"; next_offset={out['next_offset']}" if out["next_offset"] else "") + ".")
+        md.append("")
+        for r in rows:
+            name = r["table_name"]
+            extra = ""
+            if include_stats:
+                est = "n/a" if r["rows_estimate"] is None else f"~{r['rows_estimate']}"
+                extra = f" — rows {est}, {r['size']}"
+            if summary:
+                md.append(f"- `{name}`: {r['n_columns']} columns{extra}")
+                continue
+            md.append(f"## {name}" + extra)
+            for c in out["columns"][name]:
+                md.append(
+                    f"- `{c['column']}` ({c['type']}) nullable={c['nullable']}"
+                    + (f" default={c['default']}" if c.get("default") else "")
+                )
+            md.append("")
+        return "\n".join(md).strip()
+
+
+def name_pattern(pattern: str | None) -> str:
+    """Glob (`*`, `?`) to an ILIKE pattern; plain text matches as a substring."""
+    if not pattern:
+        return "%"
+    escaped = pattern.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    if "*" not in pattern and "?" not in pattern:
+        return f"%{escaped}%"
+    return escaped.replace("*", "%").replace("?", "_")
+
+
+_COLUMNS_JSON = """(
+            SELECT json_agg(
+                       json_build_object(
+                           'column', a.attname,
+                           'type', format_type(a.atttypid, a.atttypmod),
+                           'nullable', NOT a.attnotnull,
+                           'default', pg_get_expr(d.adbin, d.adrelid)
+                       )
+                       ORDER BY a.attnum
+                   )
+            FROM pg_attribute a
+            LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE a.attrelid = r.oid AND a.attnum > 0 AND NOT a.attisdropped
+        )"""
+
+# Partitioned tables report the sum over their leaf partitions (a plain table is its own leaf).
+_STATS_LATERAL = """CROSS JOIN LATERAL (
+        SELECT CASE WHEN bool_or(pc.reltuples < 0) THEN NULL ELSE sum(pc.reltuples)::bigint END AS rows_estimate,
+               coalesce(sum(pg_total_relation_size(pt.relid)), 0)::bigint AS total_bytes,
+               pg_size_pretty(coalesce(sum(pg_total_relation_size(pt.relid)), 0)) AS size
+        FROM pg_partition_tree(r.oid) pt
+        JOIN pg_class pc ON pc.oid = pt.relid
+        WHERE pt.isleaf
+    ) st"""
+_NO_STATS = "CROSS JOIN LATERAL (SELECT NULL::bigint AS rows_estimate, NULL::bigint AS total_bytes, NULL::text AS size) st"
+
+_TABLES_WHERE = """n.nspname = :s AND c.relkind IN ('r', 'p') AND c.relname ILIKE :pattern"""
+
+_OVERVIEW_SQL = (
+    """
+    WITH r AS (
+        SELECT c.oid, c.relname, count(*) OVER () AS total
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE """
+    + _TABLES_WHERE
+    + """
+        ORDER BY c.relname
+        LIMIT :limit OFFSET :offset
+    )
+    SELECT r.relname AS table_name,
+           r.total,
+           (SELECT count(*) FROM pg_attribute a WHERE a.attrelid = r.oid AND a.attnum > 0 AND NOT a.attisdropped)
+               AS n_columns,
+           {columns} AS columns,
+           st.rows_estimate,
+           st.total_bytes,
+           st.size
+    FROM r
+    {stats}
+    ORDER BY r.relname
+    """
+)
+
+_COUNT_SQL = (
+    """
+    SELECT count(*)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE """
+    + _TABLES_WHERE
+)
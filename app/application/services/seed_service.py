@@ -8,7 +8,10 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.application.services.inventory_service import InventoryService
 from app.config.settings import Settings
+from app.infrastructure.cache.query_cache import QueryCache
+from app.infrastructure.cache.store import ScopedCache
 from app.infrastructure.db.reflection import SchemaReflection
 from app.infrastructure.db.tables import TableRegistry
 
@@ -21,10 +24,21 @@ def slugify(text_: str) -> str:
 
 
 class SeedService:
-    def __init__(self, settings: Settings, reflection: SchemaReflection, registry: TableRegistry):
+    def __init__(
+        self,
+        settings: Settings,
+        reflection: SchemaReflection,
+        registry: TableRegistry,
+        cache: ScopedCache | None = None,
+        query_cache: QueryCache | None = None,
+        inventory: InventoryService | None = None,
+    ):
         self.settings = settings
         self.reflection = reflection
         self.registry = registry
+        self.cache = cache
+        self.query_cache = query_cache
+        self.inventory = inventory
 
     def _require_writes_enabled(self) -> None:
         if not self.settings.allow_writes:
@@ -342,7 +356,13 @@ class SeedService:
             if has_stock_movements and Stock is not None and sale_sm_batch:
                 session.execute(pg_insert(Stock).values(sale_sm_batch))
 
-        return {
+        # Committed: cached results for this schema (including closed windows) are now wrong.
+        if self.cache is not None:
+            self.cache.invalidate()
+        if self.query_cache is not None:
+            self.query_cache.invalidate(self.reflection.schema)
+
+        out = {
             "ok": True,
             "size": size,
             "reset_first": reset_first,
@@ -350,3 +370,7 @@ class SeedService:
             "inserted": {"customers": n_customers, "products": n_products, "orders": n_orders},
             "note": "Seed complete. Try sales_report(days=30) or the sales_deep_dive prompt.",
         }
+        # TRUNCATE ... RESTART IDENTITY invalidates the snapshot's high-water mark: rebuild it.
+        if self.inventory is not None and self.inventory.exists():
+            out["inventory_snapshot"] = self.inventory.refresh(session, full=True)
+        return out
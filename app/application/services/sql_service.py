@@ -1,20 +1,90 @@
 from __future__ import annotations
 
+import copy
+import re
+import time
+
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from app.infrastructure.db.sql_safety import normalize_sql, is_readonly_sql
+from app.infrastructure.cache.query_cache import QueryCache
+from app.infrastructure.db.columnar import encode_columnar
+from app.infrastructure.db.data_version import query_data_version
+from app.infrastructure.db.query_stats import QueryStats
+from app.infrastructure.db.sql_safety import (
+    canonical_sql,
+    fingerprint_sql,
+    is_readonly_sql,
+    normalize_sql,
+    qualifier_names,
+)
 
+# Results of these can change without any table write, so they are never served from cache.
+_VOLATILE_RE = re.compile(
+    r"\b(now|random|clock_timestamp|statement_timestamp|timeofday|current_date|current_time|current_timestamp"
+    r"|localtime|localtimestamp|nextval|currval|setval|txid_current|pg_\w+|information_schema)\b"
+)
 
 class SqlService:
-    def sql_readonly(self, session: Session, query: str, max_rows: int, timeout_ms: int) -> dict:
+    def __init__(self, stats: QueryStats | None = None, cache: QueryCache | None = None):
+        self.stats = stats or QueryStats()
+        self.cache = cache
+
+    def _cacheable(self, fingerprint_text: str) -> bool:
+        first = fingerprint_text.split(None, 1)[0]
+        return self.cache is not None and first in ("select", "with") and not _VOLATILE_RE.search(fingerprint_text)
+
+    def sql_readonly(
+        self,
+        session: Session,
+        query: str,
+        max_rows: int,
+        timeout_ms: int,
+        columnar: bool = False,
+        schema: str = "public",
+    ) -> dict:
         q = normalize_sql(query)
         if not is_readonly_sql(q):
             raise ValueError("sql_readonly only allows SELECT/WITH/SHOW/EXPLAIN (single statement).")
+        fp, fp_text = fingerprint_sql(q)
+        cache_key = (canonical_sql(q), max_rows, columnar) if self._cacheable(fp_text) else None
 
-        # SET LOCAL requires an active transaction
+        # Transaction-scoped override of the unit of work's default (SET LOCAL can't take a bind).
         with session.begin():
-            session.execute(text("SET LOCAL statement_timeout = :ms"), {"ms": f"{int(timeout_ms)}ms"})
-            result = session.execute(text(q))
-            rows = result.mappings().fetchmany(max_rows)
-            return {"rows": [dict(r) for r in rows], "returned": len(rows), "max_rows": max_rows}
+            session.execute(
+                text("SELECT set_config('statement_timeout', :ms, true)"), {"ms": f"{int(timeout_ms)}ms"}
+            )
+            if cache_key is not None:
+                # Schema-qualified names may point outside the tenant: watch those schemas too
+                # (aliases in the list match no schema and cost nothing). Queries that watch the
+                # same schemas share a scope, so check_version doesn't thrash between them.
+                others = [n for n in qualifier_names(q) if n != schema]
+                scope = "+".join([schema, *others])
+                version = query_data_version(session, [schema, *others])
+                self.cache.check_version(scope, version)
+                # The version is part of the key: a result read before a concurrent write can't outlive it.
+                cache_key = (*cache_key, version)
+                hit = self.cache.get(scope, cache_key)
+                if hit is not None:
+                    self.stats.record(fp, fp_text, q, rows=hit["returned"], cache_hit=True)
+                    # Callers own their result (the formatter may reshape rows); the cache keeps its copy.
+                    return {**copy.deepcopy(hit), "fingerprint": fp, "cached": True}
+
+            t0 = time.perf_counter()
+            try:
+                result = session.execute(text(q))
+                if columnar:
+                    # Plain tuples straight into column arrays; no per-row dicts.
+                    payload = encode_columnar(list(result.keys()), result.fetchmany(max_rows))
+                    out = {**payload, "returned": payload["row_count"], "max_rows": max_rows}
+                else:
+                    rows = result.mappings().fetchmany(max_rows)
+                    out = {"rows": [dict(r) for r in rows], "returned": len(rows), "max_rows": max_rows}
+            except Exception:
+                self.stats.record(fp, fp_text, q, error=True)
+                raise
+            self.stats.record(fp, fp_text, q, elapsed_ms=(time.perf_counter() - t0) * 1000, rows=out["returned"])
+
+        if cache_key is not None:
+            self.cache.put(scope, cache_key, copy.deepcopy(out))
+        return {**out, "fingerprint": fp, "cached": False}
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,3 +11,118 @@ class Settings(BaseSettings):
     postgres_dsn: str
     allow_writes: bool = True
     log_level: str = "INFO"
+
+    # Serving: stdio (one client per process) or streamable HTTP shared by many clients.
+    transport: Literal["stdio", "http"] = "stdio"
+    http_host: str = "127.0.0.1"
+    http_port: int = 8000
+    http_path: str = "/mcp"
+    http_workers: int = 1
+    # Uvicorn answers 503 once this many connections/tasks are in flight per worker; None = unbounded.
+    http_limit_concurrency: int | None = None
+    http_stateless: bool = True
+
+    # Directory for state shared between processes (schema snapshots); unset keeps it in memory.
+    state_dir: str | None = None
+    schema_snapshot_ttl_s: int = 3600
+
+    # Background warm-up at startup: pool connections, schema metadata, compiled statements, reports.
+    warmup_enabled: bool = False
+    warmup_connections: int = 2
+    # Reports to pre-run, as {method: kwargs} (JSON in the environment), e.g. {"sales_report": {"days": 30, "top_n": 10}}.
+    warmup_reports: dict[str, dict] = {}
+
+    # Reports kept fresh in the background, e.g.
+    # [{"report": "sales_report", "args": {"days": 30}, "interval_s": 300, "max_age_s": 600}]
+    precompute_jobs: list[dict] = []
+    precompute_interval_s: int = 300
+    precompute_workers: int = 2
+
+    inventory_refresh_interval_s: int = 0  # 0: refresh inventory_snapshot only on demand
+
+    # Persistent result cache (SQLite) for analytics/report results, shared across processes.
+    result_cache_enabled: bool = False
+    result_cache_path: str | None = None  # default: <STATE_DIR>/results.sqlite or ~/.cache/ecom-mcp/results.sqlite
+    result_cache_max_mb: int = 256
+    result_cache_open_ttl_s: int = 300
+    result_cache_closed_ttl_s: int = 0  # windows that already ended; 0 keeps them until evicted
+
+    sql_cache_ttl_s: int = 0  # 0 disables the sql_readonly exact-match cache
+    sql_cache_max_entries: int = 256
+    sql_stats_max_fingerprints: int = 500
+
+    statement_timeout_ms: int = 30000
+    # Per-tool overrides (JSON in the environment); 0 disables the timeout for that tool.
+    tool_timeouts_ms: dict[str, int] = {"db_ping": 2000, "seed_demo_data": 0}
+
+    default_schema: str = "public"
+    # Allow-list of tenant schemas (JSON in the environment); empty allows any existing schema.
+    tenant_schemas: list[str] = []
+    tenant_cache_size: int = 64
+
+    batch_max_workers: int = 8
+    batch_max_requests: int = 20
+
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout_s: float = 30.0
+    db_pool_recycle_s: int = 1800
+    db_pool_use_lifo: bool = True
+    db_pre_ping: Literal["always", "idle", "never"] = "idle"
+    db_pre_ping_idle_s: float = 300.0
+    db_connect_timeout_s: int = 10
+    db_application_name: str = "ecommerce-mcp"
+    db_keepalives_idle_s: int = 30
+    db_keepalives_interval_s: int = 10
+    db_keepalives_count: int = 3
+    # Compiled-statement LRU shared by all tenants (each tenant's tables compile separately).
+    db_query_cache_size: int = 2000
+
+    # Admission control per process; tools declare meta={"cost": "light"|"standard"|"heavy"}.
+    admission_enabled: bool = True
+    # standard + heavy slots; default: pool size + overflow - light slots - background_connections()
+    admission_capacity: int | None = None
+    admission_light_slots: int = 8
+    admission_heavy_slots: int = 4
+    admission_queue_size: int = 32
+    admission_queue_timeout_s: float = 10.0
+
+    # Opt-in profiling of tool calls (CPU stack samples + tracemalloc), one JSON file per profiled call.
+    profile_enabled: bool = False
+    profile_dir: str | None = None  # default: <STATE_DIR>/profiles or ~/.cache/ecom-mcp/profiles
+    profile_sample_rate: float = 1.0  # fraction of calls profiled
+    profile_interval_ms: float = 5.0
+    profile_tracemalloc: bool = True
+    profile_max_files: int = 1000
+
+    def result_cache_file(self) -> str:
+        if self.result_cache_path:
+            return self.result_cache_path
+        if self.state_dir:
+            return f"{self.state_dir.rstrip('/')}/results.sqlite"
+        return "~/.cache/ecom-mcp/results.sqlite"
+
+    def profile_directory(self) -> str:
+        if self.profile_dir:
+            return self.profile_dir
+        if self.state_dir:
+            return f"{self.state_dir.rstrip('/')}/profiles"
+        return "~/.cache/ecom-mcp/profiles"
+
+    def background_connections(self) -> int:
+        """Connections the background threads (precompute, inventory refresh, warm-up reports) may hold at once."""
+        n = self.precompute_workers + 1 if self.precompute_jobs else 0  # + the leader lease's connection
+        n += 1 if self.inventory_refresh_interval_s > 0 and self.allow_writes else 0
+        n += 1 if self.warmup_enabled and self.warmup_reports else 0
+        return n
+
+    def admission_slots(self) -> int:
+        if self.admission_capacity:
+            return self.admission_capacity
+        # Tool calls pass admission; background threads don't, so their connections are set aside.
+        spare = self.db_pool_size + self.db_max_overflow - self.admission_light_slots - self.background_connections()
+        return max(1, spare)
+
+    def timeout_for(self, tool: str | None) -> int | None:
+        ms = self.tool_timeouts_ms.get(tool, self.statement_timeout_ms) if tool else self.statement_timeout_ms
+        return ms if ms and ms > 0 else None
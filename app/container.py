@@ -3,53 +3,212 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Callable
 
+from sqlalchemy.engine import Engine
+
 from app.config.settings import Settings
 from app.infrastructure.db.engine import build_engine, normalize_sqlalchemy_dsn
+from app.infrastructure.db.inflight import current_call
+from app.infrastructure.db.inventory import SNAPSHOT_TABLE, STATE_TABLE
+from app.infrastructure.db.locks import LeaderLease
+from app.infrastructure.db.query_stats import QueryStats
 from app.infrastructure.db.uow import SqlAlchemyUnitOfWork
 from app.infrastructure.db.reflection import SchemaReflection
 from app.infrastructure.db.tables import TableRegistry
+from app.infrastructure.cache.query_cache import QueryCache
+from app.infrastructure.cache.store import ResultCache
+from app.infrastructure.db.snapshots import SnapshotStore, dsn_namespace
+from app.infrastructure.profiling.profiler import ToolProfiler
+from app.infrastructure.db.tenancy import BoundedLRU, schema_exists, search_path_for, validate_schema_name
 
 from app.application.services.schema_service import SchemaService
 from app.application.services.sql_service import SqlService
 from app.application.services.analytics_service import AnalyticsService
 from app.application.services.ops_service import OpsService
+from app.application.services.anomaly_service import AnomalyService
 from app.application.services.seed_service import SeedService
+from app.application.services.inventory_service import InventoryService
+from app.application.services.index_service import IndexAdvisorService
+from app.application.services.batch_service import BatchService
+from app.application.services.precompute_service import PrecomputeService
+from app.application.services.admission_service import AdmissionController
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """Everything bound to one schema: metadata caches, reflected tables and the services using them."""
+
+    name: str
+    uow_factory: Callable[[], SqlAlchemyUnitOfWork]
+    reflection: SchemaReflection
+    registry: TableRegistry
+
+    schema: SchemaService
+    analytics: AnalyticsService
+    ops: OpsService
+    anomalies: AnomalyService
+    seed: SeedService
+    inventory: InventoryService
+    index_advisor: IndexAdvisorService
+    batch: BatchService
 
 
 @dataclass(frozen=True)
 class Container:
     settings: Settings
+    engine: Engine
     uow_factory: Callable[[], SqlAlchemyUnitOfWork]
 
+    # Default tenant's services
     schema: SchemaService
     sql: SqlService
     analytics: AnalyticsService
     ops: OpsService
+    anomalies: AnomalyService
     seed: SeedService
+    inventory: InventoryService
+    index_advisor: IndexAdvisorService
+    batch: BatchService
+
+    default_tenant: Tenant
+    tenants: BoundedLRU[Tenant]
+    result_cache: ResultCache | None
+    precompute: PrecomputeService
+    admission: AdmissionController | None
+    profiler: ToolProfiler | None
+
+    def tenant(self, name: str | None = None) -> Tenant:
+        if not name or name == self.default_tenant.name:
+            return self.default_tenant
+        return self.tenants.get(validate_schema_name(name))
+
+    def refresh_tenant(self, name: str | None = None) -> None:
+        t = self.tenant(name)
+        t.reflection.clear_cache()
+        t.registry.clear_cache()
+
+
+def _build_tenant(
+    settings: Settings,
+    engine: Engine,
+    schema: str,
+    search_path: str | None,
+    store: SnapshotStore | None,
+    result_cache: ResultCache | None,
+    query_cache: QueryCache | None,
+    namespace: str,
+) -> Tenant:
+    registry = TableRegistry(engine, schema=schema)
+    reflection = SchemaReflection(engine, schema=schema, store=store)
+    cache = None
+    if result_cache:
+        derived = (SNAPSHOT_TABLE, STATE_TABLE)
+        cache = result_cache.scoped(f"{namespace}:{schema}", reflection.fingerprint, schema, derived)
+
+    def uow_factory() -> SqlAlchemyUnitOfWork:
+        call = current_call()
+        if call is None:
+            return SqlAlchemyUnitOfWork(
+                engine, statement_timeout_ms=settings.timeout_for(None), search_path=search_path
+            )
+        return SqlAlchemyUnitOfWork(engine, statement_timeout_ms=call.timeout_ms, call=call, search_path=search_path)
+
+    analytics_svc = AnalyticsService(reflection, registry, cache=cache)
+    inventory = InventoryService(settings, reflection, registry)
+    return Tenant(
+        name=schema,
+        uow_factory=uow_factory,
+        reflection=reflection,
+        registry=registry,
+        schema=SchemaService(reflection),
+        analytics=analytics_svc,
+        ops=OpsService(analytics_svc, cache=cache),
+        anomalies=AnomalyService(analytics_svc),
+        seed=SeedService(settings, reflection, registry, cache=cache, query_cache=query_cache, inventory=inventory),
+        inventory=inventory,
+        index_advisor=IndexAdvisorService(settings, engine, reflection, analytics_svc),
+        batch=BatchService(
+            analytics_svc,
+            uow_factory,
+            max_workers=settings.batch_max_workers,
+            max_requests=settings.batch_max_requests,
+        ),
+    )
 
 
 def build_container(settings: Settings) -> Container:
     dsn = normalize_sqlalchemy_dsn(settings.postgres_dsn)
-    engine = build_engine(dsn)
+    engine = build_engine(dsn, settings)
 
-    registry = TableRegistry(engine, schema="public")
-    reflection = SchemaReflection(engine, schema="public")
+    namespace = dsn_namespace(dsn)
+    store = None
+    if settings.state_dir:
+        store = SnapshotStore(settings.state_dir, namespace, ttl_s=settings.schema_snapshot_ttl_s)
+    result_cache = None
+    if settings.result_cache_enabled:
+        result_cache = ResultCache(
+            settings.result_cache_file(),
+            max_bytes=settings.result_cache_max_mb * 1024 * 1024,
+            open_ttl_s=settings.result_cache_open_ttl_s,
+            closed_ttl_s=settings.result_cache_closed_ttl_s,
+        )
+    query_cache = None
+    if settings.sql_cache_ttl_s > 0:
+        query_cache = QueryCache(settings.sql_cache_ttl_s, max_entries=settings.sql_cache_max_entries)
+    shared = {"store": store, "result_cache": result_cache, "query_cache": query_cache, "namespace": namespace}
 
-    def uow_factory() -> SqlAlchemyUnitOfWork:
-        return SqlAlchemyUnitOfWork(engine)
+    # The default schema keeps the connection's own search_path, as before.
+    default = _build_tenant(
+        settings, engine, validate_schema_name(settings.default_schema), search_path=None, **shared
+    )
+    allowed = set(settings.tenant_schemas)
 
-    schema_svc = SchemaService(reflection)
-    sql_svc = SqlService()
-    analytics_svc = AnalyticsService(reflection, registry)
-    ops_svc = OpsService(analytics_svc)
-    seed_svc = SeedService(settings, reflection, registry)
+    def build_tenant(schema: str) -> Tenant:
+        if allowed and schema not in allowed:
+            raise ValueError(f"Tenant '{schema}' is not in TENANT_SCHEMAS.")
+        if not schema_exists(engine, schema):
+            raise ValueError(f"Unknown tenant: schema '{schema}' does not exist.")
+        return _build_tenant(settings, engine, schema, search_path=search_path_for(schema), **shared)
 
     return Container(
         settings=settings,
-        uow_factory=uow_factory,
-        schema=schema_svc,
-        sql=sql_svc,
-        analytics=analytics_svc,
-        ops=ops_svc,
-        seed=seed_svc,
+        engine=engine,
+        uow_factory=default.uow_factory,
+        schema=default.schema,
+        sql=SqlService(QueryStats(settings.sql_stats_max_fingerprints), cache=query_cache),
+        analytics=default.analytics,
+        ops=default.ops,
+        anomalies=default.anomalies,
+        seed=default.seed,
+        inventory=default.inventory,
+        index_advisor=default.index_advisor,
+        batch=default.batch,
+        default_tenant=default,
+        tenants=BoundedLRU(build_tenant, settings.tenant_cache_size),
+        result_cache=result_cache,
+        precompute=PrecomputeService(
+            settings.precompute_jobs,
+            default_interval_s=settings.precompute_interval_s,
+            default_tenant=default.name,
+            max_workers=settings.precompute_workers,
+            lease=LeaderLease(engine, f"{namespace}:precompute"),
+            store=result_cache,
+        ),
+        admission=AdmissionController(
+            capacity=settings.admission_slots(),
+            light=settings.admission_light_slots,
+            heavy=settings.admission_heavy_slots,
+            queue_size=settings.admission_queue_size,
+            queue_timeout_s=settings.admission_queue_timeout_s,
+        )
+        if settings.admission_enabled
+        else None,
+        profiler=ToolProfiler(
+            settings.profile_directory(),
+            sample_rate=settings.profile_sample_rate,
+            interval_ms=settings.profile_interval_ms,
+            trace_allocations=settings.profile_tracemalloc,
+            max_files=settings.profile_max_files,
+        )
+        if settings.profile_enabled
+        else None,
     )
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+from uuid import UUID
+
+# Values are stored as JSON; non-JSON types are wrapped as {"$t": tag, "v": text} so a cached
+# result decodes to the same Python types the database returned (Decimal stays Decimal).
+_TAG = "$t"
+
+
+def _encode(o: Any) -> Any:
+    if isinstance(o, Decimal):
+        return {_TAG: "dec", "v": str(o)}
+    if isinstance(o, datetime):
+        return {_TAG: "dt", "v": o.isoformat()}
+    if isinstance(o, date):
+        return {_TAG: "d", "v": o.isoformat()}
+    if isinstance(o, time):
+        return {_TAG: "t", "v": o.isoformat()}
+    if isinstance(o, timedelta):
+        return {_TAG: "td", "v": o.total_seconds()}
+    if isinstance(o, UUID):
+        return {_TAG: "uuid", "v": str(o)}
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return {_TAG: "b", "v": base64.b64encode(bytes(o)).decode("ascii")}
+    if isinstance(o, tuple):
+        return {_TAG: "tup", "v": [_walk(x) for x in o]}
+    if isinstance(o, (set, frozenset)):
+        return {_TAG: "set", "v": [_walk(x) for x in sorted(o, key=repr)]}
+    raise TypeError(f"Cannot cache value of type {type(o).__name__}")
+
+
+def _walk(o: Any) -> Any:
+    if o is None or isinstance(o, (str, bool, int, float)):
+        return o
+    if isinstance(o, dict):
+        return {str(k): _walk(v) for k, v in o.items()}
+    if isinstance(o, list):
+        return [_walk(x) for x in o]
+    return _encode(o)
+
+
+_DECODERS = {
+    "dec": Decimal,
+    "dt": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    "t": time.fromisoformat,
+    "td": lambda v: timedelta(seconds=v),
+    "uuid": UUID,
+    "b": lambda v: base64.b64decode(v),
+}
+
+
+def _hook(d: dict) -> Any:
+    tag = d.get(_TAG)
+    if tag is None or len(d) != 2:
+        return d
+    if tag == "tup":
+        return tuple(d["v"])
+    if tag == "set":
+        return set(d["v"])
+    return _DECODERS[tag](d["v"])
+
+
+def dumps(value: Any) -> bytes:
+    return json.dumps(_walk(value), separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    return json.loads(data, object_hook=_hook)
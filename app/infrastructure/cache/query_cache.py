@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class QueryCache:
+    """
+    In-memory TTL cache for exact-match `sql_readonly` results.
+
+    Entries belong to a scope (the tenant) and remember the data version they were read at.
+    `check_version()` drops a scope's entries as soon as its version moves, so a write
+    invalidates even before the TTL runs out.
+    """
+
+    def __init__(self, ttl_s: float, max_entries: int = 256):
+        self.ttl_s = ttl_s
+        self.max_entries = max(1, max_entries)
+        self._items: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._versions: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def check_version(self, scope: str, version: Any) -> None:
+        with self._lock:
+            if scope in self._versions and self._versions[scope] != version:
+                self._drop(scope)
+            self._versions[scope] = version
+
+    def get(self, scope: str, key: tuple) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get((scope, *key))
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._items[(scope, *key)]
+                self.misses += 1
+                return None
+            self._items.move_to_end((scope, *key))
+            self.hits += 1
+            return entry[1]
+
+    def put(self, scope: str, key: tuple, value: Any) -> None:
+        with self._lock:
+            self._items[(scope, *key)] = (time.monotonic() + self.ttl_s, value)
+            self._items.move_to_end((scope, *key))
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def _drop(self, scope: str) -> int:
+        victims = [k for k in self._items if k[0] == scope]
+        for k in victims:
+            del self._items[k]
+        self.invalidations += 1
+        return len(victims)
+
+    def invalidate(self, scope: str) -> int:
+        with self._lock:
+            self._versions.pop(scope, None)
+            return self._drop(scope)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "ttl_s": self.ttl_s,
+                "entries": len(self._items),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
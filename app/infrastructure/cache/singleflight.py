@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+
+from app.infrastructure.db.inflight import QueryCancelled
+
+
+class _Call:
+    def __init__(self):
+        self.future: Future = Future()
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key runs `fn`, callers arriving
+    while it runs wait for that result instead of repeating the work. Every caller gets its own
+    object: waiters receive deep copies of a snapshot taken before the leader's caller sees its
+    result, so no caller can change what another one gets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.leaders += 1
+                else:
+                    call.waiters += 1
+                    self.coalesced += 1
+            if leader:
+                return self._lead(key, call, fn)
+            try:
+                return copy.deepcopy(call.future.result())
+            except QueryCancelled:
+                # The leader's client went away; that says nothing about this call, so run it again.
+                continue
+
+    def _lead(self, key: Hashable, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            value = fn()
+        except BaseException as e:
+            self._finish(key)
+            call.future.set_exception(e)
+            raise
+        # Once the key is released no new waiters can join, so the count below is final.
+        if self._finish(key):
+            call.future.set_result(copy.deepcopy(value))
+        else:
+            call.future.set_result(None)
+        return value
+
+    def _finish(self, key: Hashable) -> int:
+        with self._lock:
+            return self._calls.pop(key).waiters
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "executed": self.leaders, "coalesced": self.coalesced}
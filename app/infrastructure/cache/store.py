@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.infrastructure.cache import codec
+from app.infrastructure.db.data_version import data_version
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key        TEXT PRIMARY KEY,
+    scope      TEXT NOT NULL,
+    name       TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    size       INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL,
+    used_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_used_at ON results (used_at);
+CREATE INDEX IF NOT EXISTS results_scope ON results (scope);
+"""
+
+
+def cache_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    value: Any
+    created_at: float
+
+
+class ResultCache:
+    """
+    Size-bounded result store in one SQLite file.
+
+    WAL mode plus a busy timeout lets several server processes read and write the same file;
+    every thread gets its own connection. Eviction drops least-recently-used entries once the
+    stored payload exceeds `max_bytes`.
+    """
+
+    # Touching used_at on every hit would turn reads into writes; refresh it at most this often.
+    TOUCH_INTERVAL_S = 60.0
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int,
+        open_ttl_s: float,
+        closed_ttl_s: float | None = None,
+        busy_timeout_ms: int = 5000,
+    ):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.open_ttl_s = open_ttl_s
+        self.closed_ttl_s = closed_ttl_s or None
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def get(self, key: str, track: bool = True) -> CacheHit | None:
+        """`track=False` leaves the hit/miss counters alone (bookkeeping reads, not results)."""
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT value, created_at, expires_at, used_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[2] is not None and row[2] <= now):
+                if track:
+                    self._count("misses")
+                return None
+            if now - row[3] > self.TOUCH_INTERVAL_S:
+                conn.execute("UPDATE results SET used_at = ? WHERE key = ?", (now, key))
+            hit = CacheHit(codec.loads(row[0]), row[1])
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            # A broken cache must never break a tool call; fall through to the database.
+            self._count("errors")
+            log.warning("result cache read failed: %s", e)
+            return None
+        if track:
+            self._count("hits")
+        return hit
+
+    def put(self, key: str, value: Any, *, scope: str, name: str, ttl_s: float | None) -> None:
+        try:
+            data = codec.dumps(value)
+        except TypeError as e:
+            log.debug("result not cacheable (%s): %s", name, e)
+            return
+        if len(data) > self.max_bytes // 4:
+            return
+        now = time.time()
+        expires = now + ttl_s if ttl_s else None
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, scope, name, value, size, created_at, expires_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, scope, name, data, len(data), now, expires, now),
+            )
+            self._count("writes")
+            self._evict(conn, now)
+        except sqlite3.Error as e:
+            self._count("errors")
+            log.warning("result cache write failed: %s", e)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM results WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        total = conn.execute("SELECT coalesce(sum(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Trim to 90% so we don't evict again on the very next write.
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY used_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM results WHERE key = ?", victims)
+        self._count("evictions", len(victims))
+
+    def invalidate(self, scope: str | None = None) -> int:
+        try:
+            conn = self._conn()
+            if scope is None:
+                cur = conn.execute("DELETE FROM results")
+            else:
+                cur = conn.execute("DELETE FROM results WHERE scope = ?", (scope,))
+            return cur.rowcount
+        except sqlite3.Error as e:
+            self._count("errors")
+            log.warning("result cache invalidate failed: %s", e)
+            return 0
+
+    def stats(self) -> dict:
+        try:
+            entries, size = self._conn().execute("SELECT count(*), coalesce(sum(size), 0) FROM results").fetchone()
+        except sqlite3.Error:
+            entries, size = None, None
+        with self._stats_lock:
+            return {
+                "path": str(self.path),
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "errors": self.errors,
+            }
+
+    def scoped(
+        self, scope: str, version: Callable[[], str], schema: str, derived: tuple[str, ...] = ()
+    ) -> ScopedCache:
+        return ScopedCache(self, scope, version, schema, derived)
+
+
+class ScopedCache:
+    """
+    A ResultCache view for one database + schema. `version` (the schema fingerprint) is part
+    of every key, so a migration simply stops matching old entries; `data_version` keys results
+    to the schema's write counters, so any insert/update/delete does the same for data (tables
+    in `derived` are maintained from others and don't count).
+    """
+
+    # A hit shouldn't cost a catalog round trip each time; writes show up this much later.
+    DATA_VERSION_MAX_AGE_S = 1.0
+
+    def __init__(
+        self,
+        cache: ResultCache,
+        scope: str,
+        version: Callable[[], str],
+        schema: str,
+        derived: tuple[str, ...] = (),
+    ):
+        self.cache = cache
+        self.scope = scope
+        self.version = version
+        self.schema = schema
+        self.derived = derived
+        self._lock = threading.Lock()
+        self._data_version: tuple[int, int, int] | None = None
+        self._data_version_at = 0.0
+
+    def key(self, name: str, *parts: Any) -> str:
+        return cache_key(self.scope, self.version(), name, *parts)
+
+    def data_version(self, session: Session) -> tuple[int, int, int]:
+        with self._lock:
+            fresh = time.monotonic() - self._data_version_at < self.DATA_VERSION_MAX_AGE_S
+            if self._data_version is not None and fresh:
+                return self._data_version
+        version = data_version(session, self.schema, self.derived)
+        with self._lock:
+            self._data_version, self._data_version_at = version, time.monotonic()
+        return version
+
+    def ttl_for(self, closed: bool) -> float | None:
+        # Windows that ended in the past only change through writes, which change the data version.
+        return self.cache.closed_ttl_s if closed else self.cache.open_ttl_s
+
+    def get(self, key: str) -> CacheHit | None:
+        return self.cache.get(key)
+
+    def put(self, key: str, value: Any, *, name: str, ttl_s: float | None) -> None:
+        self.cache.put(key, value, scope=self.scope, name=name, ttl_s=ttl_s)
+
+    def invalidate(self) -> int:
+        with self._lock:
+            self._data_version = None
+        return self.cache.invalidate(self.scope)
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Iterable, Mapping, Sequence
+
+
+def _to_float(v: Any) -> float | None:
+    return None if v is None else float(v)
+
+
+def _to_int(v: Any) -> int | None:
+    return None if v is None else int(v)
+
+
+def _to_iso(v: Any) -> str | None:
+    return None if v is None else v.isoformat()
+
+
+def _to_str(v: Any) -> str | None:
+    return None if v is None else str(v)
+
+
+def _column_kind(values: Sequence[Any]) -> str:
+    sample = next((v for v in values if v is not None), None)
+    if sample is None:
+        return "null"
+    # bool before int: bool is an int subclass
+    if isinstance(sample, bool):
+        return "bool"
+    if isinstance(sample, int):
+        return "int"
+    if isinstance(sample, (float, Decimal)):
+        return "float"
+    if isinstance(sample, datetime):
+        return "datetime"
+    if isinstance(sample, date):
+        return "date"
+    if isinstance(sample, time):
+        return "time"
+    if isinstance(sample, str):
+        return "str"
+    if isinstance(sample, (dict, list)):
+        return "json"
+    return "str"
+
+
+def _encode_column(values: Sequence[Any]) -> tuple[str, list]:
+    kind = _column_kind(values)
+    if kind == "int":
+        # Numeric aggregates can mix int and Decimal within a column; widen instead of truncating.
+        if any(isinstance(v, (float, Decimal)) for v in values):
+            return "float", [_to_float(v) for v in values]
+        return kind, [_to_int(v) for v in values]
+    if kind == "float":
+        return kind, [_to_float(v) for v in values]
+    if kind in ("datetime", "date", "time"):
+        return kind, [_to_iso(v) for v in values]
+    if kind == "str":
+        return kind, [_to_str(v) for v in values]
+    return kind, list(values)
+
+
+def encode_columnar(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> dict:
+    """
+    Column-oriented result: names once, then one typed array per column. Decimals become
+    floats and temporal values ISO strings, so the payload serializes without a fallback encoder.
+    """
+    rows = list(rows)
+    columns = list(columns)
+    cols = list(zip(*rows)) if rows else [() for _ in columns]
+
+    types, data = [], []
+    for values in cols:
+        kind, encoded = _encode_column(values)
+        types.append(kind)
+        data.append(encoded)
+
+    return {"format": "columnar", "columns": columns, "types": types, "data": data, "row_count": len(rows)}
+
+
+def columnar_from_mappings(rows: Sequence[Mapping[str, Any]]) -> dict:
+    columns = list(rows[0].keys()) if rows else []
+    return encode_columnar(columns, ([r.get(c) for c in columns] for r in rows))
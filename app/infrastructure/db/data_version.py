@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Modification counters for the schema's tables. Stats are flushed when a writer's transaction ends
+# (PG15+: within about a second), so writes from other clients show up almost immediately.
+# Only the write counters count: n_live_tup & co. move with autovacuum/ANALYZE on unchanged data.
+# TRUNCATE leaves the counters alone but gives the table a new relfilenode.
+_DATA_VERSION_SQL = """
+    SELECT count(*), coalesce(sum(n_tup_ins + n_tup_upd + n_tup_del), 0),
+           coalesce(sum(pg_relation_filenode(relid)::bigint), 0)
+    FROM pg_stat_user_tables
+    WHERE ({schemas}) AND relname <> ALL(:exclude)
+"""
+_SCHEMA_SQL = text(_DATA_VERSION_SQL.format(schemas="schemaname = ANY(:schemas)"))
+# Plus the session's search_path, which is where unqualified names in a query resolve.
+_QUERY_SQL = text(
+    _DATA_VERSION_SQL.format(schemas="schemaname = ANY(:schemas) OR schemaname = ANY(current_schemas(false))")
+)
+
+
+def data_version(session: Session, schema: str, exclude: tuple[str, ...] = ()) -> tuple[int, int, int]:
+    """Changes whenever a row of the schema's tables (minus `exclude`) is inserted, updated or deleted."""
+    return tuple(session.execute(_SCHEMA_SQL, {"schemas": [schema], "exclude": list(exclude)}).one())
+
+
+def query_data_version(session: Session, schemas: list[str]) -> tuple[int, int, int]:
+    """data_version over `schemas` and the session's search_path: everything a query may read."""
+    return tuple(session.execute(_QUERY_SQL, {"schemas": schemas, "exclude": []}).one())
@@ -1,7 +1,19 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING
+
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+if TYPE_CHECKING:
+    from app.config.settings import Settings
+
+
+PRE_PING_MODES = ("always", "idle", "never")
 
 
 def normalize_sqlalchemy_dsn(dsn: str) -> str:
@@ -13,11 +25,198 @@ def normalize_sqlalchemy_dsn(dsn: str) -> str:
     return dsn
 
 
-def build_engine(dsn: str) -> Engine:
-    return create_engine(
+class PoolStats:
+    """Thread-safe counters fed by pool events and checkout timing."""
+
+    def __init__(self, window: int = 1024) -> None:
+        self._lock = threading.Lock()
+        self._waits: deque[float] = deque(maxlen=window)
+        self.started = time.monotonic()
+        self.checkouts = 0
+        self.checkins = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.ping_failures = 0
+
+    def bump(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def record_wait(self, ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_ms_total += ms
+            self.wait_ms_max = max(self.wait_ms_max, ms)
+            self._waits.append(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            uptime_s = time.monotonic() - self.started
+            minutes = max(uptime_s / 60.0, 1e-9)
+
+            def pct(p: float) -> float | None:
+                if not waits:
+                    return None
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+            return {
+                "uptime_s": round(uptime_s, 1),
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "avg": round(self.wait_ms_total / self.checkouts, 3) if self.checkouts else None,
+                    "p50": pct(0.50),
+                    "p95": pct(0.95),
+                    "p99": pct(0.99),
+                    "max": round(self.wait_ms_max, 3),
+                    "sample_size": len(waits),
+                },
+                "churn": {
+                    "connects": self.connects,
+                    "closes": self.closes,
+                    "invalidations": self.invalidations,
+                    "connects_per_min": round(self.connects / minutes, 3),
+                },
+                "pre_ping": {"pings": self.pings, "failures": self.ping_failures},
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection."""
+
+    stats: PoolStats
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_wait(0.0, timed_out=True)
+            raise
+        self.stats.record_wait((time.perf_counter() - t0) * 1000.0)
+        return conn
+
+    def recreate(self) -> InstrumentedQueuePool:
+        # engine.dispose() swaps in a fresh pool; keep the counters running.
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def _connect_args(settings: Settings) -> dict:
+    args: dict = {
+        "connect_timeout": settings.db_connect_timeout_s,
+        "application_name": settings.db_application_name,
+    }
+    if settings.db_keepalives_idle_s > 0:
+        # Let the kernel probe idle sockets instead of pinging on every checkout.
+        args.update(
+            keepalives=1,
+            keepalives_idle=settings.db_keepalives_idle_s,
+            keepalives_interval=settings.db_keepalives_interval_s,
+            keepalives_count=settings.db_keepalives_count,
+        )
+    return args
+
+
+def _install_listeners(engine: Engine, settings: Settings) -> None:
+    stats: PoolStats = engine.pool.stats
+    idle_s = settings.db_pre_ping_idle_s
+    ping_idle = settings.db_pre_ping == "idle"
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record) -> None:
+        stats.bump("connects")
+
+    @event.listens_for(engine, "close")
+    def _on_close(dbapi_conn, record) -> None:
+        stats.bump("closes")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_conn, record, exception) -> None:
+        stats.bump("invalidations")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_conn, record) -> None:
+        stats.bump("checkins")
+        if record is not None:
+            record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_conn, record, proxy) -> None:
+        if not ping_idle:
+            return
+        last = record.info.get("checked_in_at")
+        if last is None or time.monotonic() - last < idle_s:
+            return
+        stats.bump("pings")
+        try:
+            cur = dbapi_conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+            finally:
+                cur.close()
+        except Exception as e:
+            stats.bump("ping_failures")
+            # The pool discards this connection and retries with a fresh one.
+            raise exc.DisconnectionError(str(e).splitlines()[0] if str(e) else "ping failed") from e
+
+
+def build_engine(dsn: str, settings: Settings) -> Engine:
+    if settings.db_pre_ping not in PRE_PING_MODES:
+        raise ValueError(f"db_pre_ping must be one of {PRE_PING_MODES}")
+
+    engine = create_engine(
         dsn,
-        pool_size=10,
-        max_overflow=20,
-        pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_s,
+        pool_recycle=settings.db_pool_recycle_s,
+        pool_pre_ping=settings.db_pre_ping == "always",
+        pool_use_lifo=settings.db_pool_use_lifo,
+        connect_args=_connect_args(settings),
+        query_cache_size=settings.db_query_cache_size,
         future=True,
     )
+    _install_listeners(engine, settings)
+    return engine
+
+
+def pool_status(engine: Engine, settings: Settings) -> dict:
+    pool = engine.pool
+    stats = getattr(pool, "stats", None)
+    return {
+        "pool_class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "config": {
+            "pool_size": settings.db_pool_size,
+            "max_overflow": settings.db_max_overflow,
+            "pool_timeout_s": settings.db_pool_timeout_s,
+            "pool_recycle_s": settings.db_pool_recycle_s,
+            "pre_ping": settings.db_pre_ping,
+            "pre_ping_idle_s": settings.db_pre_ping_idle_s if settings.db_pre_ping == "idle" else None,
+            "use_lifo": settings.db_pool_use_lifo,
+            "application_name": settings.db_application_name,
+            "connect_timeout_s": settings.db_connect_timeout_s,
+            "keepalives_idle_s": settings.db_keepalives_idle_s or None,
+        },
+        "stats": stats.snapshot() if stats is not None else None,
+    }
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+
+class QueryCancelled(RuntimeError):
+    pass
+
+
+class InflightCall:
+    """One tool invocation: its statement timeout and the driver connections it is using.
+
+    `cancel()` may be called from another thread; it asks Postgres to cancel whatever
+    each attached connection is running and blocks new transactions from starting.
+    """
+
+    def __init__(self, tool: str, timeout_ms: int | None) -> None:
+        self.tool = tool
+        self.timeout_ms = timeout_ms
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._conns: set[Any] = set()
+
+    def attach(self, driver_conn: Any) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled(f"{self.tool} was cancelled by the client.")
+            self._conns.add(driver_conn)
+
+    def detach(self, driver_conn: Any) -> None:
+        # Taking the lock means a concurrent cancel() finishes before the connection
+        # goes back to the pool, so it can never hit someone else's query.
+        with self._lock:
+            self._conns.discard(driver_conn)
+
+    def cancel(self) -> int:
+        with self._lock:
+            self.cancelled = True
+            conns = list(self._conns)
+            for conn in conns:
+                try:
+                    cancel = getattr(conn, "cancel_safe", None) or conn.cancel
+                    cancel()
+                except Exception:
+                    pass
+            return len(conns)
+
+
+_current: ContextVar[InflightCall | None] = ContextVar("inflight_call", default=None)
+
+
+def current_call() -> InflightCall | None:
+    return _current.get()
+
+
+@contextmanager
+def bind_call(call: InflightCall) -> Iterator[InflightCall]:
+    token = _current.set(call)
+    try:
+        yield call
+    finally:
+        _current.reset(token)
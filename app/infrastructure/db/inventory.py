@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    Table,
+    func,
+    text,
+)
+from sqlalchemy.types import TypeEngine
+
+SNAPSHOT_TABLE = "inventory_snapshot"
+STATE_TABLE = "inventory_snapshot_state"
+
+_QTY_CANDIDATES = ("quantity_delta", "qty_delta", "quantity")
+
+
+def movement_columns(movements: Table) -> tuple[str, str]:
+    """
+    (id, quantity delta) columns of stock_movements. The id is the high-water mark, so it has
+    to be a single integer primary key that only grows.
+    """
+    pk = list(movements.primary_key.columns)
+    if len(pk) != 1 or not isinstance(pk[0].type, Integer):
+        raise RuntimeError("stock_movements needs a single integer primary key for the inventory snapshot.")
+    for name in _QTY_CANDIDATES:
+        if name in movements.c:
+            return pk[0].name, name
+    raise RuntimeError(f"Could not find any of {list(_QTY_CANDIDATES)} in table 'stock_movements'.")
+
+
+def snapshot_tables(schema: str, product_id_type: TypeEngine) -> tuple[Table, Table]:
+    """
+    On-hand per product plus a one-row state table with the last applied movement id.
+    The (on_hand, product_id) index turns `on_hand <= threshold` into an index range scan.
+    """
+    md = MetaData(schema=schema)
+    snapshot = Table(
+        SNAPSHOT_TABLE,
+        md,
+        Column("product_id", product_id_type, primary_key=True, autoincrement=False),
+        Column("on_hand", BigInteger, nullable=False),
+        Column("updated_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+        Index(f"{SNAPSHOT_TABLE}_on_hand", "on_hand", "product_id"),
+    )
+    state = Table(
+        STATE_TABLE,
+        md,
+        Column("id", Boolean, primary_key=True, server_default=text("true")),
+        Column("high_water_mark", BigInteger, nullable=False),
+        Column("refreshed_at", DateTime(timezone=True), nullable=False, server_default=func.now()),
+        CheckConstraint("id", name=f"{STATE_TABLE}_single_row"),
+    )
+    return snapshot, state
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import time
+
+from sqlalchemy import Connection, Engine, func, select
+from sqlalchemy.orm import Session
+
+log = logging.getLogger(__name__)
+
+# Advisory locks are keyed by name so every process (and every HTTP worker) agrees on the key.
+# Transaction-scoped ones are released at commit/rollback, so a crashed holder never leaves one behind.
+
+
+def xact_lock(session: Session, name: str) -> None:
+    """Waits for the lock `name` and holds it until the session's transaction ends."""
+    session.execute(select(func.pg_advisory_xact_lock(func.hashtext(name))))
+
+
+def try_xact_lock(session: Session, name: str) -> bool:
+    """Takes the lock `name` for the rest of the transaction if it is free; False if another session holds it."""
+    return bool(session.execute(select(func.pg_try_advisory_xact_lock(func.hashtext(name)))).scalar())
+
+
+class LeaderLease:
+    """
+    Leader election across processes: a session-level advisory lock held on a dedicated
+    connection. The process that takes it first leads until it exits or its connection drops
+    (the server then releases the lock); the others try again every `retry_s`.
+    """
+
+    def __init__(self, engine: Engine, name: str, retry_s: float = 10.0):
+        self.engine = engine
+        self.name = name
+        self.retry_s = retry_s
+        self._conn: Connection | None = None
+        self._next_try = 0.0
+
+    @property
+    def is_held(self) -> bool:
+        return self._conn is not None
+
+    def held(self) -> bool:
+        """Checks (and if due, tries to take) the lease. Not thread-safe: call it from one thread."""
+        if self._conn is not None:
+            try:
+                self._conn.execute(select(1))
+                return True
+            except Exception as e:
+                log.warning("lost leadership of %s: %s", self.name, str(e).splitlines()[0])
+                self._drop()
+        now = time.monotonic()
+        if now < self._next_try:
+            return False
+        self._next_try = now + self.retry_s
+        try:
+            conn = self.engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        except Exception as e:
+            log.warning("leader election for %s failed: %s", self.name, str(e).splitlines()[0])
+            return False
+        try:
+            acquired = conn.execute(select(func.pg_try_advisory_lock(func.hashtext(self.name)))).scalar()
+        except Exception as e:
+            log.warning("leader election for %s failed: %s", self.name, str(e).splitlines()[0])
+            acquired = False
+        if not acquired:
+            conn.close()
+            return False
+        log.info("this process now leads %s", self.name)
+        self._conn = conn
+        return True
+
+    def _drop(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            # Never hand a connection that may still hold the lock back to the pool.
+            conn.invalidate()
+            conn.close()
+
+    def release(self) -> None:
+        conn = self._conn
+        if conn is None:
+            return
+        try:
+            conn.execute(select(func.pg_advisory_unlock(func.hashtext(self.name))))
+            self._conn = None
+            conn.close()
+        except Exception:
+            self._drop()
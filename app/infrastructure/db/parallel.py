@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+from app.infrastructure.db.uow import SqlAlchemyUnitOfWork
+
+
+def run_parallel(
+    uow_factory: Callable[[], SqlAlchemyUnitOfWork],
+    calls: list[Callable[[Session], Any]],
+    max_workers: int,
+) -> list[dict]:
+    """
+    Runs independent read calls concurrently, each in its own unit of work (and so on its own
+    pooled connection). Results keep input order; a failing call doesn't affect the others.
+    """
+
+    def one(call: Callable[[Session], Any]) -> dict:
+        t0 = time.perf_counter()
+        try:
+            with uow_factory() as uow:
+                result = call(uow.session)
+            return {"ok": True, "result": result, "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+        except Exception as e:
+            # First line only: SQLAlchemy appends the SQL and a docs link.
+            return {"ok": False, "error": str(e).splitlines()[0], "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    if not calls:
+        return []
+    if len(calls) == 1 or max_workers <= 1:
+        return [one(c) for c in calls]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(calls)), thread_name_prefix="db-parallel") as pool:
+        # Copy the caller's context so workers inherit its in-flight call (timeout, cancellation).
+        futures = [pool.submit(copy_context().run, one, c) for c in calls]
+        return [f.result() for f in futures]
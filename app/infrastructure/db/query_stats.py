@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+SORT_KEYS = ("total_ms", "calls", "avg_ms", "max_ms", "rows", "errors", "cache_hits")
+
+
+@dataclass
+class FingerprintStats:
+    fingerprint: str
+    text: str
+    example: str
+    calls: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+    last_seen: float = field(default_factory=time.time)
+
+    def as_dict(self) -> dict:
+        executed = self.calls - self.cache_hits
+        return {
+            "fingerprint": self.fingerprint,
+            "query": self.text,
+            "example": self.example,
+            "calls": self.calls,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "total_ms": round(self.total_ms, 1),
+            "avg_ms": round(self.total_ms / executed, 1) if executed else None,
+            "max_ms": round(self.max_ms, 1),
+            "rows": self.rows,
+            "last_seen": datetime.fromtimestamp(self.last_seen, timezone.utc).isoformat(),
+        }
+
+
+class QueryStats:
+    """
+    In-process execution statistics per query fingerprint (literals collapsed), bounded to
+    `max_fingerprints`; the least recently seen shape is dropped first.
+    """
+
+    EXAMPLE_CHARS = 500
+
+    def __init__(self, max_fingerprints: int = 500):
+        self.max_fingerprints = max(1, max_fingerprints)
+        self._items: OrderedDict[str, FingerprintStats] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        fingerprint: str,
+        text: str,
+        example: str,
+        *,
+        elapsed_ms: float = 0.0,
+        rows: int = 0,
+        error: bool = False,
+        cache_hit: bool = False,
+    ) -> None:
+        with self._lock:
+            item = self._items.get(fingerprint)
+            if item is None:
+                item = FingerprintStats(fingerprint, text, example[: self.EXAMPLE_CHARS])
+                self._items[fingerprint] = item
+                while len(self._items) > self.max_fingerprints:
+                    self._items.popitem(last=False)
+            else:
+                self._items.move_to_end(fingerprint)
+            item.calls += 1
+            item.last_seen = time.time()
+            if error:
+                item.errors += 1
+            elif cache_hit:
+                item.cache_hits += 1
+                item.rows += rows
+            else:
+                item.total_ms += elapsed_ms
+                item.max_ms = max(item.max_ms, elapsed_ms)
+                item.rows += rows
+
+    def top(self, sort: str = "total_ms", limit: int = 20) -> list[dict]:
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+        with self._lock:
+            rows = [item.as_dict() for item in self._items.values()]
+        rows.sort(key=lambda r: r[sort] or 0, reverse=True)
+        return rows[:limit]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def reset(self) -> int:
+        with self._lock:
+            n = len(self._items)
+            self._items.clear()
+            return n
@@ -1,31 +1,92 @@
 from __future__ import annotations
 
-from functools import lru_cache
+import hashlib
+import json
+import threading
+from typing import Any, Callable
 
 from sqlalchemy import inspect, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.engine.reflection import ObjectKind
+
+from app.infrastructure.db.snapshots import SnapshotStore
 
 
 class SchemaReflection:
-    def __init__(self, engine: Engine, schema: str = "public"):
+    """
+    Cached metadata for one schema. Caches live on the instance (not a shared lru_cache),
+    so each tenant's snapshot is dropped together with its reflection object.
+    """
+
+    def __init__(self, engine: Engine, schema: str = "public", store: SnapshotStore | None = None):
         self.engine = engine
         self.schema = schema
+        self.store = store
+        self._lock = threading.Lock()
+        self._cache: dict[tuple, Any] = {}
 
     def clear_cache(self) -> None:
-        self.table_exists.cache_clear()
-        self.relation_exists.cache_clear()
-        self.columns_for.cache_clear()
-        self.generated_columns.cache_clear()
+        with self._lock:
+            self._cache.clear()
+        if self.store is not None:
+            self.store.drop(self.schema)
+
+    def _cached(self, key: tuple, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = load()
+        with self._lock:
+            return self._cache.setdefault(key, value)
+
+    def _snapshot(self) -> dict:
+        """Tables, views and column names of the whole schema, reflected in one pass."""
+
+        def load() -> dict:
+            stored = self.store.load(self.schema) if self.store is not None else None
+            if stored is not None:
+                return {
+                    "tables": set(stored["tables"]),
+                    "views": set(stored["views"]),
+                    "columns": {t: set(cols) for t, cols in stored["columns"].items()},
+                }
+            insp = inspect(self.engine)
+            tables = set(insp.get_table_names(schema=self.schema))
+            views = set(insp.get_view_names(schema=self.schema))
+            multi = insp.get_multi_columns(schema=self.schema, kind=ObjectKind.ANY)
+            columns = {name: {c["name"] for c in cols} for (_, name), cols in multi.items()}
+            if self.store is not None:
+                self.store.save(
+                    self.schema,
+                    {
+                        "tables": sorted(tables),
+                        "views": sorted(views),
+                        "columns": {t: sorted(cols) for t, cols in columns.items()},
+                    },
+                )
+            return {"tables": tables, "views": views, "columns": columns}
+
+        return self._cached(("snapshot",), load)
+
+    def fingerprint(self) -> str:
+        """Short hash of the snapshot; changes whenever tables, views or columns do."""
+
+        def load() -> str:
+            snap = self._snapshot()
+            raw = json.dumps(
+                [sorted(snap["tables"]), sorted(snap["views"]), {t: sorted(c) for t, c in snap["columns"].items()}],
+                sort_keys=True,
+            )
+            return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+        return self._cached(("fingerprint",), load)
 
-    @lru_cache(maxsize=256)
     def table_exists(self, table: str) -> bool:
-        insp = inspect(self.engine)
-        return table in insp.get_table_names(schema=self.schema)
+        return table in self._snapshot()["tables"]
 
-    @lru_cache(maxsize=256)
     def relation_exists(self, name: str) -> bool:
-        insp = inspect(self.engine)
-        return (name in insp.get_table_names(schema=self.schema)) or (name in insp.get_view_names(schema=self.schema))
+        snap = self._snapshot()
+        return name in snap["tables"] or name in snap["views"]
 
     def list_tables(self) -> list[str]:
         insp = inspect(self.engine)
@@ -46,17 +107,21 @@ class SchemaReflection:
             )
         return out
 
-    @lru_cache(maxsize=256)
     def columns_for(self, table: str) -> set[str]:
-        insp = inspect(self.engine)
-        cols = insp.get_columns(table, schema=self.schema)
-        return {c["name"] for c in cols}
+        cols = self._snapshot()["columns"].get(table)
+        if cols is None:
+            # Not in the snapshot (created since, or not a plain relation): ask directly.
+            insp = inspect(self.engine)
+            return self._cached(
+                ("columns", table), lambda: {c["name"] for c in insp.get_columns(table, schema=self.schema)}
+            )
+        return cols
 
     def require_tables(self, *tables: str) -> None:
         missing = [t for t in tables if not self.table_exists(t)]
         if missing:
             raise RuntimeError(
-                "Missing required tables in schema 'public': " + ", ".join(missing) + ". "
+                "Missing required tables in schema '" + self.schema + "': " + ", ".join(missing) + ". "
                 "Create your schema first, then retry."
             )
 
@@ -67,8 +132,10 @@ class SchemaReflection:
                 return c
         raise RuntimeError(f"Could not find any of {list(candidates)} in table '{table}'.")
 
-    @lru_cache(maxsize=256)
     def generated_columns(self, table: str) -> set[str]:
+        return self._cached(("generated", table), lambda: self._load_generated_columns(table))
+
+    def _load_generated_columns(self, table: str) -> set[str]:
         # Best-effort for Postgres via information_schema
         q = text(
             """
@@ -86,3 +153,31 @@ class SchemaReflection:
                 elif r.get("generation_expression"):
                     gen.add(r["column_name"])
         return gen
+
+    def partition_key(self, table: str) -> tuple[str, ...] | None:
+        """
+        Key columns of a partitioned parent (relkind 'p'), or None for plain tables.
+        Expression keys (attnum 0) are skipped since queries can't target them by column.
+        """
+        return self._cached(("partition_key", table), lambda: self._load_partition_key(table))
+
+    def _load_partition_key(self, table: str) -> tuple[str, ...] | None:
+        q = text(
+            """
+            SELECT ARRAY(
+                       SELECT a.attname
+                       FROM unnest(pt.partattrs::int2[]) WITH ORDINALITY AS k(attnum, ord)
+                       JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = k.attnum
+                       ORDER BY k.ord
+                   ) AS key_cols
+            FROM pg_partitioned_table pt
+            JOIN pg_class c ON c.oid = pt.partrelid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :s AND c.relname = :t
+            """
+        )
+        with self.engine.connect() as conn:
+            row = conn.execute(q, {"s": self.schema, "t": table}).mappings().first()
+        if row is None:
+            return None
+        return tuple(row["key_cols"] or ())
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+
+def dsn_namespace(dsn: str) -> str:
+    """Short stable id for a database, so one state dir can serve several DSNs."""
+    return hashlib.sha1((dsn or "").encode("utf-8")).hexdigest()[:12]
+
+
+class SnapshotStore:
+    """
+    Schema snapshots on disk, shared by every process pointed at the same state dir
+    (e.g. HTTP workers), so only the first one pays for reflection.
+    """
+
+    def __init__(self, directory: str | os.PathLike, namespace: str, ttl_s: int):
+        self.directory = Path(directory)
+        self.namespace = namespace
+        self.ttl_s = ttl_s
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, schema: str) -> Path:
+        return self.directory / f"schema-{self.namespace}-{schema}.json"
+
+    def load(self, schema: str) -> dict | None:
+        path = self._path(schema)
+        try:
+            if self.ttl_s > 0 and time.time() - path.stat().st_mtime > self.ttl_s:
+                return None
+            with path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, schema: str, snapshot: dict) -> None:
+        # Write-then-rename so readers never see a half-written file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".schema-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(tmp, self._path(schema))
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def drop(self, schema: str) -> None:
+        try:
+            self._path(schema).unlink()
+        except FileNotFoundError:
+            pass
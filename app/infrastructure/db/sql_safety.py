@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import hashlib
+import re
+
 READ_ONLY_START = ("select", "with", "show", "explain")
 
 
@@ -18,3 +21,71 @@ def is_readonly_sql(sql: str) -> bool:
         return False
     first = s.split(None, 1)[0]
     return first in READ_ONLY_START
+
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<dollar>\$\$.*?\$\$|\$(?P<tag>[A-Za-z_]\w*)\$.*?\$(?P=tag)\$)
+    | (?P<string>[EeBbXxNn]?'(?:[^']|'')*')
+    | (?P<ident>"(?:[^"]|"")*")
+    | (?P<param>\$\d+)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    | (?P<op>::|<>|!=|<=|>=|\|\||.)
+    """,
+    re.S | re.X,
+)
+_IN_LIST_RE = re.compile(r"\( \?(?: , \?)+ \)")
+
+
+def _sql_tokens(sql: str) -> list[tuple[str, str]]:
+    return [(m.lastgroup if m.lastgroup != "tag" else "dollar", m.group()) for m in _TOKEN_RE.finditer(sql)]
+
+
+def canonical_sql(sql: str) -> str:
+    """
+    Exact-match form: comments dropped, whitespace collapsed, unquoted words lower-cased
+    (Postgres folds them anyway). Literals are kept, so equal text means the same query.
+    """
+    out = []
+    for kind, tok in _sql_tokens(normalize_sql(sql)):
+        if kind in ("ws", "comment"):
+            continue
+        out.append(tok.lower() if kind == "word" else tok)
+    return " ".join(out)
+
+
+def fingerprint_sql(sql: str) -> tuple[str, str]:
+    """
+    Query shape with literals collapsed: `WHERE id = 7` and `where id=8` share a fingerprint,
+    and so do IN lists of any length. Returns (fingerprint hash, normalized text).
+    """
+    out = []
+    for kind, tok in _sql_tokens(normalize_sql(sql)):
+        if kind in ("ws", "comment"):
+            continue
+        if kind in ("string", "dollar", "number"):
+            out.append("?")
+        else:
+            out.append(tok.lower() if kind == "word" else tok)
+    text = _IN_LIST_RE.sub("( ?... )", " ".join(out))
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16], text
+
+
+def _name(kind: str, tok: str) -> str:
+    return tok[1:-1].replace('""', '"') if kind == "ident" else tok.lower()
+
+
+def qualifier_names(sql: str) -> list[str]:
+    """
+    Every name written before a `.` (`sales.orders`, `o.total`): a superset of the schemas the
+    query names explicitly, since table aliases look the same. Sorted, folded as Postgres would.
+    """
+    toks = [(k, t) for k, t in _sql_tokens(normalize_sql(sql)) if k not in ("ws", "comment")]
+    names = set()
+    for (k1, t1), (k2, t2), (k3, _) in zip(toks, toks[1:], toks[2:]):
+        if k1 in ("word", "ident") and k2 == "op" and t2 == "." and k3 in ("word", "ident"):
+            names.add(_name(k1, t1))
+    return sorted(names)
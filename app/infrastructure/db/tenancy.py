@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+T = TypeVar("T")
+
+_SCHEMA_RE = re.compile(r"^[a-z_][a-z0-9_$]{0,62}$")
+
+
+def validate_schema_name(name: str) -> str:
+    """Tenant schemas are plain lower-case identifiers; anything else is rejected, not quoted."""
+    name = (name or "").strip()
+    if not _SCHEMA_RE.match(name) or name.startswith("pg_") or name == "information_schema":
+        raise ValueError(f"Invalid tenant schema name '{name}'.")
+    return name
+
+
+def search_path_for(schema: str) -> str:
+    # Only the tenant schema (pg_catalog is always implied); no fallback to public,
+    # so an unqualified name can never resolve to another tenant's table.
+    return f'"{validate_schema_name(schema)}"'
+
+
+def schema_exists(engine: Engine, schema: str) -> bool:
+    with engine.connect() as conn:
+        q = text("SELECT 1 FROM pg_namespace WHERE nspname = :s")
+        return conn.execute(q, {"s": schema}).first() is not None
+
+
+class BoundedLRU(Generic[T]):
+    """Thread-safe LRU of lazily built values; the build runs outside the lock."""
+
+    def __init__(self, build: Callable[[str], T], maxsize: int):
+        self._build = build
+        self.maxsize = max(1, maxsize)
+        self._items: OrderedDict[str, T] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> T:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+        value = self._build(key)
+        with self._lock:
+            if key in self._items:
+                # Another thread built it first; keep theirs.
+                self._items.move_to_end(key)
+                return self._items[key]
+            self._items[key] = value
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+            return value
+
+    def pop(self, key: str) -> T | None:
+        with self._lock:
+            return self._items.pop(key, None)
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._items)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,18 +1,58 @@
 from __future__ import annotations
 
+from sqlalchemy import event, text
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
+from app.infrastructure.db.inflight import InflightCall
+
 
 class SqlAlchemyUnitOfWork:
-    def __init__(self, engine: Engine):
+    def __init__(
+        self,
+        engine: Engine,
+        statement_timeout_ms: int | None = None,
+        call: InflightCall | None = None,
+        search_path: str | None = None,
+    ):
         self.engine = engine
+        self.statement_timeout_ms = statement_timeout_ms
+        self.call = call
+        self.search_path = search_path
         self.session: Session | None = None
+        self._driver_conns: list = []
 
     def __enter__(self):
         self.session = Session(self.engine, future=True, expire_on_commit=False)
+        if self.statement_timeout_ms or self.search_path or self.call is not None:
+            event.listen(self.session, "after_begin", self._after_begin)
+        if self.call is not None:
+            # Detach before the connection is handed back to the pool.
+            event.listen(self.session, "after_commit", self._detach)
+            event.listen(self.session, "after_rollback", self._detach)
         return self
 
+    def _after_begin(self, session, transaction, connection) -> None:
+        if self.call is not None:
+            driver_conn = connection.connection.driver_connection
+            self.call.attach(driver_conn)
+            self._driver_conns.append(driver_conn)
+        # Transaction-scoped, like SET LOCAL, but accepts bound parameters; one round trip for both.
+        settings, params = [], {}
+        if self.statement_timeout_ms:
+            settings.append("set_config('statement_timeout', :ms, true)")
+            params["ms"] = f"{int(self.statement_timeout_ms)}ms"
+        if self.search_path:
+            settings.append("set_config('search_path', :sp, true)")
+            params["sp"] = self.search_path
+        if settings:
+            connection.execute(text("SELECT " + ", ".join(settings)), params)
+
+    def _detach(self, *_args) -> None:
+        for driver_conn in self._driver_conns:
+            self.call.detach(driver_conn)
+        self._driver_conns.clear()
+
     def __exit__(self, exc_type, exc, tb):
         try:
             if exc_type:
@@ -20,4 +60,6 @@ class SqlAlchemyUnitOfWork:
             else:
                 self.session.commit()
         finally:
+            if self.call is not None:
+                self._detach()
             self.session.close()
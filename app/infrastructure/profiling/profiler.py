@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+MAX_DEPTH = 64
+TOP_ALLOCATIONS = 25
+# Leaf frame -> where the time went; the first matching path fragment wins.
+COMPONENTS = (
+    ("/psycopg", "database"),
+    ("/sqlalchemy/", "sqlalchemy"),
+    ("/matplotlib/", "matplotlib"),
+    ("/numpy/", "numpy"),
+    ("/pydantic", "serialization"),
+    ("/json/", "serialization"),
+    ("/app/", "app"),
+)
+_IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, threading.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+_ROOT = str(Path(__file__).resolve().parents[3]) + os.sep
+
+
+def component(frame: str) -> str:
+    frame = "/" + frame
+    for fragment, name in COMPONENTS:
+        if fragment in frame:
+            return name
+    return "other"
+
+
+def _short(filename: str) -> str:
+    if filename.startswith(_ROOT):
+        return filename[len(_ROOT):]
+    head, sep, tail = filename.rpartition("site-packages" + os.sep)
+    return tail if sep else filename
+
+
+class _Sampler(threading.Thread):
+    """Samples one thread's Python stack every `interval_s` until stopped."""
+
+    def __init__(self, target: int, interval_s: float, outer: set):
+        super().__init__(name="tool-profiler", daemon=True)
+        self.target = target
+        self.interval_s = interval_s
+        self.outer = outer
+        self.stacks: Counter[tuple[str, ...]] = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval_s):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            # Leaf to root, stopping at the frames that were already there when profiling began.
+            while frame is not None and frame not in self.outer and len(stack) < MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f"{_short(code.co_filename)}:{code.co_firstlineno} {code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+class ToolProfiler:
+    """
+    Opt-in profiling of tool calls: a sampling thread records the calling thread's stacks and
+    tracemalloc diffs allocations, on a random `sample_rate` of calls. Each profiled call is
+    written to `directory` as one JSON file; the newest `max_files` are kept.
+
+    tracemalloc is process-wide and is only active while at least one profiled call runs, so
+    allocations of calls overlapping a profiled one are attributed to it as well.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 1.0,
+        interval_ms: float = 5.0,
+        trace_allocations: bool = True,
+        max_files: int = 1000,
+    ):
+        self.directory = Path(directory).expanduser()
+        self.sample_rate = sample_rate
+        self.interval_s = max(interval_ms, 0.5) / 1000
+        self.trace_allocations = trace_allocations
+        self.max_files = max_files
+        self._lock = threading.Lock()
+        self._tracing = 0
+        self._owns_tracing = False
+        self._written = 0
+
+    def maybe_profile(self, tool: str):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return nullcontext()
+        return self.profile(tool)
+
+    @contextmanager
+    def profile(self, tool: str):
+        # Holding the frames (not their ids) keeps ids of finished frames from being reused.
+        outer = set()
+        frame = sys._getframe()
+        while frame is not None:
+            outer.add(frame)
+            frame = frame.f_back
+        before = self._start_tracing()
+        sampler = _Sampler(threading.get_ident(), self.interval_s, outer)
+        started_at = datetime.now(timezone.utc)
+        t0, cpu0 = time.perf_counter(), time.thread_time()
+        sampler.start()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            sampler.stop()
+            wall_ms, cpu_ms = (time.perf_counter() - t0) * 1000, (time.thread_time() - cpu0) * 1000
+            allocations, peak_kb = self._stop_tracing(before)
+            try:
+                self._write(
+                    {
+                        "tool": tool,
+                        "started_at": started_at.isoformat(),
+                        "wall_ms": round(wall_ms, 2),
+                        "cpu_ms": round(cpu_ms, 2),
+                        "interval_ms": round(self.interval_s * 1000, 2),
+                        "samples": sampler.samples,
+                        "peak_kb": peak_kb,
+                        "error": error,
+                        "stacks": [{"stack": list(s), "samples": n} for s, n in sampler.stacks.most_common()],
+                        "allocations": allocations,
+                    }
+                )
+            except OSError as e:
+                log.warning("could not write profile for %s: %s", tool, e)
+
+    def _start_tracing(self) -> tuple[tracemalloc.Snapshot, int] | None:
+        if not self.trace_allocations:
+            return None
+        with self._lock:
+            if self._tracing == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(1)
+                self._owns_tracing = True
+            self._tracing += 1
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        return tracemalloc.take_snapshot().filter_traces(_IGNORED), baseline
+
+    def _stop_tracing(self, before: tuple[tracemalloc.Snapshot, int] | None) -> tuple[list[dict] | None, float | None]:
+        """Top allocation sites still alive at the end, and the peak above the starting level."""
+        if before is None:
+            return None, None
+        snapshot, baseline = before
+        peak = tracemalloc.get_traced_memory()[1]
+        diff = tracemalloc.take_snapshot().filter_traces(_IGNORED).compare_to(snapshot, "lineno")
+        with self._lock:
+            self._tracing -= 1
+            if self._tracing == 0 and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+        top = sorted((d for d in diff if d.size_diff > 0), key=lambda d: d.size_diff, reverse=True)
+        return [
+            {
+                "location": f"{_short(d.traceback[0].filename)}:{d.traceback[0].lineno}",
+                "size_kb": round(d.size_diff / 1024, 1),
+                "count": d.count_diff,
+            }
+            for d in top[:TOP_ALLOCATIONS]
+        ], round(max(0, peak - baseline) / 1024, 1)
+
+    def _write(self, profile: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        path = self.directory / f"{stamp}-{profile['tool']}-{os.getpid()}-{threading.get_ident()}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(profile), encoding="utf-8")
+        os.replace(tmp, path)
+        with self._lock:
+            self._written += 1
+            prune = self._written % 50 == 0
+        if prune:
+            self._prune()
+
+    def _files(self) -> list[Path]:
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob("*.json"))
+
+    def _prune(self) -> None:
+        files = self._files()
+        for path in files[: max(0, len(files) - self.max_files)]:
+            path.unlink(missing_ok=True)
+
+    def clear(self) -> int:
+        files = self._files()
+        for path in files:
+            path.unlink(missing_ok=True)
+        return len(files)
+
+    def summary(self, tool: str | None = None, top: int = 20) -> dict:
+        """Hotspots over the stored profiles: self and inclusive samples per frame, by component."""
+        calls: dict[str, list[tuple[float, float, float | None]]] = {}
+        self_samples: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        components: Counter[str] = Counter()
+        allocations: Counter[str] = Counter()
+        total = 0
+        for path in self._files():
+            try:
+                profile = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if tool and profile.get("tool") != tool:
+                continue
+            calls.setdefault(profile["tool"], []).append((profile["wall_ms"], profile["cpu_ms"], profile.get("peak_kb")))
+            for entry in profile.get("stacks", []):
+                stack, n = entry["stack"], entry["samples"]
+                total += n
+                self_samples[stack[-1]] += n
+                components[component(stack[-1])] += n
+                for frame in set(stack):
+                    inclusive[frame] += n
+            for a in profile.get("allocations") or []:
+                allocations[a["location"]] += a["size_kb"]
+
+        def pct(n: int) -> float:
+            return round(100.0 * n / total, 1) if total else 0.0
+
+        def timing(values: list[float]) -> dict:
+            values = sorted(values)
+            return {
+                "avg_ms": round(sum(values) / len(values), 1),
+                "p95_ms": round(values[min(len(values) - 1, int(0.95 * len(values)))], 1),
+                "max_ms": round(values[-1], 1),
+            }
+
+        return {
+            "directory": str(self.directory),
+            "profiles": sum(len(v) for v in calls.values()),
+            "samples": total,
+            "tools": {
+                name: {
+                    "calls": len(v),
+                    "wall": timing([w for w, _, _ in v]),
+                    "cpu": timing([c for _, c, _ in v]),
+                    "peak_kb_max": max((p for _, _, p in v if p is not None), default=None),
+                }
+                for name, v in sorted(calls.items())
+            },
+            "components": {name: {"samples": n, "pct": pct(n)} for name, n in components.most_common()},
+            "self": [{"frame": f, "samples": n, "pct": pct(n)} for f, n in self_samples.most_common(top)],
+            "inclusive": [{"frame": f, "samples": n, "pct": pct(n)} for f, n in inclusive.most_common(top)],
+            "allocations": [{"location": loc, "size_kb": round(kb, 1)} for loc, kb in allocations.most_common(top)],
+        }
@@ -4,14 +4,56 @@ from app.config.logging import configure_logging
 from app.config.settings import Settings
 from app.container import build_container
 from app.presentation.mcp_server import build_mcp_server
+from app.warmup import start_warmup
+
+
+def create_http_app():
+    """
+    ASGI app for the streamable-HTTP transport. Uvicorn calls this once per worker process,
+    so each worker builds its own pool; warm schema metadata is shared through STATE_DIR.
+    """
+    settings = Settings()
+    configure_logging(settings.log_level)
+
+    container = build_container(settings)
+    mcp = build_mcp_server(container)
+    start_warmup(container)
+    container.precompute.start()
+    container.inventory.start(container.uow_factory, settings.inventory_refresh_interval_s)
+    return mcp.http_app(path=settings.http_path, stateless_http=settings.http_stateless)
+
+
+def serve_http(settings: Settings) -> None:
+    import uvicorn
+
+    if settings.http_workers > 1 and not settings.http_stateless:
+        # Sessions live in one worker's memory; without sticky routing the next request may land elsewhere.
+        raise ValueError("HTTP_WORKERS > 1 requires HTTP_STATELESS=true.")
+
+    uvicorn.run(
+        "app.main:create_http_app",
+        factory=True,
+        host=settings.http_host,
+        port=settings.http_port,
+        workers=settings.http_workers,
+        limit_concurrency=settings.http_limit_concurrency,
+        log_level=settings.log_level.lower(),
+    )
 
 
 def main() -> None:
     settings = Settings()  # loads .env automatically
     configure_logging(settings.log_level)
 
+    if settings.transport == "http":
+        serve_http(settings)
+        return
+
     container = build_container(settings)
     mcp = build_mcp_server(container)
+    start_warmup(container)
+    container.precompute.start()
+    container.inventory.start(container.uow_factory, settings.inventory_refresh_interval_s)
 
     mcp.run(transport="stdio")
 
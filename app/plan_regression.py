@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.config.logging import configure_logging
+from app.config.settings import Settings
+from app.container import Container, Tenant, build_container
+from app.infrastructure.db.sql_safety import fingerprint_sql
+
+SIZES = ("small", "medium", "large")
+JOIN_NODES = ("Hash Join", "Merge Join", "Nested Loop")
+_PLANNED_RE = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+_SESSION_SETUP_RE = re.compile(r"^\s*select\s+set_config\(", re.IGNORECASE)
+
+# Every analytics/report code path, with fixed arguments; each may run several statements.
+SCENARIOS: dict[str, Callable[[Tenant, Session], Any]] = {
+    "revenue_by_day": lambda t, s: t.analytics.revenue_by_day(s, days=30),
+    "revenue_by_week": lambda t, s: t.analytics.revenue_by_day(s, days=180, granularity="week"),
+    "revenue_by_hour": lambda t, s: t.analytics.revenue_by_day(s, days=2, granularity="hour"),
+    "top_products_last_days": lambda t, s: t.analytics.top_products_last_days(s, days=30, limit=10),
+    "top_customers_last_days": lambda t, s: t.analytics.top_customers_last_days(s, days=30, limit=10),
+    "repeat_purchase_rate": lambda t, s: t.analytics.repeat_purchase_rate(s, days=90),
+    "gross_margin_last_days": lambda t, s: t.analytics.gross_margin_last_days(s, days=30),
+    "top_products_approx": lambda t, s: t.analytics.top_products_approx(s, days=90, limit=10, seed=1),
+    "top_customers_approx": lambda t, s: t.analytics.top_customers_approx(s, days=90, limit=10, seed=1),
+    "repeat_purchase_rate_approx": lambda t, s: t.analytics.repeat_purchase_rate_approx(s, days=90, seed=1),
+    "sales_kpis": lambda t, s: t.analytics.sales_kpis(s, days=30),
+    "compare_periods": lambda t, s: t.analytics.compare_periods(s, days=30),
+    "low_stock": lambda t, s: t.analytics.low_stock(s, threshold=10, limit=50),
+    "reorder_plan": lambda t, s: t.analytics.reorder_plan(s, days=30),
+    "table_counts_estimate": lambda t, s: t.analytics.table_counts_estimate(s),
+    "sales_report": lambda t, s: t.ops.sales_report(s, days=30, top_n=10),
+    "ops_health_report": lambda t, s: t.ops.ops_health_report(s, days=14, low_stock_threshold=10),
+}
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _nodes(child)
+
+
+def summarize_plan(explain: list[dict]) -> dict:
+    """The parts of an EXPLAIN (FORMAT JSON) result that are compared against the baseline."""
+    root = explain[0]["Plan"]
+    nodes = list(_nodes(root))
+    joins = []
+    for n in nodes:
+        if n["Node Type"] in JOIN_NODES:
+            joins.append(f"{n['Node Type']} ({n.get('Join Type', 'Inner')})")
+    buffers = None
+    if "Shared Hit Blocks" in root:
+        buffers = root["Shared Hit Blocks"] + root["Shared Read Blocks"]
+    return {
+        "total_cost": root["Total Cost"],
+        "plan_rows": root["Plan Rows"],
+        "seq_scans": sorted({n["Relation Name"] for n in nodes if n["Node Type"] == "Seq Scan"}),
+        "indexes": sorted({n["Index Name"] for n in nodes if "Index Name" in n}),
+        "joins": joins,
+        "shape": [n["Node Type"] for n in nodes],
+        "shared_blocks": buffers,
+        "execution_ms": explain[0].get("Execution Time"),
+    }
+
+
+class PlanCapture:
+    """Records the SELECT statements an engine sends to the driver, with their parameters."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements: list[tuple[str, Any]] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if _PLANNED_RE.match(statement) and not _SESSION_SETUP_RE.match(statement):
+            self.statements.append((statement, parameters))
+
+    def __enter__(self) -> PlanCapture:
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def capture_plans(
+    container: Container, analyze: bool, only: set[str] | None = None
+) -> tuple[dict[str, dict], dict[str, str]]:
+    """
+    Runs every scenario twice (the first pass loads metadata) and EXPLAINs what the second one
+    sent. Returns plans keyed "<scenario>#<n>" and the error of each scenario that failed.
+    """
+    t = container.default_tenant
+    captured: dict[str, list[tuple[str, Any]]] = {}
+    errors: dict[str, str] = {}
+    for name in [n for n in SCENARIOS if not only or n in only]:
+        try:
+            with t.uow_factory() as uow:
+                SCENARIOS[name](t, uow.session)
+            with PlanCapture(container.engine) as capture, t.uow_factory() as uow:
+                SCENARIOS[name](t, uow.session)
+        except Exception as e:
+            errors[name] = str(e).splitlines()[0]
+            continue
+        captured[name] = capture.statements
+
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    plans: dict[str, dict] = {}
+    raw = container.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for name, statements in captured.items():
+            for i, (statement, parameters) in enumerate(statements, start=1):
+                try:
+                    cursor.execute(f"EXPLAIN ({options}) {statement}", parameters)
+                    explain = cursor.fetchone()[0]
+                except Exception as e:
+                    raw.rollback()
+                    errors[f"{name}#{i}"] = str(e).splitlines()[0]
+                    continue
+                if isinstance(explain, str):
+                    explain = json.loads(explain)
+                fp, shape = fingerprint_sql(statement)
+                plans[f"{name}#{i}"] = {"fingerprint": fp, "sql": shape, "plan": summarize_plan(explain)}
+        raw.rollback()
+    finally:
+        raw.close()
+    return plans, errors
+
+
+def compare(baseline: dict[str, dict], current: dict[str, dict], cost_factor: float, buffer_factor: float) -> dict:
+    """Regressions (new sequential scans, changed joins, cost/buffer blowups) and informational changes."""
+    regressions: list[dict] = []
+    notes: list[dict] = []
+    for key in sorted(set(baseline) | set(current)):
+        if key not in current:
+            notes.append({"statement": key, "change": "no longer executed"})
+            continue
+        if key not in baseline:
+            notes.append({"statement": key, "change": "new statement (no baseline)"})
+            continue
+        old, new = baseline[key]["plan"], current[key]["plan"]
+
+        def flag(change: str) -> None:
+            regressions.append({"statement": key, "change": change})
+
+        if baseline[key]["fingerprint"] != current[key]["fingerprint"]:
+            notes.append({"statement": key, "change": "query text changed"})
+        for relation in sorted(set(new["seq_scans"]) - set(old["seq_scans"])):
+            flag(f"new sequential scan on {relation}")
+        for index in sorted(set(old["indexes"]) - set(new["indexes"])):
+            flag(f"index {index} no longer used")
+        if new["joins"] != old["joins"]:
+            flag(f"join strategy changed: {old['joins']} -> {new['joins']}")
+        # Small absolute floors keep near-zero plans from tripping the ratios.
+        if new["total_cost"] > max(old["total_cost"] * cost_factor, old["total_cost"] + 100):
+            flag(f"estimated cost {old['total_cost']:.0f} -> {new['total_cost']:.0f}")
+        if old["shared_blocks"] is not None and new["shared_blocks"] is not None:
+            if new["shared_blocks"] > max(old["shared_blocks"] * buffer_factor, old["shared_blocks"] + 64):
+                flag(f"shared buffers {old['shared_blocks']} -> {new['shared_blocks']}")
+        if new["shape"] != old["shape"] and not any(r["statement"] == key for r in regressions):
+            notes.append({"statement": key, "change": "plan shape changed"})
+    return {"regressions": regressions, "notes": notes}
+
+
+def _seed(container: Container, size: str, seed: int) -> None:
+    t = container.default_tenant
+    with t.uow_factory() as uow:
+        t.seed.seed_demo_data(uow.session, size=size, reset_first=True, seed=seed)
+    # Fresh statistics, so plans depend on the data and not on when autovacuum last ran.
+    with container.engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+
+
+def _parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="ecom-plan-check",
+        description="Capture EXPLAIN plans of every analytics statement on seeded data and compare them with "
+                    "stored baselines. Uses POSTGRES_DSN; seeding truncates the demo tables.",
+    )
+    p.add_argument("--baseline-dir", default="plan_baselines", help="Directory of <size>.json baselines.")
+    p.add_argument("--sizes", default="small,medium", help=f"Comma-separated dataset sizes: {', '.join(SIZES)}.")
+    p.add_argument("--seed", type=int, default=42, help="Random seed for the demo data.")
+    p.add_argument("--scenarios", default="", help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    p.add_argument("--update", action="store_true", help="Write the captured plans as the new baselines.")
+    p.add_argument("--no-seed", action="store_true", help="Use the data already in the database (one pass).")
+    p.add_argument("--scratch", action="store_true", help="Confirm POSTGRES_DSN is a scratch database to reseed.")
+    p.add_argument("--no-analyze", action="store_true", help="Plain EXPLAIN: no execution, no buffer counts.")
+    p.add_argument("--cost-factor", type=float, default=2.0, help="Flag estimated cost growth beyond this ratio.")
+    p.add_argument("--buffer-factor", type=float, default=2.0, help="Flag shared-buffer growth beyond this ratio.")
+    p.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return p
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parser().parse_args(argv)
+    sizes = ["current"] if args.no_seed else [s.strip() for s in args.sizes.split(",") if s.strip()]
+    only = {s.strip() for s in args.scenarios.split(",") if s.strip()} or None
+    unknown = [s for s in sizes if s not in SIZES and not args.no_seed] + sorted((only or set()) - set(SCENARIOS))
+    if unknown:
+        print(f"Unknown sizes/scenarios: {', '.join(unknown)}")
+        return 2
+    if not args.no_seed and not args.scratch:
+        print("Seeding truncates the demo tables: pass --scratch to confirm, or --no-seed to use existing data.")
+        return 2
+
+    settings = Settings(result_cache_enabled=False, precompute_jobs=[], warmup_enabled=False)
+    configure_logging(settings.log_level)
+    container = build_container(settings)
+    baseline_dir = Path(args.baseline_dir)
+
+    report: dict = {"sizes": {}, "regressions": 0}
+    for size in sizes:
+        if not args.no_seed:
+            _seed(container, size, args.seed)
+        plans, errors = capture_plans(container, analyze=not args.no_analyze, only=only)
+        failures = [{"statement": k, "change": f"failed: {e}"} for k, e in errors.items()]
+        path = baseline_dir / f"{size}.json"
+        if args.update and failures:
+            report["sizes"][size] = {"statements": len(plans), "regressions": failures, "notes": []}
+            report["regressions"] += len(failures)
+            continue
+        if args.update:
+            baseline_dir.mkdir(parents=True, exist_ok=True)
+            doc = {
+                "size": size,
+                "seed": args.seed,
+                "analyze": not args.no_analyze,
+                "captured_at": datetime.now(timezone.utc).isoformat(),
+                "statements": plans,
+            }
+            path.write_text(json.dumps(doc, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            report["sizes"][size] = {"baseline": str(path), "statements": len(plans)}
+            continue
+        if not path.exists():
+            report["sizes"][size] = {"error": f"No baseline at {path}; run with --update first."}
+            report["regressions"] += 1
+            continue
+        baseline = json.loads(path.read_text(encoding="utf-8"))["statements"]
+        if only:
+            baseline = {k: v for k, v in baseline.items() if k.split("#", 1)[0] in only}
+        result = compare(baseline, plans, args.cost_factor, args.buffer_factor)
+        result["regressions"] = failures + result["regressions"]
+        report["sizes"][size] = {"statements": len(plans), **result}
+        report["regressions"] += len(result["regressions"])
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for size, outcome in report["sizes"].items():
+            print(f"== {size}: {outcome.get('statements', 0)} statements")
+            if "error" in outcome:
+                print(f"  ERROR {outcome['error']}")
+            if "baseline" in outcome:
+                print(f"  baseline written to {outcome['baseline']}")
+            for r in outcome.get("regressions", []):
+                print(f"  REGRESSION {r['statement']}: {r['change']}")
+            for n in outcome.get("notes", []):
+                print(f"  note {n['statement']}: {n['change']}")
+        print(f"{report['regressions']} regression(s)")
+    return 1 if report["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from fastmcp.exceptions import NotFoundError, ToolError
+from fastmcp.server.middleware import Middleware
+
+from app.application.services.admission_service import DEFAULT_COST, AdmissionController, AdmissionRejected
+
+
+class AdmissionMiddleware(Middleware):
+    """
+    Runs every tool call through the AdmissionController, classed by the tool's meta["cost"].
+
+    Tools that spread over several pooled connections declare meta["fan_out"]: the name of the
+    list argument whose length sets the parallelism, or True for "up to `fan_out_limit`". They
+    are weighted accordingly (and limited to the weight they are granted).
+    """
+
+    def __init__(self, controller: AdmissionController, fan_out_limit: int):
+        self.controller = controller
+        self.fan_out_limit = fan_out_limit
+        self._meta: dict[str, tuple[str, str | bool | None]] = {}
+
+    async def _resolve(self, context) -> tuple[str, str | bool | None] | None:
+        name = context.message.name
+        if name not in self._meta:
+            try:
+                tool = await context.fastmcp_context.fastmcp.get_tool(name)
+            except NotFoundError:
+                return None
+            meta = tool.meta or {}
+            self._meta[name] = (meta.get("cost", DEFAULT_COST), meta.get("fan_out"))
+        return self._meta[name]
+
+    def _weight(self, fan_out: str | bool | None, arguments: dict | None) -> int:
+        if not fan_out:
+            return 1
+        if isinstance(fan_out, str):
+            items = (arguments or {}).get(fan_out)
+            return max(1, min(len(items) if isinstance(items, list) else 1, self.fan_out_limit))
+        return self.fan_out_limit
+
+    async def on_call_tool(self, context, call_next):
+        resolved = await self._resolve(context)
+        if resolved is None:
+            return await call_next(context)
+        cost, fan_out = resolved
+        weight = self._weight(fan_out, context.message.arguments)
+        try:
+            async with self.controller.slot(cost, weight):
+                return await call_next(context)
+        except AdmissionRejected as e:
+            raise ToolError(str(e)) from e
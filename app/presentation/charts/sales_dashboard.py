@@ -26,6 +26,7 @@ def render_sales_dashboard_png(
     kpis: dict[str, Any],
     margin: dict[str, Any],
     title: str,
+    granularity: str = "day",
 ) -> bytes:
     """
     Single-page composite dashboard (2x2):
@@ -36,7 +37,7 @@ def render_sales_dashboard_png(
     Returns PNG bytes.
     """
     # Normalize data
-    days = [str(r["day"]) for r in trend_rows]
+    buckets = [str(r["bucket"]) for r in trend_rows]
     revenue = [float(r["revenue"]) for r in trend_rows]
     orders = [int(r["orders"]) for r in trend_rows]
 
@@ -51,17 +52,17 @@ def render_sales_dashboard_png(
     ax1 = fig.add_subplot(gs[0, 0])
     if revenue:
         ax1.plot(list(range(len(revenue))), revenue, marker="o")
-    ax1.set_title("Revenue by day")
+    ax1.set_title(f"Revenue by {granularity}")
     ax1.set_ylabel("Revenue")
-    _set_sparse_xticks(ax1, days)
+    _set_sparse_xticks(ax1, buckets)
 
     # --- (2) Orders trend
     ax2 = fig.add_subplot(gs[0, 1])
     if orders:
         ax2.plot(list(range(len(orders))), orders, marker="o")
-    ax2.set_title("Orders by day")
+    ax2.set_title(f"Orders by {granularity}")
     ax2.set_ylabel("Orders")
-    _set_sparse_xticks(ax2, days)
+    _set_sparse_xticks(ax2, buckets)
 
     # --- (3) Top products bar
     ax3 = fig.add_subplot(gs[1, 0])
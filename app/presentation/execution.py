@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import functools
+import logging
+import typing
+from contextlib import nullcontext
+from typing import Any, Callable
+
+import anyio
+from fastmcp import Context
+
+from app.container import Container
+from app.infrastructure.db.inflight import InflightCall, bind_call
+
+log = logging.getLogger(__name__)
+
+
+def offload(container: Container, tool: str | None = None) -> Callable:
+    """
+    Turns a blocking tool into an async one that runs in a worker thread.
+
+    Units of work opened inside the call pick up the tool's statement timeout from Settings.
+    If the client cancels, the running statements are cancelled in Postgres instead of being
+    left to finish on an abandoned connection. With PROFILE_ENABLED, sampled calls are profiled.
+    """
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        name = tool or fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            call = InflightCall(name, container.settings.timeout_for(name))
+            profiler = container.profiler
+
+            def work():
+                with bind_call(call), profiler.maybe_profile(name) if profiler else nullcontext():
+                    return fn(*args, **kwargs)
+
+            try:
+                return await anyio.to_thread.run_sync(work, abandon_on_cancel=True)
+            except anyio.get_cancelled_exc_class():
+                with anyio.CancelScope(shield=True):
+                    await anyio.to_thread.run_sync(call.cancel)
+                raise
+
+        # Resolved here, against the tool's module: the wrapper lives in this one, so string
+        # annotations (e.g. `datetime`, `Context`) would not resolve from it.
+        wrapper.__annotations__ = typing.get_type_hints(fn, include_extras=True)
+        return wrapper
+
+    return decorate
+
+
+def section_progress(ctx: Context | None) -> Callable[[int, int, str], None] | None:
+    """
+    For use inside an offloaded tool: sends each finished report section to the client as a
+    progress notification (the section's Markdown is the message). None when the client did
+    not ask for progress, so the report is built without the round trips.
+    """
+    meta = ctx.request_context.meta if ctx is not None and ctx.request_context else None
+    if meta is None or meta.progressToken is None:
+        return None
+
+    def report(done: int, total: int, markdown: str) -> None:
+        try:
+            anyio.from_thread.run(ctx.report_progress, done, total, markdown)
+        except Exception as e:
+            # A client that stopped listening must not fail the report itself.
+            log.debug("progress notification failed: %s", e)
+
+    return report
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from typing import Any, Mapping, Sequence
+
+from pydantic import Field
+
+from app.application.services.precompute_service import Precomputed
+from app.infrastructure.db.columnar import columnar_from_mappings
+
+RESPONSE_FORMATS = ("rows", "columnar")
+
+FORMAT = Field(
+    default="rows",
+    description="rows: list of objects. columnar: column names once + typed column arrays (smaller payload).",
+)
+
+
+def check_format(format: str) -> str:
+    f = (format or "rows").lower().strip()
+    if f not in RESPONSE_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    return f
+
+
+def rows_payload(rows: Sequence[Mapping[str, Any]], format: str) -> dict:
+    if check_format(format) == "columnar":
+        return columnar_from_mappings(rows)
+    return {"rows": list(rows)}
+
+
+def as_of_note(result: Precomputed) -> str:
+    """Markdown line stamped on precomputed reports so the reader knows how old they are."""
+    return f"_As of {result.as_of.isoformat(timespec='seconds')} (precomputed, {int(result.age_s())}s old)_\n\n"
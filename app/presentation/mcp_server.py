@@ -3,6 +3,7 @@ from __future__ import annotations
 from fastmcp import FastMCP
 
 from app.container import Container
+from app.presentation.admission import AdmissionMiddleware
 
 from app.presentation.tools.health_tools import register as register_health
 from app.presentation.tools.schema_tools import register as register_schema
@@ -11,6 +12,7 @@ from app.presentation.tools.analytics_tools import register as register_analytic
 from app.presentation.tools.ops_tools import register as register_ops
 from app.presentation.tools.seed_tools import register as register_seed
 from app.presentation.tools.dashboard_tools import register as register_dashboards
+from app.presentation.tools.index_tools import register as register_index
 
 from app.presentation.prompts.prompts import register as register_prompts
 
@@ -23,6 +25,8 @@ def build_mcp_server(container: Container) -> FastMCP:
             "Prefer report/analytics tools over raw SQL. Use sql_readonly only when needed."
         ),
     )
+    if container.admission is not None:
+        mcp.add_middleware(AdmissionMiddleware(container.admission, fan_out_limit=container.settings.batch_max_workers))
 
     register_health(mcp, container)
     register_schema(mcp, container)
@@ -32,5 +36,6 @@ def build_mcp_server(container: Container) -> FastMCP:
     register_seed(mcp, container)
     register_prompts(mcp, container)
     register_dashboards(mcp, container)
+    register_index(mcp, container)
 
     return mcp
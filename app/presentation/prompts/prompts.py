@@ -46,6 +46,8 @@ Use tools:
 - top_customers_last_days(days=max({days},90), limit={top_n})
 - gross_margin_last_days(days={days})
 
+Tip: fetch all four in a single analytics_batch call (they run concurrently).
+
 Deliver (Markdown):
 1) Trend narrative (spikes/dips)
 2) Top products table + interpretation
@@ -67,13 +69,11 @@ Prefer tools over raw SQL.
 We suspect revenue dropped. Compare last {days} days vs the prior {compare_days} days.
 
 Use tools:
-- revenue_by_day(days={days + compare_days})
-- top_products_last_days(days={days}, limit=20)
-- top_customers_last_days(days=max({days},90), limit=20)
+- compare_periods(days={days}) for KPIs, margin, status mix and the products/customers driving the change
+  (set compare_start/compare_end if the comparison window is not the {compare_days} days right before)
+- revenue_by_day(days={days + compare_days}) to see when the drop started
 - ops_health_report(days={days}, low_stock_threshold=10)
 
-If needed, use sql_readonly for a clean KPI comparison across the two windows.
-
 Output (Markdown):
 - Evidence (tables + key differences)
 - Likely causes (ranked)
@@ -112,8 +112,9 @@ Output (Markdown):
 Create an inventory reorder plan.
 
 Use tools:
-- low_stock(threshold={low_stock_threshold}, limit=50)
-- top_products_last_days(days={days}, limit=20)
+- reorder_plan(days={days}) for velocity, days of cover and reorder quantities across the catalog
+  (page with offset/next_offset; only_reorder=false lists healthy items too)
+- low_stock(threshold={low_stock_threshold}, limit=50) for items at or below the threshold regardless of sales
 
 Output (Markdown):
 - Reorder now (low stock + high sales)
@@ -133,7 +134,7 @@ Run a data-quality smoke test.
 
 Use tools:
 - db_ping()
-- schema_overview()
+- schema_overview(summary=true, include_stats=true)
 - table_counts()
 - sales_report(days=30)
 
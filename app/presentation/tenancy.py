@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from pydantic import Field
+
+TENANT = Field(
+    default=None,
+    description="Tenant schema (one schema per storefront). Omit for the default schema.",
+)
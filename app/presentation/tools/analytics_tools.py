@@ -1,65 +1,279 @@
 from __future__ import annotations
 
+from datetime import datetime
+
+from pydantic import BaseModel, Field
+
+from app.application.services.analytics_service import resolve_granularity, resolve_window, window_days
 from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.formatting import FORMAT, check_format, rows_payload
+from app.presentation.tenancy import TENANT
+
+START = Field(default=None, description="Window start (inclusive, ISO 8601). Overrides `days` when set.")
+END = Field(default=None, description="Window end (exclusive, ISO 8601). Defaults to the next UTC midnight.")
+APPROXIMATE = Field(
+    default=False,
+    description="Estimate from a TABLESAMPLE instead of scanning everything; adds 95% intervals and the sample fraction.",
+)
+SAMPLE_PERCENT = Field(default=5.0, gt=0, le=100, description="Sample size in percent (approximate mode).")
+SAMPLE_METHOD = Field(
+    default="system",
+    description="system (samples pages: fastest, intervals from per-page totals) or bernoulli (samples rows, "
+                "but reads every page).",
+)
+GRANULARITY_AUTO = Field(
+    default="auto", description="Trend bucket: hour, day, week, month, or auto (picked from the window length)."
+)
+
+
+class AnalyticsCall(BaseModel):
+    method: str = Field(description="AnalyticsService method, e.g. revenue_by_day, top_products_last_days.")
+    args: dict = Field(default_factory=dict, description="Keyword arguments, e.g. {\"days\": 30, \"limit\": 10}.")
 
 
 def register(mcp, container: Container) -> None:
     @mcp.tool(
         title="Revenue by day",
-        description="Orders + revenue by day for the last N days (excludes cancelled if status exists).",
+        description="Orders + revenue per day (or hour/week/month via `granularity`) for the last N days or an "
+                    "explicit [start, end) window (excludes cancelled if status exists).",
         tags={"analytics", "sales"},
         meta={"read": True},
         annotations={"readOnlyHint": True},
     )
-    def revenue_by_day(days: int = 30) -> dict:
-        with container.uow_factory() as uow:
-            rows = container.analytics.revenue_by_day(uow.session, days=days)
-            return {"days": days, "rows": list(rows)}
+    @offload(container)
+    def revenue_by_day(
+        days: int = 30,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        granularity: str = Field(default="day", description="Bucket: hour, day, week, month, or auto."),
+        format: str = FORMAT,
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        check_format(format)
+        start, end = resolve_window(days, start, end)
+        granularity = resolve_granularity(granularity, start, end)
+        with t.uow_factory() as uow:
+            rows = t.analytics.revenue_by_day(
+                uow.session, days=days, start=start, end=end, granularity=granularity
+            )
+            return {
+                "days": window_days(start, end),
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "granularity": granularity,
+                **rows_payload(rows, format),
+            }
 
     @mcp.tool(
         title="Top products",
-        description="Top products by revenue for the last N days (excludes cancelled if status exists).",
+        description="Top products by revenue for the last N days or an explicit [start, end) window "
+                    "(excludes cancelled if status exists).",
         tags={"analytics", "sales", "catalog"},
         meta={"read": True},
         annotations={"readOnlyHint": True},
     )
-    def top_products_last_days(days: int = 30, limit: int = 10) -> dict:
-        with container.uow_factory() as uow:
-            rows = container.analytics.top_products_last_days(uow.session, days=days, limit=limit)
-            return {"days": days, "limit": limit, "rows": list(rows)}
+    @offload(container)
+    def top_products_last_days(
+        days: int = 30,
+        limit: int = 10,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        format: str = FORMAT,
+        approximate: bool = APPROXIMATE,
+        sample_percent: float = SAMPLE_PERCENT,
+        sample_method: str = SAMPLE_METHOD,
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        check_format(format)
+        start, end = resolve_window(days, start, end)
+        window = {"days": window_days(start, end), "start": start.isoformat(), "end": end.isoformat(), "limit": limit}
+        with t.uow_factory() as uow:
+            if approximate:
+                res = t.analytics.top_products_approx(
+                    uow.session,
+                    days=days,
+                    limit=limit,
+                    start=start,
+                    end=end,
+                    sample_percent=sample_percent,
+                    method=sample_method,
+                )
+                return {**window, "approximate": res["approximate"], **rows_payload(res["rows"], format)}
+            rows = t.analytics.top_products_last_days(uow.session, days=days, limit=limit, start=start, end=end)
+            return {**window, **rows_payload(rows, format)}
 
     @mcp.tool(
         title="Top customers",
-        description="Top customers by revenue for the last N days (excludes cancelled if status exists).",
+        description="Top customers by revenue for the last N days or an explicit [start, end) window "
+                    "(excludes cancelled if status exists).",
         tags={"analytics", "sales", "customer"},
         meta={"read": True},
         annotations={"readOnlyHint": True},
     )
-    def top_customers_last_days(days: int = 90, limit: int = 10) -> dict:
-        with container.uow_factory() as uow:
-            rows = container.analytics.top_customers_last_days(uow.session, days=days, limit=limit)
-            return {"days": days, "limit": limit, "rows": list(rows)}
+    @offload(container)
+    def top_customers_last_days(
+        days: int = 90,
+        limit: int = 10,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        format: str = FORMAT,
+        approximate: bool = APPROXIMATE,
+        sample_percent: float = SAMPLE_PERCENT,
+        sample_method: str = SAMPLE_METHOD,
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        check_format(format)
+        start, end = resolve_window(days, start, end)
+        window = {"days": window_days(start, end), "start": start.isoformat(), "end": end.isoformat(), "limit": limit}
+        with t.uow_factory() as uow:
+            if approximate:
+                res = t.analytics.top_customers_approx(
+                    uow.session,
+                    days=days,
+                    limit=limit,
+                    start=start,
+                    end=end,
+                    sample_percent=sample_percent,
+                    method=sample_method,
+                )
+                return {**window, "approximate": res["approximate"], **rows_payload(res["rows"], format)}
+            rows = t.analytics.top_customers_last_days(uow.session, days=days, limit=limit, start=start, end=end)
+            return {**window, **rows_payload(rows, format)}
 
     @mcp.tool(
         title="Repeat purchase rate",
-        description="Repeat purchase rate over last N days (share of customers with 2+ orders).",
+        description="Repeat purchase rate over last N days or an explicit [start, end) window "
+                    "(share of customers with 2+ orders).",
         tags={"analytics", "customer"},
         meta={"read": True},
         annotations={"readOnlyHint": True},
     )
-    def repeat_purchase_rate(days: int = 180) -> dict:
-        with container.uow_factory() as uow:
-            row = container.analytics.repeat_purchase_rate(uow.session, days=days)
+    @offload(container)
+    def repeat_purchase_rate(
+        days: int = 180,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        approximate: bool = APPROXIMATE,
+        sample_percent: float = SAMPLE_PERCENT,
+        sample_method: str = SAMPLE_METHOD,
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            if approximate:
+                return t.analytics.repeat_purchase_rate_approx(
+                    uow.session, days=days, start=start, end=end, sample_percent=sample_percent, method=sample_method
+                )
+            row = t.analytics.repeat_purchase_rate(uow.session, days=days, start=start, end=end)
             return dict(row)
 
     @mcp.tool(
         title="Gross margin",
-        description="Gross margin for last N days (uses order_items unit_cost if available, else products.cost).",
+        description="Gross margin for last N days or an explicit [start, end) window "
+                    "(uses order_items unit_cost if available, else products.cost).",
         tags={"analytics", "finance"},
         meta={"read": True},
         annotations={"readOnlyHint": True},
     )
-    def gross_margin_last_days(days: int = 30) -> dict:
-        with container.uow_factory() as uow:
-            row = container.analytics.gross_margin_last_days(uow.session, days=days)
+    @offload(container)
+    def gross_margin_last_days(
+        days: int = 30,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            row = t.analytics.gross_margin_last_days(uow.session, days=days, start=start, end=end)
             return dict(row)
+
+    @mcp.tool(
+        title="Compare periods",
+        description="Current window vs a comparison window (default: the equally long period right before) in one "
+                    "database pass: orders/revenue/AOV/customers, gross margin and status mix with changes, plus "
+                    "the products and customers that gained or lost the most revenue.",
+        tags={"analytics", "sales", "anomaly"},
+        meta={"read": True, "cost": "heavy"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def compare_periods(
+        days: int = 14,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        compare_start: datetime | None = Field(default=None, description="Comparison window start (inclusive)."),
+        compare_end: datetime | None = Field(default=None, description="Comparison window end (exclusive)."),
+        limit: int = Field(default=10, ge=1, le=100, description="Top gainers and top decliners to list."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.analytics.compare_periods(
+                uow.session,
+                days=days,
+                start=start,
+                end=end,
+                compare_start=compare_start,
+                compare_end=compare_end,
+                limit=limit,
+            )
+
+    @mcp.tool(
+        title="Anomalies",
+        description="Flags days (or hours) where revenue, orders or AOV deviate from a rolling, day-of-week "
+                    "(hour-of-day) adjusted baseline, using robust z-scores (median/MAD). Returns only the "
+                    "flagged points with value, expected value and z per metric; the current, incomplete "
+                    "bucket is ignored.",
+        tags={"analytics", "sales", "anomaly"},
+        meta={"read": True, "cost": "heavy"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def anomalies(
+        days: int = 90,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        granularity: str = Field(default="day", description="day or hour."),
+        threshold: float = Field(default=3.5, gt=0, description="Flag points with |robust z| at or above this."),
+        baseline: int | None = Field(
+            default=None, ge=3, le=1000, description="Trailing points per baseline (default: 28 days / 168 hours)."
+        ),
+        metrics: list[str] | None = Field(default=None, description="Subset of revenue, orders, aov (default: all)."),
+        limit: int = Field(default=20, ge=1, le=500, description="Most significant points to return."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.anomalies.anomalies(
+                uow.session,
+                days=days,
+                start=start,
+                end=end,
+                granularity=granularity,
+                threshold=threshold,
+                baseline=baseline,
+                metrics=metrics,
+                limit=limit,
+            )
+
+    @mcp.tool(
+        title="Analytics batch",
+        description="Run several analytics calls in one request, concurrently on pooled connections. "
+                    "Methods: revenue_by_day, top_products_last_days, top_customers_last_days, "
+                    "repeat_purchase_rate, gross_margin_last_days, sales_kpis, low_stock, table_counts. "
+                    "Results come back in request order; one failing call does not fail the batch.",
+        tags={"analytics", "batch"},
+        meta={"read": True, "cost": "heavy", "fan_out": "requests"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def analytics_batch(
+        requests: list[AnalyticsCall] = Field(description="List of {method, args} calls."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        return t.batch.run([r.model_dump() for r in requests])
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+from datetime import datetime
+
+from app.application.services.analytics_service import resolve_granularity, resolve_window
+from app.application.services.ops_service import window_label
 from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.formatting import as_of_note
 from app.presentation.charts.sales_dashboard import render_sales_dashboard_png
+from app.presentation.tenancy import TENANT
+from app.presentation.tools.analytics_tools import END, GRANULARITY_AUTO, START
 
 # FastMCP Image import can vary by version; this makes it robust.
 try:
@@ -11,39 +19,73 @@ except Exception:  # pragma: no cover
 
 
 def register(mcp, container: Container) -> None:
+    def build_sales_dashboard(tenant: str | None, args: dict) -> tuple[str, bytes]:
+        t = container.tenant(tenant)
+        days, top_n, start, end = args["days"], args["top_n"], args["start"], args["end"]
+        explicit = start is not None or end is not None
+        start, end = resolve_window(days, start, end)
+        granularity = resolve_granularity(args["granularity"], start, end)
+        label = window_label(days, start, end, explicit)
+
+        with t.uow_factory() as uow:
+            # data (application services)
+            w = {"days": days, "start": start, "end": end}
+            trend = t.analytics.revenue_by_day(uow.session, granularity=granularity, **w)
+            top = t.analytics.top_products_last_days(uow.session, limit=top_n, **w)
+            kpis = t.analytics.sales_kpis(uow.session, **w)
+            margin = t.analytics.gross_margin_last_days(uow.session, **w)
+
+        png = render_sales_dashboard_png(
+            trend_rows=trend,
+            top_products=top,
+            kpis=kpis,
+            margin=margin,
+            title=f"Sales dashboard — {label.replace('**', '')}",
+            granularity=granularity,
+        )
+
+        md = (
+            f"# Sales dashboard\n"
+            f"- Window: {label}\n"
+            f"- Trend granularity: **{granularity}**\n\n"
+            f"## Figure 1 — Sales dashboard (composite)\n"
+            f"This figure is a single-page dashboard with 4 panels:\n"
+            f"- Revenue trend\n"
+            f"- Orders trend\n"
+            f"- Top products by revenue\n"
+            f"- KPI snapshot (Revenue / Orders / AOV / Margin rate)\n"
+        )
+        return md, png
+
+    container.precompute.register(
+        "sales_dashboard",
+        build_sales_dashboard,
+        {"days": 30, "top_n": 10, "start": None, "end": None, "granularity": "auto"},
+    )
+
     @mcp.tool(
         title="Sales dashboard",
         description="Professional one-page composite dashboard image (2x2): revenue trend, orders trend, "
                     "top products, KPI tiles.",
         tags={"analytics", "report", "charts"},
-        meta={"read": True},
+        meta={"read": True, "cost": "heavy"},
         annotations={"readOnlyHint": True},
     )
-    def sales_dashboard(days: int = 30, top_n: int = 10):
-        with container.uow_factory() as uow:
-            # data (application services)
-            trend = container.analytics.revenue_by_day(uow.session, days=days)
-            top = container.analytics.top_products_last_days(uow.session, days=days, limit=top_n)
-            kpis = container.analytics.sales_kpis(uow.session, days=days)
-            margin = container.analytics.gross_margin_last_days(uow.session, days=days)
-
-            png = render_sales_dashboard_png(
-                trend_rows=trend,
-                top_products=top,
-                kpis=kpis,
-                margin=margin,
-                title=f"Sales dashboard — last {days} days",
-            )
-
-            md = (
-                f"# Sales dashboard\n"
-                f"- Window: last **{days} days**\n\n"
-                f"## Figure 1 — Sales dashboard (composite)\n"
-                f"This figure is a single-page dashboard with 4 panels:\n"
-                f"- Revenue trend\n"
-                f"- Orders trend\n"
-                f"- Top products by revenue\n"
-                f"- KPI snapshot (Revenue / Orders / AOV / Margin rate)\n"
-            )
-
-            return [md, Image(data=png, format="png")]
+    @offload(container)
+    def sales_dashboard(
+        days: int = 30,
+        top_n: int = 10,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        granularity: str = GRANULARITY_AUTO,
+        tenant: str | None = TENANT,
+    ):
+        t = container.tenant(tenant)
+        args = {"days": days, "top_n": top_n, "start": start, "end": end, "granularity": granularity}
+        pre = container.precompute.lookup("sales_dashboard", t.name, args)
+        if pre is not None:
+            md, png = pre.value
+            md = as_of_note(pre) + md
+        else:
+            md, png = build_sales_dashboard(t.name, args)
+        return [md, Image(data=png, format="png")]
@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import anyio
+from pydantic import Field
 from sqlalchemy import select, func
 
+from app.application.services.caching import flights
 from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.tenancy import TENANT
+from app.infrastructure.db.engine import pool_status
 
 
 def register(mcp, container: Container) -> None:
@@ -10,11 +16,13 @@ def register(mcp, container: Container) -> None:
         title="DB ping",
         description="Connectivity check: current database/user/schema/server time.",
         tags={"health"},
-        meta={"read": True},
+        meta={"read": True, "cost": "light"},
         annotations={"readOnlyHint": True},
     )
-    def db_ping() -> dict:
-        with container.uow_factory() as uow:
+    @offload(container)
+    def db_ping(tenant: str | None = TENANT) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
             stmt = select(
                 func.current_database().label("db"),
                 func.current_user().label("usr"),
@@ -23,3 +31,95 @@ def register(mcp, container: Container) -> None:
             )
             row = uow.session.execute(stmt).mappings().one()
             return dict(row)
+
+    @mcp.tool(
+        title="Connection pool stats",
+        description=(
+            "Live connection-pool status: size, checked-out and overflow connections, checkout wait times "
+            "(avg/p50/p95/p99/max), timeouts, connection churn and pre-ping activity, the effective pool config, "
+            "and admission control (running/queued/rejected calls per cost class)."
+        ),
+        tags={"health"},
+        meta={"read": True, "cost": "light"},
+        annotations={"readOnlyHint": True},
+    )
+    def pool_stats() -> dict:
+        out = pool_status(container.engine, container.settings)
+        if container.admission is not None:
+            out["admission"] = container.admission.stats()
+        return out
+
+    @mcp.tool(
+        title="Result cache",
+        description=(
+            "Persistent analytics/report result cache: entries, size, hit/miss/eviction counters, plus how many "
+            "identical concurrent calls were coalesced into one execution."
+        ),
+        tags={"health", "cache"},
+        meta={"read": True, "cost": "light"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def result_cache() -> dict:
+        if container.result_cache is None:
+            return {
+                "enabled": False,
+                "note": "Set RESULT_CACHE_ENABLED=true to enable.",
+                "single_flight": flights.stats(),
+            }
+        return {"enabled": True, "single_flight": flights.stats(), **container.result_cache.stats()}
+
+    @mcp.tool(
+        title="Clear result cache",
+        description="Drop one tenant's cached analytics/report results and precomputed reports "
+                    "(the default schema when omitted). The database is not touched.",
+        tags={"cache"},
+        meta={"write": True, "cost": "light"},
+        annotations={"destructiveHint": False, "idempotentHint": True, "readOnlyHint": False},
+    )
+    @offload(container)
+    def clear_result_cache(tenant: str | None = TENANT) -> dict:
+        t = container.tenant(tenant)
+        out: dict = {"tenant": t.name, "precomputed": container.precompute.invalidate(t.name)}
+        if t.analytics.cache is not None:
+            out["entries"] = t.analytics.cache.invalidate()
+        return out
+
+    @mcp.tool(
+        title="Precompute status",
+        description="Background-refreshed reports (PRECOMPUTE_JOBS): arguments, age of the latest result, "
+                    "build time, whether a refresh is running and the last error, and whether this process is "
+                    "the one building them.",
+        tags={"health", "cache"},
+        meta={"read": True, "cost": "light"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def precompute_status() -> dict:
+        return {"leader": container.precompute.is_leader(), "jobs": container.precompute.status()}
+
+    @mcp.tool(
+        title="Profile summary",
+        description=(
+            "Aggregated hotspots of profiled tool calls (PROFILE_ENABLED): wall/CPU time per tool, share of samples "
+            "by component (database driver, sqlalchemy, serialization, matplotlib, app code), the hottest functions "
+            "by self and inclusive samples, and the lines that allocated the most memory. "
+            "`clear=true` deletes the stored profiles after summarizing them."
+        ),
+        tags={"health", "performance"},
+        meta={"read": True, "cost": "light"},
+        annotations={"readOnlyHint": True},
+    )
+    async def profile_summary(
+        tool: str | None = Field(default=None, description="Only profiles of this tool."),
+        top: int = Field(default=20, ge=1, le=200, description="How many frames/allocation sites to list."),
+        clear: bool = Field(default=False, description="Delete the stored profiles afterwards."),
+    ) -> dict:
+        profiler = container.profiler
+        if profiler is None:
+            return {"enabled": False, "note": "Set PROFILE_ENABLED=true (and optionally PROFILE_SAMPLE_RATE) to enable."}
+        # Reads the profile files off the event loop; not offloaded, so it never profiles itself.
+        out = await anyio.to_thread.run_sync(lambda: profiler.summary(tool=tool, top=top))
+        if clear:
+            out["cleared"] = await anyio.to_thread.run_sync(profiler.clear)
+        return {"enabled": True, "sample_rate": profiler.sample_rate, **out}
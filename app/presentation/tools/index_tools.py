@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pydantic import Field
+
+from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.tenancy import TENANT
+
+
+def register(mcp, container: Container) -> None:
+    @mcp.tool(
+        title="Index advisor",
+        description="Check indexes behind the analytics hot paths (order window, backlog, order_items joins) "
+                    "and recommend covering/partial/BRIN indexes with estimated benefit and the DDL to create them.",
+        tags={"schema", "performance"},
+        meta={"read": True, "cost": "heavy"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def index_advisor(tenant: str | None = TENANT) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.index_advisor.advise(uow.session)
+
+    @mcp.tool(
+        title="Create recommended indexes",
+        description="Create the missing/partial index_advisor recommendations CONCURRENTLY "
+                    "(partitioned tables: per partition, then attached). Requires ALLOW_WRITES=1.",
+        tags={"schema", "performance"},
+        meta={"write": True, "cost": "heavy"},
+        annotations={"destructiveHint": False, "idempotentHint": True, "readOnlyHint": False},
+    )
+    @offload(container)
+    def create_recommended_indexes(
+        names: list[str] | None = Field(default=None, description="Only create these recommendation names."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.index_advisor.create_indexes(uow.session, names=names)
@@ -1,9 +1,39 @@
 from __future__ import annotations
 
+from datetime import datetime
+
+from fastmcp import Context
+from pydantic import Field
+
 from app.container import Container
+from app.presentation.execution import offload, section_progress
+from app.presentation.formatting import FORMAT, as_of_note, check_format, rows_payload
+from app.presentation.tenancy import TENANT
+from app.presentation.tools.analytics_tools import END, GRANULARITY_AUTO, START
 
 
 def register(mcp, container: Container) -> None:
+    def build_ops_health_report(tenant: str | None, args: dict, on_section=None) -> str:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.ops.ops_health_report(uow.session, **args, on_section=on_section)
+
+    def build_sales_report(tenant: str | None, args: dict, on_section=None) -> str:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.ops.sales_report(uow.session, **args, on_section=on_section)
+
+    container.precompute.register(
+        "ops_health_report",
+        build_ops_health_report,
+        {"days": 14, "low_stock_threshold": 10, "start": None, "end": None},
+    )
+    container.precompute.register(
+        "sales_report",
+        build_sales_report,
+        {"days": 30, "top_n": 10, "start": None, "end": None, "granularity": "auto"},
+    )
+
     @mcp.tool(
         title="Low stock",
         description="List low-stock items (requires v_inventory_on_hand view or inventory table).",
@@ -11,40 +41,142 @@ def register(mcp, container: Container) -> None:
         meta={"read": True},
         annotations={"readOnlyHint": True},
     )
-    def low_stock(threshold: int = 10, limit: int = 50) -> dict:
-        with container.uow_factory() as uow:
-            rows = container.analytics.low_stock(uow.session, threshold=threshold, limit=limit)
-            return {"threshold": threshold, "limit": limit, "rows": list(rows)}
+    @offload(container)
+    def low_stock(threshold: int = 10, limit: int = 50, format: str = FORMAT, tenant: str | None = TENANT) -> dict:
+        t = container.tenant(tenant)
+        check_format(format)
+        with t.uow_factory() as uow:
+            rows = t.analytics.low_stock(uow.session, threshold=threshold, limit=limit)
+            return {"threshold": threshold, "limit": limit, **rows_payload(rows, format)}
+
+    @mcp.tool(
+        title="Reorder plan",
+        description="Whole-catalog reorder plan in one query: units sold and daily velocity over the window, on hand, "
+                    "days of cover and reorder quantity per product, ranked by days of cover (most urgent first) "
+                    "and paginated (`offset`/`limit`, with `total` and `next_offset`).",
+        tags={"ops", "inventory"},
+        meta={"read": True, "cost": "heavy"},
+        annotations={"readOnlyHint": True},
+    )
+    @offload(container)
+    def reorder_plan(
+        days: int = Field(default=30, ge=1, description="Sales window for velocity."),
+        start: datetime | None = START,
+        end: datetime | None = END,
+        lead_time_days: int = Field(default=14, ge=0, description="Days until a reorder arrives."),
+        safety_days: int = Field(default=7, ge=0, description="Safety stock, in days of sales."),
+        target_days: int = Field(default=30, ge=1, description="Days of sales a reorder should cover."),
+        only_reorder: bool = Field(default=True, description="Only products that need reordering now."),
+        limit: int = Field(default=50, ge=1, le=1000, description="Page size."),
+        offset: int = Field(default=0, ge=0, description="Rows to skip (use next_offset from the previous page)."),
+        format: str = FORMAT,
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        check_format(format)
+        with t.uow_factory() as uow:
+            plan = t.analytics.reorder_plan(
+                uow.session,
+                days=days,
+                start=start,
+                end=end,
+                lead_time_days=lead_time_days,
+                safety_days=safety_days,
+                target_days=target_days,
+                only_reorder=only_reorder,
+                limit=limit,
+                offset=offset,
+            )
+        rows = plan.pop("rows")
+        return {**plan, **rows_payload(rows, format)}
+
+    @mcp.tool(
+        title="Refresh inventory snapshot",
+        description="Create or update inventory_snapshot (on hand per product) from stock_movements. Incremental: "
+                    "only movements above the stored high-water mark are applied; full=true recomputes everything. "
+                    "low_stock reads the snapshot once it exists. Requires ALLOW_WRITES=1.",
+        tags={"ops", "inventory"},
+        meta={"write": True, "cost": "heavy"},
+        annotations={"destructiveHint": False, "idempotentHint": True, "readOnlyHint": False},
+    )
+    @offload(container)
+    def refresh_inventory_snapshot(
+        full: bool = Field(default=False, description="Recompute every product instead of applying new movements."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.inventory.refresh(uow.session, full=full)
 
     @mcp.tool(
         title="Ops health report",
-        description="Operational health snapshot: status mix + pending backlog + optional low-stock summary.",
+        description="Operational health snapshot: status mix + pending backlog + optional low-stock summary. "
+                    "Sections stream as progress notifications when the client sends a progress token.",
         tags={"ops", "report"},
-        meta={"read": True, "format": "markdown"},
+        meta={"read": True, "format": "markdown", "cost": "heavy"},
         annotations={"readOnlyHint": True},
     )
-    def ops_health_report(days: int = 14, low_stock_threshold: int = 10) -> str:
-        with container.uow_factory() as uow:
-            return container.ops.ops_health_report(uow.session, days=days, low_stock_threshold=low_stock_threshold)
+    @offload(container)
+    def ops_health_report(
+        days: int = 14,
+        low_stock_threshold: int = 10,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        tenant: str | None = TENANT,
+        ctx: Context | None = None,
+    ) -> str:
+        t = container.tenant(tenant)
+        args = {"days": days, "low_stock_threshold": low_stock_threshold, "start": start, "end": end}
+        pre = container.precompute.lookup("ops_health_report", t.name, args)
+        if pre is not None:
+            return as_of_note(pre) + pre.value
+        return build_ops_health_report(t.name, args, section_progress(ctx))
 
     @mcp.tool(
         title="Sales report",
-        description="One-page Markdown sales report (KPIs + trend + top products).",
+        description="One-page Markdown sales report (KPIs + trend + top products). Clients that send a progress "
+                    "token get each section as a progress notification as soon as its query finishes.",
         tags={"analytics", "report", "sales"},
-        meta={"read": True, "format": "markdown"},
+        meta={"read": True, "format": "markdown", "cost": "heavy"},
         annotations={"readOnlyHint": True},
     )
-    def sales_report(days: int = 30, top_n: int = 10) -> str:
-        with container.uow_factory() as uow:
-            return container.ops.sales_report(uow.session, days=days, top_n=top_n)
+    @offload(container)
+    def sales_report(
+        days: int = 30,
+        top_n: int = 10,
+        start: datetime | None = START,
+        end: datetime | None = END,
+        granularity: str = GRANULARITY_AUTO,
+        tenant: str | None = TENANT,
+        ctx: Context | None = None,
+    ) -> str:
+        t = container.tenant(tenant)
+        args = {"days": days, "top_n": top_n, "start": start, "end": end, "granularity": granularity}
+        pre = container.precompute.lookup("sales_report", t.name, args)
+        if pre is not None:
+            return as_of_note(pre) + pre.value
+        return build_sales_report(t.name, args, section_progress(ctx))
 
     @mcp.tool(
         title="Table counts",
-        description="Row counts for common e-commerce tables (only those that exist).",
+        description="Row counts for common e-commerce tables (only those that exist). "
+                    "mode=estimate reads planner statistics in one catalog query (instant, approximate); "
+                    "mode=exact runs COUNT(*) per table in parallel with a per-table timeout.",
         tags={"schema", "debug"},
-        meta={"read": True},
+        meta={"read": True, "cost": "heavy", "fan_out": True},
         annotations={"readOnlyHint": True},
     )
-    def table_counts() -> dict:
-        with container.uow_factory() as uow:
-            return container.analytics.table_counts(uow.session)
+    @offload(container)
+    def table_counts(
+        mode: str = Field(default="exact", description="exact or estimate."),
+        timeout_ms: int = Field(default=5000, ge=100, le=60000, description="Per-table timeout (exact mode)."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        mode = (mode or "exact").lower().strip()
+        if mode == "estimate":
+            with t.uow_factory() as uow:
+                return t.analytics.table_counts_estimate(uow.session)
+        if mode != "exact":
+            raise ValueError("mode must be one of: exact, estimate")
+        return t.batch.table_counts(timeout_ms=timeout_ms)
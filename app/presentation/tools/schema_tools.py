@@ -3,6 +3,8 @@ from __future__ import annotations
 from pydantic import Field
 
 from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.tenancy import TENANT
 
 
 def register(mcp, container: Container) -> None:
@@ -10,39 +12,67 @@ def register(mcp, container: Container) -> None:
         title="Refresh schema cache",
         description="Clear cached schema metadata (use after running migrations).",
         tags={"schema", "debug"},
-        meta={"read": True},
+        meta={"read": True, "cost": "light"},
         annotations={"readOnlyHint": True, "idempotentHint": True},
     )
-    def refresh_schema_cache() -> dict:
-        container.schema.clear_cache()
-        return {"ok": True, "note": "Schema cache cleared."}
+    @offload(container)
+    def refresh_schema_cache(tenant: str | None = TENANT) -> dict:
+        container.refresh_tenant(tenant)
+        return {"ok": True, "note": "Schema cache cleared.", "tenant": container.tenant(tenant).name}
 
     @mcp.tool(
         title="Schema overview",
-        description="List tables + columns in the public schema (Claude-friendly).",
+        description="Tables + columns of the public (or tenant) schema from one catalog query, as JSON and Markdown. "
+                    "Filter by name (`pattern`, glob or substring), page with `offset`/`limit` (`total` and "
+                    "`next_offset` are returned), `summary=true` for column counts only, `include_stats=true` "
+                    "for row estimates and on-disk size.",
         tags={"schema"},
-        meta={"read": True},
+        meta={"read": True, "cost": "light"},
         annotations={"readOnlyHint": True},
     )
-    def schema_overview() -> dict:
-        return container.schema.schema_overview()
+    @offload(container)
+    def schema_overview(
+        pattern: str | None = Field(default=None, description="Table name filter, e.g. order* or inventory."),
+        limit: int = Field(default=50, ge=1, le=500, description="Tables per page."),
+        offset: int = Field(default=0, ge=0, description="Tables to skip (use next_offset from the previous page)."),
+        summary: bool = Field(default=False, description="Column counts instead of full column lists."),
+        include_stats: bool = Field(default=False, description="Add row estimates and total size per table."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            return t.schema.schema_overview(
+                uow.session,
+                pattern=pattern,
+                limit=limit,
+                offset=offset,
+                summary=summary,
+                include_stats=include_stats,
+            )
 
     @mcp.tool(
         title="List tables",
-        description="List all tables in public schema.",
+        description="List all tables in the public (or tenant) schema.",
         tags={"schema"},
-        meta={"read": True},
+        meta={"read": True, "cost": "light"},
         annotations={"readOnlyHint": True},
     )
-    def list_tables() -> dict:
-        return container.schema.list_tables()
+    @offload(container)
+    def list_tables(tenant: str | None = TENANT) -> dict:
+        t = container.tenant(tenant)
+        return t.schema.list_tables()
 
     @mcp.tool(
         title="Describe table",
         description="Describe a table: columns, types, nullability, and default values (best effort).",
         tags={"schema"},
-        meta={"read": True},
+        meta={"read": True, "cost": "light"},
         annotations={"readOnlyHint": True},
     )
-    def describe_table(table_name: str = Field(description="Table name in public schema.")) -> dict:
-        return container.schema.describe_table(table_name)
+    @offload(container)
+    def describe_table(
+        table_name: str = Field(description="Table name in the tenant's schema."),
+        tenant: str | None = TENANT,
+    ) -> dict:
+        t = container.tenant(tenant)
+        return t.schema.describe_table(table_name)
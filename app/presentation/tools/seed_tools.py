@@ -3,6 +3,8 @@ from __future__ import annotations
 from pydantic import Field
 
 from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.tenancy import TENANT
 
 
 def register(mcp, container: Container) -> None:
@@ -10,13 +12,19 @@ def register(mcp, container: Container) -> None:
         title="Seed demo data",
         description="Insert realistic demo e-commerce data. Optionally truncates first. Requires ALLOW_WRITES=1.",
         tags={"seed", "demo"},
-        meta={"write": True},
+        meta={"write": True, "cost": "heavy"},
         annotations={"destructiveHint": True, "idempotentHint": False, "readOnlyHint": False},
     )
+    @offload(container)
     def seed_demo_data(
         size: str = Field(default="small", description="small, medium, large"),
         reset_first: bool = Field(default=True, description="If true, TRUNCATE tables first."),
         seed: int = Field(default=42, description="Random seed for repeatable data."),
+        tenant: str | None = TENANT,
     ) -> dict:
-        with container.uow_factory() as uow:
-            return container.seed.seed_demo_data(uow.session, size=size, reset_first=reset_first, seed=seed)
+        t = container.tenant(tenant)
+        with t.uow_factory() as uow:
+            out = t.seed.seed_demo_data(uow.session, size=size, reset_first=reset_first, seed=seed)
+        # Precomputed reports were built from the old rows; the note points users right at them.
+        out["precomputed_dropped"] = container.precompute.invalidate(t.name)
+        return out
@@ -3,6 +3,9 @@ from __future__ import annotations
 from pydantic import Field
 
 from app.container import Container
+from app.presentation.execution import offload
+from app.presentation.formatting import FORMAT, check_format
+from app.presentation.tenancy import TENANT
 
 
 def register(mcp, container: Container) -> None:
@@ -10,13 +13,48 @@ def register(mcp, container: Container) -> None:
         title="SQL (read-only)",
         description="Run one read-only SQL statement (SELECT/WITH/SHOW/EXPLAIN). Returns rows as JSON.",
         tags={"sql"},
-        meta={"read": True, "safety": "readonly"},
+        meta={"read": True, "safety": "readonly", "cost": "heavy"},
         annotations={"readOnlyHint": True, "openWorldHint": False},
     )
+    @offload(container)
     def sql_readonly(
         query: str = Field(description="Single SQL statement (SELECT/WITH/SHOW/EXPLAIN). Semicolon allowed at end."),
         max_rows: int = Field(default=200, ge=1, le=2000, description="Max rows to return."),
         timeout_ms: int = Field(default=5000, ge=100, le=60000, description="Statement timeout in milliseconds."),
+        format: str = FORMAT,
+        tenant: str | None = TENANT,
     ) -> dict:
-        with container.uow_factory() as uow:
-            return container.sql.sql_readonly(uow.session, query=query, max_rows=max_rows, timeout_ms=timeout_ms)
+        t = container.tenant(tenant)
+        columnar = check_format(format) == "columnar"
+        with t.uow_factory() as uow:
+            return container.sql.sql_readonly(
+                uow.session, query=query, max_rows=max_rows, timeout_ms=timeout_ms, columnar=columnar, schema=t.name
+            )
+
+    @mcp.tool(
+        title="SQL statistics",
+        description=(
+            "Execution statistics for sql_readonly per query fingerprint (literals and IN lists collapsed): "
+            "calls, errors, cache hits, total/avg/max ms, rows, last seen and an example. "
+            "Also reports the exact-match result cache (SQL_CACHE_TTL_S)."
+        ),
+        tags={"sql", "performance"},
+        meta={"read": True, "cost": "light"},
+        annotations={"readOnlyHint": True},
+    )
+    def sql_stats(
+        sort: str = Field(
+            default="total_ms", description="One of: total_ms, calls, avg_ms, max_ms, rows, errors, cache_hits."
+        ),
+        limit: int = Field(default=20, ge=1, le=500, description="How many fingerprints to return."),
+        reset: bool = Field(default=False, description="Clear the statistics after reading them."),
+    ) -> dict:
+        stats = container.sql.stats
+        out = {
+            "tracked": len(stats),
+            "fingerprints": stats.top(sort, limit),
+            "cache": container.sql.cache.stats() if container.sql.cache else {"enabled": False},
+        }
+        if reset:
+            stats.reset()
+        return out
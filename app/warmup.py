@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.container import Container
+
+log = logging.getLogger(__name__)
+
+# Statements worth compiling ahead of the first call; each runs once over an empty window.
+WARM_STATEMENTS = (
+    "revenue_by_day",
+    "top_products_last_days",
+    "top_customers_last_days",
+    "repeat_purchase_rate",
+    "gross_margin_last_days",
+    "sales_kpis",
+)
+WARM_TABLES = ("orders", "order_items", "products", "customers")
+
+
+class Warmup:
+    """
+    Background warm-up: pool connections, schema snapshot and reflected tables, compiled
+    analytics statements, then any configured reports. Runs in a daemon thread so the server
+    answers the MCP handshake immediately; each step is best effort.
+    """
+
+    def __init__(self, container: Container):
+        self.container = container
+        self.status: dict = {"state": "pending", "steps": {}}
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> Warmup:
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+        return self
+
+    def _step(self, name: str, fn) -> None:
+        t0 = time.perf_counter()
+        try:
+            outcome = {"ok": True, "detail": fn()}
+        except Exception as e:
+            outcome = {"ok": False, "error": str(e).splitlines()[0]}
+            log.warning("warm-up step %s failed: %s", name, outcome["error"])
+        self.status["steps"][name] = {**outcome, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+
+    def run(self) -> dict:
+        self.status["state"] = "running"
+        t0 = time.perf_counter()
+        self._step("pool", self._open_connections)
+        self._step("metadata", self._load_metadata)
+        self._step("statements", self._compile_statements)
+        if self.container.settings.warmup_reports:
+            self._step("reports", self._run_reports)
+        self.status["state"] = "done"
+        self.status["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        ok = {k: v["ok"] for k, v in self.status["steps"].items()}
+        log.info("warm-up finished in %.0f ms: %s", self.status["ms"], ok)
+        return self.status
+
+    def _open_connections(self) -> int:
+        # Hold n connections at once so the pool really grows to n, then hand them all back.
+        n = min(self.container.settings.warmup_connections, self.container.settings.db_pool_size)
+        conns = []
+        try:
+            for _ in range(n):
+                conns.append(self.container.engine.connect())
+        finally:
+            for c in conns:
+                c.close()
+        return len(conns)
+
+    def _load_metadata(self) -> dict:
+        t = self.container.default_tenant
+        version = t.reflection.fingerprint()
+        tables = [name for name in WARM_TABLES if t.reflection.table_exists(name)]
+        for name in tables:
+            t.registry.get(name)
+        if t.reflection.table_exists("orders"):
+            t.reflection.partition_key("orders")
+        return {"schema_version": version, "tables": tables}
+
+    def _compile_statements(self) -> list[str]:
+        """
+        Executes each analytics statement over a one-hour window in 1970: same statement shape
+        (so SQLAlchemy's compiled cache is filled and the server has parsed it), nothing to scan
+        on an indexed timestamp. Goes around the result cache so nothing gets stored.
+        """
+        t = self.container.default_tenant
+        start = datetime(1970, 1, 1, tzinfo=timezone.utc)
+        end = start + timedelta(hours=1)
+        done, errors = [], []
+        with t.uow_factory() as uow:
+            for name in WARM_STATEMENTS:
+                fn = getattr(type(t.analytics), name)
+                fn = getattr(fn, "__wrapped__", fn)
+                kwargs = {"days": 1, "start": start, "end": end}
+                if name.startswith("top_"):
+                    kwargs["limit"] = 1
+                try:
+                    with uow.session.begin_nested():
+                        fn(t.analytics, uow.session, **kwargs)
+                    done.append(name)
+                except Exception as e:
+                    errors.append(f"{name}: {str(e).splitlines()[0]}")
+        if errors and not done:
+            raise RuntimeError(errors[0])
+        for err in errors:
+            log.debug("warm-up skipped %s", err)
+        return done
+
+    def _run_reports(self) -> list[str]:
+        # Through the normal (cached) path, so with RESULT_CACHE_ENABLED the first real call is a hit.
+        t = self.container.default_tenant
+        done = []
+        for name, args in self.container.settings.warmup_reports.items():
+            target = t.ops if hasattr(t.ops, name) else t.analytics
+            fn = getattr(target, name, None)
+            if fn is None or name.startswith("_"):
+                log.warning("warm-up: unknown report %s", name)
+                continue
+            with t.uow_factory() as uow:
+                fn(uow.session, **args)
+            done.append(name)
+        return done
+
+
+def start_warmup(container: Container) -> Warmup | None:
+    if not container.settings.warmup_enabled:
+        return None
+    return Warmup(container).start()
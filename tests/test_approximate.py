@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import math
+import unittest
+from decimal import Decimal
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, Numeric, String, Table
+
+from app.application.services.analytics_service import Z_95, AnalyticsService
+
+metadata = MetaData(schema="public")
+TABLES = {
+    "orders": Table(
+        "orders",
+        metadata,
+        Column("order_id", Integer, primary_key=True),
+        Column("customer_id", Integer),
+        Column("placed_at", DateTime(timezone=True)),
+        Column("status", String),
+        Column("total_amount", Numeric),
+    ),
+    "order_items": Table(
+        "order_items",
+        metadata,
+        Column("order_item_id", Integer, primary_key=True),
+        Column("order_id", Integer),
+        Column("product_id", Integer),
+        Column("quantity", Integer),
+        Column("line_total", Numeric),
+        Column("sku_snapshot", String),
+        Column("name_snapshot", String),
+    ),
+    "customers": Table(
+        "customers",
+        metadata,
+        Column("customer_id", Integer, primary_key=True),
+        Column("email", String),
+        Column("full_name", String),
+    ),
+}
+
+
+class FakeReflection:
+    schema = "public"
+
+    def table_exists(self, name):
+        return name in TABLES
+
+    def relation_exists(self, name):
+        return name in TABLES
+
+    def columns_for(self, name):
+        return {c.name for c in TABLES[name].c} if name in TABLES else set()
+
+    def require_tables(self, *names):
+        pass
+
+    def partition_key(self, name):
+        return None
+
+
+class FakeRegistry:
+    def get(self, name):
+        return TABLES[name]
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.value
+
+    def one(self):
+        return self.value
+
+    def scalar_one(self):
+        return self.value
+
+
+class FakeSession:
+    """Answers statements in order from `results`."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.executed = 0
+
+    def execute(self, stmt, params=None):
+        self.executed += 1
+        return FakeResult(self.results.pop(0))
+
+
+def service() -> AnalyticsService:
+    return AnalyticsService(FakeReflection(), FakeRegistry())
+
+
+class EstimatorTests(unittest.TestCase):
+    def test_scaled_sum_matches_hand_computed_interval(self):
+        # f = 0.05, sum(y) = 100, sum(y^2) = 2000: Var = 0.95 / 0.0025 * 2000 = 760000.
+        est, low, high = AnalyticsService._scaled_sum(100, 2000, 0.05)
+        half = Z_95 * math.sqrt(760000)
+        self.assertEqual(est, 2000.0)
+        self.assertAlmostEqual(low, round(2000 - half, 2))
+        self.assertAlmostEqual(high, round(2000 + half, 2))
+
+    def test_full_sample_has_zero_width(self):
+        self.assertEqual(AnalyticsService._scaled_sum(Decimal("12.5"), Decimal("80"), 1.0), (12.5, 12.5, 12.5))
+        self.assertEqual(AnalyticsService._ratio_interval(10, 3, 10, 3, 3, 1.0), (0.3, 0.3, 0.3))
+
+    def test_ratio_interval_with_one_customer_per_unit_is_the_proportion_interval(self):
+        rate, low, high = AnalyticsService._ratio_interval(100, 20, 100, 20, 20, 0.05)
+        half = Z_95 * math.sqrt(0.2 * 0.8 / 100 * 0.95)
+        self.assertEqual(rate, 0.2)
+        self.assertAlmostEqual(low, round(0.2 - half, 4))
+        self.assertAlmostEqual(high, round(0.2 + half, 4))
+
+    def test_ratio_interval_widens_when_units_are_clustered(self):
+        # Same 100 customers / 20 repeaters, but in 10 pages of 10, all repeaters on 2 pages.
+        clustered = AnalyticsService._ratio_interval(100, 20, 10 * 10**2, 2 * 10**2, 2 * 100, 0.05)
+        independent = AnalyticsService._ratio_interval(100, 20, 100, 20, 20, 0.05)
+        self.assertGreater(clustered[2] - clustered[1], independent[2] - independent[1])
+
+
+class ApproximateQueryTests(unittest.TestCase):
+    def test_top_products_bernoulli_scales_by_the_design_fraction_without_extra_scans(self):
+        rows = [{"sku": "A", "name": "a", "units": 3, "revenue": Decimal(100), "revenue_sq": Decimal(2000)}]
+        session = FakeSession(rows)
+        res = service().top_products_approx(
+            session, days=30, limit=5, sample_percent=5, method="bernoulli", seed=1
+        )
+
+        self.assertEqual(session.executed, 1)
+        row = res["rows"][0]
+        self.assertEqual((row["units"], row["revenue"]), (60, 2000.0))
+        expected = AnalyticsService._scaled_sum(100, 2000, 0.05)
+        self.assertEqual((row["revenue_ci_low"], row["revenue_ci_high"]), expected[1:])
+        meta = res["approximate"]
+        self.assertEqual(
+            (meta["effective_fraction"], meta["fraction_source"], meta["confidence"]), (0.05, "design", 0.95)
+        )
+        self.assertIsNone(meta["sampled_rows"])
+
+    def test_top_customers_system_uses_the_estimated_fraction_and_gives_bounds(self):
+        rows = [
+            {"customer_id": 1, "email": "a@x", "full_name": "A", "orders": 2, "revenue": 50, "revenue_sq": 900}
+        ]
+        # sampled rows 100 of ~1000 estimated: f = 0.1 although 5% of pages were requested.
+        session = FakeSession(rows, 100, 1000.0)
+        res = service().top_customers_approx(
+            session, days=30, limit=5, sample_percent=5, method="system", seed=1
+        )
+
+        row = res["rows"][0]
+        self.assertEqual((row["orders"], row["revenue"]), (20, 500.0))
+        self.assertIsNotNone(row["revenue_ci_low"])
+        self.assertLess(row["revenue_ci_low"], 500.0)
+        self.assertEqual(res["approximate"]["fraction_source"], "estimated")
+        self.assertEqual(res["approximate"]["sampled_rows"], 100)
+
+    def test_system_without_statistics_falls_back_to_the_design_fraction(self):
+        session = FakeSession([], 40, 0.0)  # never analyzed: reltuples <= 0
+        res = service().top_products_approx(
+            session, days=30, limit=5, sample_percent=10, method="system", seed=1
+        )
+        meta = res["approximate"]
+        self.assertEqual((meta["effective_fraction"], meta["fraction_source"]), (0.1, "design"))
+
+    def test_repeat_rate_scales_counts(self):
+        row = {"active_n": 100, "repeat_n": 20, "active_sq": 100, "repeat_sq": 20, "active_repeat": 20}
+        res = service().repeat_purchase_rate_approx(
+            FakeSession(row), days=90, sample_percent=5, method="bernoulli", seed=1
+        )
+        self.assertEqual((res["active_customers"], res["repeat_customers"], res["repeat_rate"]), (2000, 400, 0.2))
+        self.assertLess(res["repeat_rate_ci_low"], 0.2)
+        self.assertGreater(res["repeat_rate_ci_high"], 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import unittest
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.application.services.index_service import MAX_IDENT_LEN, IndexAdvisorService, IndexCandidate
+
+CAND = IndexCandidate(name="ix_orders_placed_at", table="orders", columns=("placed_at",), purpose="window")
+
+
+def service() -> IndexAdvisorService:
+    engine = SimpleNamespace(dialect=postgresql.dialect())
+    return IndexAdvisorService(None, engine, SimpleNamespace(schema="public"), None)
+
+
+class PartitionStepTests(unittest.TestCase):
+    def test_plain_table_is_built_concurrently(self):
+        self.assertEqual(
+            service()._steps(CAND, {}),
+            ["CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_placed_at ON public.orders USING btree (placed_at)"],
+        )
+
+    def test_partitioned_parent_builds_on_only_then_each_partition_then_attaches(self):
+        partitions = {
+            ("public", "orders"): [("public", "orders_2025"), ("public", "orders_2026")],
+            ("public", "orders_2026"): [("public", "orders_2026_h1")],
+        }
+        self.assertEqual(
+            service()._steps(CAND, partitions),
+            [
+                "CREATE INDEX IF NOT EXISTS ix_orders_placed_at ON ONLY public.orders USING btree (placed_at)",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_placed_at_orders_2025 "
+                "ON public.orders_2025 USING btree (placed_at)",
+                "ALTER INDEX public.ix_orders_placed_at ATTACH PARTITION public.ix_orders_placed_at_orders_2025",
+                "CREATE INDEX IF NOT EXISTS ix_orders_placed_at_orders_2026 "
+                "ON ONLY public.orders_2026 USING btree (placed_at)",
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_placed_at_orders_2026_orders_2026_h1 "
+                "ON public.orders_2026_h1 USING btree (placed_at)",
+                "ALTER INDEX public.ix_orders_placed_at_orders_2026 "
+                "ATTACH PARTITION public.ix_orders_placed_at_orders_2026_orders_2026_h1",
+                "ALTER INDEX public.ix_orders_placed_at ATTACH PARTITION public.ix_orders_placed_at_orders_2026",
+            ],
+        )
+
+    def test_long_partition_index_names_stay_within_the_identifier_limit(self):
+        partitions = {("public", "orders"): [("public", "orders_" + "x" * 60), ("public", "orders_" + "y" * 60)]}
+        steps = service()._steps(CAND, partitions)
+        names = [s.split(" ATTACH PARTITION public.")[1] for s in steps if "ATTACH" in s]
+        self.assertEqual(len(set(names)), 2)
+        self.assertTrue(all(len(n) <= MAX_IDENT_LEN for n in names))
+
+
+if __name__ == "__main__":
+    unittest.main()
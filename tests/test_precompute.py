@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app.application.services.precompute_service import PrecomputeService
+from app.infrastructure.cache.store import ResultCache
+
+
+class FakeLease:
+    """Stands in for LeaderLease: leadership is whatever the test says."""
+
+    def __init__(self, leader: bool):
+        self.is_held = leader
+
+    def held(self) -> bool:
+        return self.is_held
+
+    def release(self) -> None:
+        self.is_held = False
+
+
+JOBS = [{"report": "report", "args": {"days": 7}, "interval_s": 3600}]
+
+
+class PrecomputeLeaderTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        path = Path(self.tmp.name) / "results.sqlite"
+        # Two processes sharing one STATE_DIR: separate ResultCache objects over the same file.
+        self.stores = [ResultCache(path, max_bytes=1 << 20, open_ttl_s=60) for _ in range(2)]
+        self.builds: list[str] = []
+
+    def service(self, name: str, lease: FakeLease, store: ResultCache) -> PrecomputeService:
+        def build(tenant, args):
+            self.builds.append(name)
+            return f"{name}: {args['days']} days"
+
+        svc = PrecomputeService(JOBS, default_interval_s=60, default_tenant="public", lease=lease, store=store)
+        svc.register("report", build, {"days": 30})
+        self.addCleanup(svc.stop)
+        return svc
+
+    def wait_for(self, predicate, timeout_s: float = 5.0):
+        deadline = time.monotonic() + timeout_s
+        while time.monotonic() < deadline:
+            value = predicate()
+            if value:
+                return value
+            time.sleep(0.02)
+        self.fail("timed out")
+
+    def test_only_the_leader_builds_and_followers_serve_its_result(self):
+        leader = self.service("leader", FakeLease(True), self.stores[0])
+        follower = self.service("follower", FakeLease(False), self.stores[1])
+        leader.start()
+        follower.start()
+
+        hit = self.wait_for(lambda: follower.lookup("report", None, {"days": 7}))
+        self.assertEqual(hit.value, "leader: 7 days")
+        self.assertEqual(self.builds, ["leader"])
+        self.assertFalse(follower.is_leader())
+        self.assertEqual(follower.status()[0]["as_of"], leader.status()[0]["as_of"])
+
+    def test_follower_without_a_result_answers_none(self):
+        follower = self.service("follower", FakeLease(False), self.stores[1])
+        follower.start()
+        time.sleep(0.1)
+        self.assertIsNone(follower.lookup("report", None, {"days": 7}))
+        self.assertEqual(self.builds, [])
+
+    def test_invalidating_in_a_follower_drops_results_everywhere_and_rebuilds_on_the_leader(self):
+        leader = self.service("leader", FakeLease(True), self.stores[0])
+        follower = self.service("follower", FakeLease(False), self.stores[1])
+        leader.start()
+        follower.start()
+        before = self.wait_for(lambda: follower.lookup("report", None, {"days": 7}))
+
+        self.assertEqual(follower.invalidate("public"), 1)
+        self.assertIsNone(follower.lookup("report", None, {"days": 7}))
+
+        after = self.wait_for(lambda: follower.lookup("report", None, {"days": 7}))
+        self.assertGreater(after.started(), before.as_of)
+        self.assertEqual(self.builds, ["leader", "leader"])
+        self.assertEqual(leader.lookup("report", None, {"days": 7}).as_of, after.as_of)
+
+    def test_without_a_lease_every_process_builds(self):
+        solo = self.service("solo", None, None)
+        solo.start()
+        hit = self.wait_for(lambda: solo.lookup("report", None, {"days": 7}))
+        self.assertEqual(hit.value, "solo: 7 days")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.application.services.analytics_service import resolve_window
+from app.application.services.caching import cached_result
+from app.infrastructure.cache.store import ResultCache
+
+PAST = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class VersionSession:
+    """Answers the data-version query with `version` and counts how often it was asked."""
+
+    def __init__(self, version):
+        self.version = version
+        self.queries = 0
+
+    def execute(self, stmt, params=None):
+        self.queries += 1
+        session = self
+
+        class Result:
+            def one(self):
+                return session.version
+
+        return Result()
+
+
+class Report:
+    def __init__(self, cache):
+        self.cache = cache
+        self.runs = 0
+
+    @cached_result(window=resolve_window)
+    def report(self, session, days, start=None, end=None):
+        self.runs += 1
+        return {"runs": self.runs}
+
+
+class DataVersionKeyTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        results = ResultCache(Path(tmp.name) / "results.sqlite", max_bytes=1 << 20, open_ttl_s=60)
+        self.scoped = results.scoped("db:public", lambda: "fingerprint", "public")
+        self.svc = Report(self.scoped)
+
+    def test_closed_window_is_recomputed_after_a_write(self):
+        session = VersionSession((3, 100, 7))
+        self.assertEqual(self.svc.report(session, days=7, end=PAST), {"runs": 1})
+        self.assertEqual(self.svc.report(session, days=7, end=PAST), {"runs": 1})
+
+        session.version = (3, 101, 7)
+        self.scoped._data_version_at = 0.0  # let the memo expire
+        self.assertEqual(self.svc.report(session, days=7, end=PAST), {"runs": 2})
+
+    def test_hits_within_a_second_reuse_the_version(self):
+        session = VersionSession((3, 100, 7))
+        for _ in range(5):
+            self.svc.report(session, days=7, end=PAST)
+        self.assertEqual(session.queries, 1)
+
+    def test_invalidate_forgets_the_version(self):
+        session = VersionSession((3, 100, 7))
+        self.svc.report(session, days=7, end=PAST)
+        self.scoped.invalidate()
+        self.svc.report(session, days=7, end=PAST)
+        self.assertEqual((session.queries, self.svc.runs), (2, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
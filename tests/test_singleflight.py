@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+import time
+import unittest
+
+from app.infrastructure.cache.singleflight import SingleFlight
+from app.infrastructure.db.inflight import QueryCancelled
+
+
+def run_concurrently(n: int, target) -> list:
+    """Starts n threads on `target`, each after the first has had time to become the leader."""
+    results: list = [None] * n
+
+    def worker(i: int) -> None:
+        try:
+            results[i] = target()
+        except BaseException as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    threads[0].start()
+    time.sleep(0.05)
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+class SingleFlightTest(unittest.TestCase):
+    def test_coalesces_identical_calls(self):
+        flights, runs = SingleFlight(), []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.2)
+            return {"rows": [1, 2]}
+
+        results = run_concurrently(4, lambda: flights.do("k", fn))
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(results, [{"rows": [1, 2]}] * 4)
+        self.assertEqual(flights.stats(), {"in_flight": 0, "executed": 1, "coalesced": 3})
+
+    def test_every_caller_gets_its_own_copy(self):
+        flights = SingleFlight()
+
+        def fn():
+            time.sleep(0.2)
+            return {"rows": [1, 2], "total": 2}
+
+        def caller():
+            # Reshape the result the way reorder_plan does.
+            plan = flights.do("k", fn)
+            rows = plan.pop("rows")
+            rows.append(3)
+            return plan, rows
+
+        results = run_concurrently(4, caller)
+        for result in results:
+            self.assertNotIsInstance(result, BaseException)
+            self.assertEqual(result, ({"total": 2}, [1, 2, 3]))
+        self.assertEqual(len({id(plan) for plan, _ in results}), 4)
+
+    def test_exception_reaches_every_caller(self):
+        flights, runs = SingleFlight(), []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.2)
+            raise ValueError("boom")
+
+        results = run_concurrently(3, lambda: flights.do("k", fn))
+        self.assertEqual(len(runs), 1)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+        self.assertEqual(flights.stats()["in_flight"], 0)
+
+    def test_waiters_retry_after_leader_cancelled(self):
+        flights, runs = SingleFlight(), []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.2)
+            if len(runs) == 1:
+                raise QueryCancelled("cancelled by its client")
+            return "ok"
+
+        results = run_concurrently(3, lambda: flights.do("k", fn))
+        self.assertIsInstance(results[0], QueryCancelled)
+        self.assertEqual(results[1:], ["ok", "ok"])
+        # One waiter became the new leader, the other waited for it.
+        self.assertEqual(len(runs), 2)
+
+    def test_different_keys_do_not_coalesce(self):
+        flights, runs = SingleFlight(), []
+
+        def fn():
+            runs.append(1)
+            time.sleep(0.1)
+            return len(runs)
+
+        run_concurrently(2, lambda: flights.do(threading.get_ident(), fn))
+        self.assertEqual(len(runs), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import contextlib
+import unittest
+
+from app.application.services.sql_service import SqlService
+from app.infrastructure.cache.query_cache import QueryCache
+from app.infrastructure.db.sql_safety import qualifier_names
+
+
+class FakeSession:
+    """Serves the data-version query from `versions` (per watched schema) and counts real queries."""
+
+    def __init__(self):
+        self.versions = {"public": 1, "sales": 1}
+        self.runs = 0
+        self.watched: list[list[str]] = []
+
+    def begin(self):
+        return contextlib.nullcontext()
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        session = self
+
+        class Result:
+            def one(self):
+                return (len(params["schemas"]), sum(session.versions.get(s, 0) for s in params["schemas"]), 0)
+
+            def mappings(self):
+                return self
+
+            def fetchmany(self, n):
+                return [{"n": session.runs}]
+
+        if "pg_stat_user_tables" in sql:
+            self.watched.append(params["schemas"])
+        elif "set_config" not in sql:
+            self.runs += 1
+        return Result()
+
+
+class SqlCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.svc = SqlService(cache=QueryCache(ttl_s=60))
+        self.session = FakeSession()
+
+    def run_query(self, query: str) -> dict:
+        return self.svc.sql_readonly(self.session, query, max_rows=10, timeout_ms=1000, schema="public")
+
+    def test_hit_returns_a_copy(self):
+        first = self.run_query("select count(*) as n from orders")
+        first["rows"].append({"n": "mutated"})
+        second = self.run_query("select count(*) as n from orders")
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["rows"], [{"n": 1}])
+        second["rows"].clear()
+        self.assertEqual(self.run_query("select count(*) as n from orders")["rows"], [{"n": 1}])
+
+    def test_writes_to_a_referenced_schema_invalidate(self):
+        query = "select count(*) as n from sales.orders o where o.id > 0"
+        self.run_query(query)
+        self.assertEqual(self.session.watched[-1], ["public", "o", "sales"])
+        self.assertTrue(self.run_query(query)["cached"])
+
+        self.session.versions["sales"] += 1
+        self.assertFalse(self.run_query(query)["cached"])
+        self.assertEqual(self.session.runs, 2)
+
+    def test_unqualified_queries_watch_the_tenant_only(self):
+        self.run_query("select 1 as n from orders")
+        self.assertEqual(self.session.watched[-1], ["public"])
+
+
+class QualifierNameTests(unittest.TestCase):
+    def test_names_before_dots_skip_literals_and_comments(self):
+        sql = "select o.id from Sales.orders o join \"Mixed\".t on true -- x.y\nwhere a = 'b.c'"
+        self.assertEqual(qualifier_names(sql), ["Mixed", "o", "sales"])
+
+
+if __name__ == "__main__":
+    unittest.main()